@@ -4,11 +4,40 @@ Docs:
     https://streamlit.io
 """
 
+import io
+import os
+import time
+from importlib.util import find_spec
+from operator import itemgetter
+
+import altair as alt
+import numpy as np
 import streamlit as st
 import pandas as pd
-
+from openpyxl import load_workbook
+
+from auswertung import ROLLUP_AUFLOESUNGEN
+from hintergrundjobs import (
+    FEHLGESCHLAGEN,
+    FERTIG,
+    LAUFEND,
+    WARTEND,
+    JobRunner,
+    erstelle_parameter,
+    lade_ergebnis,
+)
+from stromertrag import (
+    SolarYieldModel,
+    globalstrahlung_datei,
+    lese_gebaeude_bloecke,
+)
 from formulas.annual_solar_yield import annual_solar_yield
-from formulas.relative_yield_potential import get_relative_yield
+from formulas.relative_yield_potential import (
+    data as relative_yield_table,
+    get_relative_yield,
+    orientations as relative_yield_orientations,
+    tilt_angles as relative_yield_tilts,
+)
 from formulas.roof_areas_scheffler import (
     flat_roof_area_scheffler,
     gable_roof_area_scheffler,
@@ -31,10 +60,315 @@ st.markdown(
 Welcome to the **Solar Roof Calculator**. Use the tabs below to:
 1. Compute **roof areas** using either *Scheffler* or *TUM* formulas.
 2. Estimate the **Annual Solar Yield** from a given roof area.
+3. Run the full **campus sweep** as a background job.
 """
 )
 
 
+# -------------------------------------------------
+# Background Jobs (shared by all sessions)
+# -------------------------------------------------
+@st.cache_resource
+def get_job_runner() -> JobRunner:
+    """Returns the job runner (one worker process) shared by all sessions.
+
+    Returns:
+        JobRunner: The job runner.
+    """
+    return JobRunner()
+
+
+@st.cache_data
+def load_job_result(job_id: str, name: str) -> pd.DataFrame:
+    """Loads a result of a finished job. Job IDs include an input hash, so the
+    cached result never goes stale.
+
+    Args:
+        job_id (str): The job ID.
+        name (str): The result name, e.g. "aggregate" or "rollup_month".
+
+    Returns:
+        pd.DataFrame: The result.
+    """
+    return lade_ergebnis(job_id, name)
+
+
+@st.cache_data
+def job_result_as_csv(job_id: str, name: str) -> bytes:
+    """Converts a result of a finished job to CSV for the download button.
+
+    Args:
+        job_id (str): The job ID.
+        name (str): The result name.
+
+    Returns:
+        bytes: The result as CSV.
+    """
+    return load_job_result(job_id, name).to_csv(index=False).encode("utf-8")
+
+
+# -------------------------------------------------
+# Yield Grid (cached per building and efficiency)
+# -------------------------------------------------
+@st.cache_data
+def load_campus_buildings() -> pd.DataFrame:
+    """Loads the campus buildings from data/grundflaeche.csv.
+
+    Returns:
+        pd.DataFrame: One row per building with building, building_area, roof_type
+            and orientation. Empty if the file does not exist.
+    """
+    if not os.path.exists("data/grundflaeche.csv"):
+        return pd.DataFrame(
+            columns=["building", "building_area", "roof_type", "orientation"]
+        )
+    return pd.DataFrame(
+        [
+            building
+            for block in lese_gebaeude_bloecke("data/grundflaeche.csv", 1000)
+            for building in block
+        ]
+    )
+
+
+@st.cache_resource(show_spinner="Loading irradiance ...")
+def get_yield_model() -> SolarYieldModel:
+    """Returns the yield model shared by all sessions. The irradiance is loaded
+    once, like in the batch pipeline (stromertrag.py --chunked).
+
+    Returns:
+        SolarYieldModel: The yield model.
+    """
+    return SolarYieldModel()
+
+
+@st.cache_data
+def load_annual_irradiation() -> float:
+    """Sums the hourly irradiance of the measurement file to kWh/m² per year.
+
+    Returns:
+        float: The annual solar irradiation in kWh/m², 1000 if the file is missing.
+    """
+    if not os.path.exists(globalstrahlung_datei):
+        return 1000.0
+    return float(get_yield_model().jahressumme / 1000)
+
+
+@st.cache_data
+def compute_yield_grid(
+    building_area: float,
+    roof_type: str,
+    module_efficiency: float,
+    solar_irradiation: float,
+    reduction_factor: float = 0.8,
+) -> pd.DataFrame:
+    """Computes the annual yield over the whole orientation x tilt grid at once.
+
+    The roof areas are computed once per tilt and multiplied with the complete
+    relative yield table in one array operation. Inclined roofs skip the 90° tilt,
+    where the roof area formulas diverge.
+
+    Args:
+        building_area (float): The area of the building in square meters.
+        roof_type (str): "flat", "gable" or "pitched".
+        module_efficiency (float): The efficiency of the solar module.
+        solar_irradiation (float): The solar irradiation in kWh/m².
+        reduction_factor (float): The reduction factor of the roof area formulas.
+
+    Returns:
+        pd.DataFrame: One row per method, orientation and tilt with the annual yield.
+    """
+    tilts = np.array(relative_yield_tilts)
+    relative_yields = np.array(relative_yield_table) / 100
+    if roof_type != "flat":
+        tilts, relative_yields = tilts[tilts < 90], relative_yields[tilts < 90]
+
+    if roof_type == "flat":
+        areas = {
+            "Scheffler": np.full(len(tilts), flat_roof_area_scheffler(building_area)),
+            "TUM": np.full(len(tilts), flat_roof_area_tum(building_area)),
+        }
+    elif roof_type == "gable":
+        areas = {
+            "Scheffler": np.array(
+                [gable_roof_area_scheffler(building_area, tilt) for tilt in tilts]
+            ),
+            "TUM": np.array(
+                [
+                    gable_roof_area_tum(building_area, reduction_factor, tilt)
+                    for tilt in tilts
+                ]
+            ),
+        }
+    else:
+        areas = {
+            "Scheffler": np.array(
+                [
+                    pitched_roof_area_scheffler(building_area, reduction_factor, tilt)
+                    for tilt in tilts
+                ]
+            ),
+            "TUM": np.array(
+                [
+                    pitched_roof_area_tum(building_area, reduction_factor, tilt)
+                    for tilt in tilts
+                ]
+            ),
+        }
+
+    grids = []
+    for method, method_areas in areas.items():
+        annual_yield = annual_solar_yield(
+            roof_area=method_areas[:, np.newaxis],
+            solar_irradiation=solar_irradiation,
+            module_efficiency=module_efficiency,
+            relative_yield=relative_yields,
+        )
+        grids.append(
+            pd.DataFrame(
+                {
+                    "method": method,
+                    "orientation": np.tile(relative_yield_orientations, len(tilts)),
+                    "tilt": np.repeat(tilts, len(relative_yield_orientations)),
+                    "annual_yield": annual_yield.ravel(),
+                }
+            )
+        )
+    return pd.concat(grids, ignore_index=True)
+
+
+# -------------------------------------------------
+# Building Upload (header first, only required columns)
+# -------------------------------------------------
+UPLOAD_REQUIRED_COLUMNS = [
+    "building",
+    "building_area",
+    "roof",
+    "tilt_angle",
+    "orientation",
+    "module_efficiency",
+    "solar_irradiation",
+]
+
+# Optional: Rust-based xlsx reader, much faster than openpyxl (pip install python-calamine)
+CALAMINE_AVAILABLE = find_spec("python_calamine") is not None
+PARQUET_AVAILABLE = find_spec("pyarrow") is not None
+
+
+def _read_xlsx_openpyxl(buffer: io.BytesIO) -> tuple[pd.DataFrame | None, list[str]]:
+    """Streams the first sheet row by row in read-only mode. The header row is
+    validated before any data row is parsed, then only the required cells of each
+    row are kept.
+
+    Args:
+        buffer (io.BytesIO): The uploaded workbook.
+
+    Returns:
+        tuple[pd.DataFrame | None, list[str]]: The required columns (None if
+            columns are missing) and the missing columns.
+    """
+    workbook = load_workbook(buffer, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = ["" if cell is None else str(cell).strip() for cell in next(rows, ())]
+        missing_cols = [col for col in UPLOAD_REQUIRED_COLUMNS if col not in header]
+        if missing_cols:
+            return None, missing_cols
+
+        get_required = itemgetter(
+            *[header.index(col) for col in UPLOAD_REQUIRED_COLUMNS]
+        )
+        empty = len(UPLOAD_REQUIRED_COLUMNS)
+        records = [
+            record
+            for record in map(get_required, rows)
+            if record.count(None) < empty
+        ]
+    finally:
+        workbook.close()
+    return pd.DataFrame.from_records(records, columns=UPLOAD_REQUIRED_COLUMNS), []
+
+
+@st.cache_data(max_entries=4, show_spinner="Parsing upload ...")
+def read_building_upload(
+    file_name: str, data: bytes
+) -> tuple[pd.DataFrame | None, list[str], str, float]:
+    """Reads an uploaded building inventory (xlsx, csv or parquet).
+
+    The header is read and validated first, so a file with missing columns is
+    rejected without parsing its rows. Otherwise only the required columns are
+    read. Cached per file content, so changing a widget does not parse again.
+
+    Args:
+        file_name (str): The name of the uploaded file (for the file type).
+        data (bytes): The content of the uploaded file.
+
+    Returns:
+        tuple[pd.DataFrame | None, list[str], str, float]: The required columns
+            (None if columns are missing), the missing columns, the reader used
+            and the parse time in seconds.
+    """
+    start = time.perf_counter()
+    extension = os.path.splitext(file_name)[1].lower()
+    buffer = io.BytesIO(data)
+
+    if extension == ".csv":
+        first_line = data[:65536].split(b"\n", 1)[0]
+        sep = ";" if first_line.count(b";") > first_line.count(b",") else ","
+        header = pd.read_csv(buffer, sep=sep, nrows=0, encoding="utf-8-sig")
+        header = [str(col).strip() for col in header.columns]
+        missing_cols = [col for col in UPLOAD_REQUIRED_COLUMNS if col not in header]
+        df = None
+        if not missing_cols:
+            buffer.seek(0)
+            df = pd.read_csv(
+                buffer,
+                sep=sep,
+                encoding="utf-8-sig",
+                usecols=lambda col: str(col).strip() in UPLOAD_REQUIRED_COLUMNS,
+            )
+            df.columns = [str(col).strip() for col in df.columns]
+        reader = f"pandas CSV (sep '{sep}')"
+
+    elif extension == ".parquet":
+        if not PARQUET_AVAILABLE:
+            raise ValueError("Parquet uploads need pyarrow (pip install pyarrow)")
+        import pyarrow.parquet as pq
+
+        header = pq.ParquetFile(buffer).schema_arrow.names
+        missing_cols = [col for col in UPLOAD_REQUIRED_COLUMNS if col not in header]
+        df = None
+        if not missing_cols:
+            buffer.seek(0)
+            df = pd.read_parquet(buffer, columns=UPLOAD_REQUIRED_COLUMNS)
+        reader = "pyarrow (column projection)"
+
+    elif CALAMINE_AVAILABLE:
+        header = [
+            str(col).strip()
+            for col in pd.read_excel(buffer, engine="calamine", nrows=0).columns
+        ]
+        missing_cols = [col for col in UPLOAD_REQUIRED_COLUMNS if col not in header]
+        df = None
+        if not missing_cols:
+            buffer.seek(0)
+            df = pd.read_excel(
+                buffer,
+                engine="calamine",
+                usecols=lambda col: str(col).strip() in UPLOAD_REQUIRED_COLUMNS,
+            )
+            df.columns = [str(col).strip() for col in df.columns]
+        reader = "calamine"
+
+    else:
+        df, missing_cols = _read_xlsx_openpyxl(buffer)
+        reader = "openpyxl (read-only, streaming)"
+
+    if df is not None:
+        df = df[UPLOAD_REQUIRED_COLUMNS]
+    return df, missing_cols, reader, time.perf_counter() - start
+
+
 # -------------------------------------------------
 # Tabs
 # -------------------------------------------------
@@ -44,6 +378,7 @@ Welcome to the **Solar Roof Calculator**. Use the tabs below to:
     tab_solar_yield,
     tab_relative_yield_potential,
     tab_total_electricity_yield,
+    tab_campus_sweep,
 ) = st.tabs(
     [
         "Scheffler Roof Area",
@@ -51,6 +386,7 @@ Welcome to the **Solar Roof Calculator**. Use the tabs below to:
         "Annual Solar Yield",
         "Relative Yield Potential",
         "Total Electricity Yield",
+        "Campus Sweep",
     ]
 )
 
@@ -269,16 +605,98 @@ with tab_relative_yield_potential:
     else:
         st.info("Enter values and click the button to calculate the relative yield.")
 
+    st.subheader("Annual Yield Heatmap (Orientation × Tilt)")
+
+    campus_buildings = load_campus_buildings()
+    heatmap_building = st.selectbox(
+        "Building",
+        ["Custom"] + campus_buildings["building"].tolist(),
+        key="heatmap_building",
+    )
+    if heatmap_building == "Custom":
+        heatmap_area = st.number_input(
+            "Building area (m²)",
+            min_value=0.0,
+            value=1000.0,
+            step=50.0,
+            key="heatmap_building_area",
+        )
+        heatmap_roof_types = ["gable", "pitched", "flat"]
+    else:
+        building_row = campus_buildings[
+            campus_buildings["building"] == heatmap_building
+        ].iloc[0]
+        heatmap_area = float(building_row["building_area"])
+        heatmap_roof_types = (
+            ["gable", "pitched", "flat"]
+            if building_row["roof_type"] == "mixed"
+            else [building_row["roof_type"]]
+        )
+        st.caption(
+            f"Building area: {heatmap_area:,.2f} m² · "
+            f"Roof: {building_row['roof_type']} · "
+            f"Orientation: {building_row['orientation']}"
+        )
+
+    heatmap_roof_type = st.selectbox(
+        "Roof type", heatmap_roof_types, key="heatmap_roof_type"
+    )
+    heatmap_efficiency = st.slider(
+        "Module efficiency",
+        min_value=0.10,
+        max_value=0.30,
+        value=0.20,
+        step=0.01,
+        key="heatmap_efficiency",
+    )
+    heatmap_irradiation = st.number_input(
+        "Solar irradiation (kWh/m²)",
+        min_value=0.0,
+        value=round(load_annual_irradiation(), 1),
+        step=50.0,
+        key="heatmap_irradiation",
+    )
+
+    yield_grid = compute_yield_grid(
+        heatmap_area, heatmap_roof_type, heatmap_efficiency, heatmap_irradiation
+    )
+    for column, method in zip(st.columns(2), ["Scheffler", "TUM"]):
+        method_grid = yield_grid[yield_grid["method"] == method]
+        best = method_grid.loc[method_grid["annual_yield"].idxmax()]
+        column.markdown(
+            f"**{method}** · best: {best['annual_yield']:,.0f} kWh at "
+            f"{best['orientation']:.0f}° / {best['tilt']:.0f}°"
+        )
+        column.altair_chart(
+            alt.Chart(method_grid)
+            .mark_rect()
+            .encode(
+                x=alt.X("orientation:O", title="Orientation (°)"),
+                y=alt.Y("tilt:O", title="Tilt (°)", sort="descending"),
+                color=alt.Color(
+                    "annual_yield:Q",
+                    title="kWh/year",
+                    scale=alt.Scale(scheme="viridis"),
+                ),
+                tooltip=[
+                    "orientation",
+                    "tilt",
+                    alt.Tooltip("annual_yield:Q", format=",.0f"),
+                ],
+            ),
+            use_container_width=True,
+        )
+
 
 # -------------------------------------------------
 # Total Electricity Yield (Excel-Upload)
 # -------------------------------------------------
 with tab_total_electricity_yield:
-    st.header("Total Electricity Yield for Multiple Buildings (from Excel)")
+    st.header("Total Electricity Yield for Multiple Buildings (from Excel, CSV or Parquet)")
 
     st.write(
         """
-        Upload an Excel file that contains **at least** the following columns:
+        Upload an Excel, CSV or Parquet file that contains **at least** the following columns:
         - **building**  
         - **building_area**  
         - **roof** (e.g., *mixed*, *pitched*, *flat*, *gable*, etc.)  
@@ -298,195 +716,184 @@ with tab_total_electricity_yield:
         key="total_reduction_factor",
     )
 
-    uploaded_file = st.file_uploader("Please upload an Excel file", type=["xlsx"])
+    uploaded_file = st.file_uploader(
+        "Please upload an Excel, CSV or Parquet file", type=["xlsx", "csv", "parquet"]
+    )
 
     if uploaded_file is not None:
-        df = pd.read_excel(uploaded_file)
-
-        st.subheader("Uploaded Data")
-        st.dataframe(df)
-
-        required_cols = [
-            "building",
-            "building_area",
-            "roof",
-            "tilt_angle",
-            "orientation",
-            "module_efficiency",
-            "solar_irradiation",
-        ]
-        missing_cols = [col.lower() for col in required_cols if col not in df.columns]
+        try:
+            df, missing_cols, reader, parse_seconds = read_building_upload(
+                uploaded_file.name, uploaded_file.getvalue()
+            )
+        except Exception as error:
+            df, missing_cols = None, []
+            st.error(f"The file could not be read: {error}")
 
         if missing_cols:
             st.error(
-                f"The following columns are missing from the Excel file: {missing_cols}"
+                f"The following columns are missing from the uploaded file: {missing_cols}"
             )
 
-        else:
+        elif df is not None:
+            st.subheader("Uploaded Data")
+            st.caption(
+                f"Parsed {len(df):,} rows in {parse_seconds:.2f} s with {reader} "
+                f"({len(df) / max(parse_seconds, 1e-9):,.0f} rows/s)"
+            )
+            st.dataframe(df)
 
             # -------------------------------------------------
-            # Helper functions to compute Scheffler & TUM areas
+            # Compute Scheffler & TUM areas and yields for all rows at once
             # -------------------------------------------------
-
-            def compute_roof_area_scheffler(
-                building_area: float,
-                roof_type: str,
-                reduction_factor: float,
-                titl_angle: float,
-            ) -> float:
-                """Compute the roof area (Scheffler) given the building area, roof type, and tilt (in degrees).
-
-                Args:
-                    building_area (float): The area of the building in square meters.
-                    roof_type (str): The type of the roof.
-                    reduction_factor (float): The reduction factor.
-                    titl_angle (float): The pitch of the roof.
-
-                Returns:
-                    float: The roof area in square meters.
-                """
-                roof_type_lower = str(roof_type).lower()
-
-                if "flat" in roof_type_lower:
-                    return flat_roof_area_scheffler(building_area)
-
-                if "gable" in roof_type_lower:
-                    return gable_roof_area_scheffler(building_area, titl_angle)
-
-                elif "pitched" in roof_type_lower:
-                    return pitched_roof_area_scheffler(
-                        building_area, reduction_factor, titl_angle
-                    )
-
-                else:
-                    # If no match, default
+            try:
+                yields = SolarYieldModel.predict_configured(df, reduction_factor)
+            except ValueError as error:
+                yields = None
+                st.error(f"The yields could not be computed: {error}")
+
+            if yields is not None:
+                invalid_roofs = df.loc[yields["computed_scheffler_area"].isna(), "roof"]
+                for roof_type in invalid_roofs.unique():
                     st.warning(f"Invalid roof type: {roof_type}")
-                    return -1.0
-
-            def compute_roof_area_tum(
-                building_area: float,
-                roof_type: str,
-                reduction_factor: float,
-                titl_angle: float,
-            ) -> float:
-                """Compute the roof area (TUM) given the building area, roof type, and tilt (in degrees).
-
-                Args:
-                    building_area (float): The area of the building in square meters.
-                    roof_type (str): The type of the roof.
-                    reduction_factor (float): The reduction factor.
-                    titl_angle (float): The pitch of the roof.
-
-                Returns:
-                    float: The roof area in square meters.
-                """
-                roof_type_lower = str(roof_type).lower()
-
-                if "flat" in roof_type_lower:
-                    return flat_roof_area_tum(building_area)
-
-                if "gable" in roof_type_lower:
-                    return gable_roof_area_tum(
-                        building_area,
-                        reduction_factor=reduction_factor,
-                        titl_angle=titl_angle,
-                    )
-
-                elif "pitched":
-                    return pitched_roof_area_tum(
-                        building_area,
-                        reduction_factor=reduction_factor,
-                        titl_angle=titl_angle,
-                    )
-
-                else:
-                    # If no match, default
-                    st.warning(f"Invalid roof type: {roof_type}")
-                    return -1.0
+                df[yields.columns] = yields
+
+                # -------------------------------------------------
+                # Displays updated DataFrame
+                # -------------------------------------------------
+                st.subheader("Calculated Roof Areas and Yields per Building")
+                st.dataframe(df)
+
+                # -------------------------------------------------
+                # Summaries
+                # -------------------------------------------------
+                total_scheffler = df["scheffler_yield"].sum()
+                total_tum = df["tum_yield"].sum()
+                total_all = df["total_yield"].sum()
+
+                st.write("---")
+                st.write("### Summary of Total Yields")
+                st.success(f"**Total Scheffler Yield:** {total_scheffler:,.2f} kWh")
+                st.success(f"**Total TUM Yield:** {total_tum:,.2f} kWh")
+    else:
+        st.info(
+            "Please upload an Excel, CSV or Parquet file to start the total electricity yield calculation."
+        )
 
-            # -------------------------------------------------
-            # Compute Scheffler & TUM areas for each row
-            # -------------------------------------------------
-            df["computed_scheffler_area"] = df.apply(
-                lambda row: compute_roof_area_scheffler(
-                    row["building_area"],
-                    row["roof"],
-                    reduction_factor,
-                    row["tilt_angle"],
-                ),
-                axis=1,
-            )
 
-            df["computed_tum_area"] = df.apply(
-                lambda row: compute_roof_area_tum(
-                    row["building_area"],
-                    row["roof"],
-                    reduction_factor,
-                    row["tilt_angle"],
-                ),
-                axis=1,
-            )
+# -------------------------------------------------
+# Campus Sweep (Background Job)
+# -------------------------------------------------
+with tab_campus_sweep:
+    st.header("Campus Sweep")
 
-            # -------------------------------------------------
-            # Compute yields
-            # -------------------------------------------------
-            def compute_row_yields(row: pd.Series) -> tuple:
-                """Compute the electricity yields (Scheffler & TUM) for a given row.
-
-                Args:
-                    row (pd.Series): A row from the DataFrame.
-
-                Returns:
-                    tuple: The Scheffler and TUM electricity yields.
-                """
-                tilt_deg = row["tilt_angle"]
-                orientation_deg = row["orientation"]
-                rel_yield = get_relative_yield(int(orientation_deg), int(tilt_deg))
-
-                solar_irr = row["solar_irradiation"]
-                eff = row["module_efficiency"]
-
-                # Electricity yield according to Scheffler
-                scheffler_yield = annual_solar_yield(
-                    roof_area=row["computed_scheffler_area"],
-                    solar_irradiation=solar_irr,
-                    module_efficiency=eff,
-                    relative_yield=rel_yield,
-                )
+    st.write(
+        """
+        Runs the campus calculation (like `python stromertrag.py --fused`) in a
+        background worker. Jobs are queued and processed one after another. Submitting
+        the same parameters and input files again reuses the queued, running or
+        finished job instead of computing it twice.
+        """
+    )
 
-                # Electricity yield according to TUM
-                tum_yield = annual_solar_yield(
-                    roof_area=row["computed_tum_area"],
-                    solar_irradiation=solar_irr,
-                    module_efficiency=eff,
-                    relative_yield=rel_yield,
-                )
+    job_runner = get_job_runner()
 
-                return scheffler_yield, tum_yield
+    sweep_building_file = st.text_input(
+        "Building inventory (CSV)",
+        value="data/grundflaeche.csv",
+        key="sweep_building_file",
+    )
+    sweep_irradiance_file = st.text_input(
+        "Hourly irradiance (CSV)",
+        value=globalstrahlung_datei,
+        key="sweep_irradiance_file",
+    )
+    sweep_transposition = st.checkbox(
+        "Plane-of-array transposition", value=False, key="sweep_transposition"
+    )
+    sweep_rollups = st.multiselect(
+        "Rollups", ROLLUP_AUFLOESUNGEN, default=[], key="sweep_rollups"
+    )
 
-            df["scheffler_yield"], df["tum_yield"] = zip(
-                *df.apply(compute_row_yields, axis=1)
+    if st.button("Queue Sweep", key="sweep_submit"):
+        try:
+            job_id, started = job_runner.einreichen(
+                erstelle_parameter(
+                    sweep_building_file,
+                    sweep_irradiance_file,
+                    sweep_transposition,
+                    sweep_rollups,
+                )
             )
-            df["total_yield"] = df["scheffler_yield"] + df["tum_yield"]
+        except FileNotFoundError as error:
+            st.error(str(error))
+        except RuntimeError as error:
+            # e.g. BrokenProcessPool if the worker could not be restarted
+            st.error(f"The job could not be queued: {error}")
+        else:
+            if started:
+                st.success(f"Job **{job_id}** queued.")
+            else:
+                st.info(
+                    f"Identical job **{job_id}** is already queued, running or done."
+                )
 
-            # -------------------------------------------------
-            # Displays updated DataFrame
-            # -------------------------------------------------
-            st.subheader("Calculated Roof Areas and Yields per Building")
-            st.dataframe(df)
+    @st.fragment(run_every=2)
+    def show_job_queue() -> None:
+        """Shows all jobs with live progress; refreshes every 2 seconds."""
+        jobs = job_runner.jobs()
+        if not jobs:
+            st.info("No jobs submitted yet.")
+            return
+
+        for status in jobs:
+            job_id = status["job_id"]
+            state = status.get("zustand")
+            done = status.get("fertig") or 0
+            total = status.get("gesamt")
+
+            col_info, col_progress, col_action = st.columns([3, 4, 1])
+            col_info.write(f"**{job_id}** · {state}")
+            col_info.caption(
+                f"Submitted {status.get('eingereicht')} · {status.get('parameter')}"
+            )
+            if total:
+                col_progress.progress(done / total, text=f"{done}/{total} buildings")
+            if state == FEHLGESCHLAGEN:
+                col_progress.error(status.get("fehler"))
+            if state in [WARTEND, LAUFEND]:
+                col_action.button(
+                    "Cancel",
+                    key=f"sweep_cancel_{job_id}",
+                    on_click=job_runner.abbrechen,
+                    args=(job_id,),
+                )
 
-            # -------------------------------------------------
-            # Summaries
-            # -------------------------------------------------
-            total_scheffler = df["scheffler_yield"].sum()
-            total_tum = df["tum_yield"].sum()
-            total_all = df["total_yield"].sum()
-
-            st.write("---")
-            st.write("### Summary of Total Yields")
-            st.success(f"**Total Scheffler Yield:** {total_scheffler:,.2f} kWh")
-            st.success(f"**Total TUM Yield:** {total_tum:,.2f} kWh")
-    else:
-        st.info(
-            "Please upload an Excel file to start the total electricity yield calculation."
+    st.subheader("Job Queue")
+    show_job_queue()
+
+    finished_jobs = {
+        status["job_id"]: status
+        for status in job_runner.jobs()
+        if status.get("zustand") == FERTIG
+    }
+    if finished_jobs:
+        st.subheader("Results")
+        selected_job = st.selectbox(
+            "Finished job", list(finished_jobs), key="sweep_result_job"
+        )
+        selected_result = st.selectbox(
+            "Result",
+            finished_jobs[selected_job].get("ergebnisse", ["aggregate"]),
+            key="sweep_result_name",
+        )
+
+        result = load_job_result(selected_job, selected_result)
+        st.caption(f"{len(result):,} rows (showing the first 1,000)")
+        st.dataframe(result.head(1000))
+        st.download_button(
+            "Download CSV",
+            data=job_result_as_csv(selected_job, selected_result),
+            file_name=f"{selected_job}_{selected_result}.csv",
+            mime="text/csv",
+            key="sweep_download",
         )
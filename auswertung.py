@@ -23,14 +23,69 @@ für jede Stunde des Tages:
 - Die durchschnittliche Leistung
 - Die minimale Leistung
 
-Danach wird das Ergebnis graphisch dargestellt, die aggregierten Werte in eine Excel-Datei geschrieben und die Plots als PNG gespeichert.
+Danach werden die aggregierten Werte in eine Excel-Datei geschrieben und mit --plots pro Gebäude und Berechnungsart als PNG in data/plots/ gespeichert (matplotlib, optional; unveränderte Plots werden übersprungen).
+
+Backends (--backend):
+    - pandas: Spalten pro Gebäude mit Kategorien und kompakten Datentypen,
+      groupby-Schleife in Python (Standard, --memory-report zeigt den Speicherbedarf)
+    - polars: Zerlegen der Keys, Stunden-Flooring, min/avg/max und Sortierung als
+      Lazy-Query in Polars auf allen Kernen (optional, pip install polars)
 """
 
+import argparse
+import hashlib
+import json
 import ijson
 from openpyxl import load_workbook
 from datetime import datetime
+import numpy as np
 import pandas as pd
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import polars as pl
+except ImportError:  # optional, nur für --backend polars
+    pl = None
+
+try:
+    # Figure ohne pyplot zeichnet mit dem Agg-Backend, ohne Fenster und globalen Zustand
+    from matplotlib.figure import Figure
+except ImportError:  # optional, nur für --plots
+    Figure = None
+
+MATPLOTLIB_VERFUEGBAR = Figure is not None
+
+ROLLUP_AUFLOESUNGEN = ["hour_of_day", "day", "week", "month", "season"]
+
+BACKENDS = ["pandas", "polars"]
+
+BERECHNUNGSARTEN = ["scheaffler", "tum"]
+DACHTYPEN = ["flat", "gable", "pitched"]
+
+# Spalten der eingelesenen Datensätze pro Gebäude im pandas-Backend (building kommt
+# beim Verbinden dazu). building, berechnungsart, roof_type und wirkungsgrad sind
+# Kategorien, orientation und tilt Int16 und relative_yield Float64, fehlende Werte
+# jeweils pd.NA. Die Leistung bleibt Decimal wie von ijson gelesen.
+ROHSPALTEN = [
+    "berechnungsart",
+    "roof_type",
+    "wirkungsgrad",
+    "globalstrahlung",
+    "datum",
+    "leistung",
+    "relative_yield",
+    "orientation",
+    "tilt",
+]
+
+JAHRESZEITEN = ["Winter", "Frühling", "Sommer", "Herbst"]
+
+PLOT_ORDNER = "data/plots"
+# Erhöhen, wenn sich das Aussehen der Plots ändert, damit alle neu gezeichnet werden
+PLOT_VERSION = 1
 
 
 def _remove_leistung_prefix(key: str) -> tuple:
@@ -163,10 +218,46 @@ def aggregate_group(group: pd.DataFrame) -> pd.DataFrame:
     return pd.DataFrame([min_row, avg_row, max_row])
 
 
-def auswertung():
-    """Hauptfunktion zur Auswertung der Daten aus der ergebnisse.json."""
-    data_rows = []
-    with open("data/ergebnisse.json", "rb") as f:
+def auswertung(backend: str = "pandas", speicherbericht: bool = False) -> pd.DataFrame:
+    """Hauptfunktion zur Auswertung der Daten aus der ergebnisse.json.
+
+    Args:
+        backend (str): Eines der BACKENDS.
+        speicherbericht (bool): Im pandas-Backend den Speicherbedarf der
+            eingelesenen Datensätze ausgeben (siehe erstelle_speicherbericht).
+
+    Returns:
+        pd.DataFrame: Die sortierten, aggregierten Daten.
+    """
+    if backend == "polars":
+        aggregated = aggregiere_ergebnisse_polars()
+    else:
+        aggregated = aggregiere_ergebnisse(speicherbericht=speicherbericht)
+    speichere_aggregate_als_excel(aggregated)
+    return aggregated
+
+
+def aggregiere_ergebnisse(
+    pfad: str = "data/ergebnisse.json", speicherbericht: bool = False
+) -> pd.DataFrame:
+    """Liest die ergebnisse.json ein und berechnet min, avg und max der Leistung
+    pro Gebäude, Berechnungsart und Stunde.
+
+    Die Datensätze werden pro Gebäude spaltenweise gesammelt und mit kompakten
+    Datentypen abgelegt (siehe ROHSPALTEN). Die Leistung bleibt Decimal aus ijson,
+    die Aggregation läuft wie bisher pro Gruppe über aggregate_group.
+
+    Args:
+        pfad (str): Pfad zur ergebnisse.json.
+        speicherbericht (bool): Den Speicherbedarf der eingelesenen Datensätze vor
+            und nach der Umstellung auf kompakte Datentypen ausgeben.
+
+    Returns:
+        pd.DataFrame: Die sortierten, aggregierten Daten.
+    """
+    gebaeude_namen = []
+    bloecke = []
+    with open(pfad, "rb") as f:
         for building_obj in ijson.items(f, "item"):
             building_name = building_obj.get("building")
             if not building_name:
@@ -176,6 +267,7 @@ def auswertung():
                 )
                 continue
 
+            spalten = {spalte: [] for spalte in ROHSPALTEN}
             for key, value in building_obj.items():
                 key_without_prefix, valid_key = _remove_leistung_prefix(key)
                 if not valid_key:
@@ -245,46 +337,320 @@ def auswertung():
                     )
                     continue
 
-                record = {
-                    "building": building_name,
-                    "berechnungsart": key_berechnungsart,
-                    "roof_type": roof_type_key,
-                    "wirkungsgrad": wirkungsgrad,
-                    "globalstrahlung": globalstrahlung,
-                    "datum": zeitstempel,
-                    "leistung": value,
-                }
+                spalten["berechnungsart"].append(key_berechnungsart)
+                spalten["roof_type"].append(roof_type_key)
+                spalten["wirkungsgrad"].append(wirkungsgrad)
+                spalten["globalstrahlung"].append(globalstrahlung)
+                spalten["datum"].append(zeitstempel)
+                spalten["leistung"].append(value)
 
                 if roof_type_key == "flat":
-                    record["relative_yield"] = relative_yield
-                    record["orientation"] = None
-                    record["tilt"] = None
+                    spalten["relative_yield"].append(relative_yield)
+                    spalten["orientation"].append(None)
+                    spalten["tilt"].append(None)
                 elif roof_type_key in ["pitched", "gable"]:
-                    record["relative_yield"] = None
-                    record["orientation"] = orientation
-                    record["tilt"] = tilt
-
-                data_rows.append(record)
-
-    df = pd.DataFrame(data_rows)
+                    spalten["relative_yield"].append(None)
+                    spalten["orientation"].append(orientation)
+                    spalten["tilt"].append(tilt)
+
+            if spalten["leistung"]:
+                gebaeude_namen.append(building_name)
+                bloecke.append(_kompakter_block(spalten))
+
+    df = _verbinde_bloecke(gebaeude_namen, bloecke)
+    del bloecke
+    if speicherbericht:
+        print(erstelle_speicherbericht(df).to_string())
     df["hour"] = df["datum"].dt.floor("h")
 
-    groups = df.groupby(["building", "berechnungsart", "hour"])
+    groups = df.groupby(["building", "berechnungsart", "hour"], observed=True)
     aggregated_list = []
     for _, group in groups:
         agg_group = aggregate_group(group)
         aggregated_list.append(agg_group)
     aggregated = pd.concat(aggregated_list, ignore_index=True)
+    aggregated.drop(columns=["datum"], inplace=True)
+
+    return sortiere_aggregate(_ausgabe_layout(aggregated))
+
+
+def _kompakter_block(spalten: dict[str, list]) -> pd.DataFrame:
+    """Wandelt die Spalten-Listen eines Gebäudes in ein DataFrame mit kompakten
+    Datentypen um (siehe ROHSPALTEN).
+    """
+    return pd.DataFrame(
+        {
+            "berechnungsart": pd.Categorical(
+                spalten["berechnungsart"], categories=BERECHNUNGSARTEN
+            ),
+            "roof_type": pd.Categorical(spalten["roof_type"], categories=DACHTYPEN),
+            "wirkungsgrad": np.array(spalten["wirkungsgrad"], dtype=np.float64),
+            "globalstrahlung": np.array(spalten["globalstrahlung"], dtype=np.float64),
+            "datum": pd.to_datetime(spalten["datum"]),
+            "leistung": np.array(spalten["leistung"], dtype=object),
+            "relative_yield": pd.array(spalten["relative_yield"], dtype="Float64"),
+            "orientation": pd.array(spalten["orientation"], dtype="Int16"),
+            "tilt": pd.array(spalten["tilt"], dtype="Int16"),
+        }
+    )
+
+
+def _verbinde_bloecke(
+    gebaeude_namen: list[str], bloecke: list[pd.DataFrame]
+) -> pd.DataFrame:
+    """Hängt die Blöcke der Gebäude aneinander.
+
+    building wird erst hier als Kategorie ergänzt und der Wirkungsgrad zur
+    Kategorie, damit alle Blöcke dieselben Kategorien haben.
+    """
+    df = pd.concat(bloecke, ignore_index=True)
+    namen = sorted(set(gebaeude_namen))
+    position = {name: code for code, name in enumerate(namen)}
+    codes = np.repeat(
+        [position[name] for name in gebaeude_namen],
+        [len(block) for block in bloecke],
+    )
+    df.insert(0, "building", pd.Categorical.from_codes(codes, categories=namen))
+    df["wirkungsgrad"] = df["wirkungsgrad"].astype("category")
+    return df
+
+
+def erstelle_speicherbericht(df: pd.DataFrame) -> pd.DataFrame:
+    """Vergleicht den Speicherbedarf (memory_usage(deep=True)) pro Spalte vor und
+    nach der Umstellung auf kompakte Datentypen.
+
+    Der Wert vorher wird aus den Daten berechnet, ohne das alte Layout anzulegen:
+    building, berechnungsart und roof_type waren Python-Strings (8 Byte Zeiger plus
+    sys.getsizeof pro Zeile), wirkungsgrad, relative_yield, orientation und tilt
+    float64 mit NaN. Die übrigen Spalten sind unverändert.
+
+    Args:
+        df (pd.DataFrame): Die eingelesenen Datensätze aus aggregiere_ergebnisse.
+
+    Returns:
+        pd.DataFrame: Pro Spalte und insgesamt Datentyp und MB vorher und nachher.
+    """
+    nachher = df.memory_usage(deep=True, index=False)
+    dtype_vorher = df.dtypes.astype(str)
+    bytes_vorher = nachher.copy()
+    for spalte in ["building", "berechnungsart", "roof_type"]:
+        kategorien = df[spalte].cat.categories
+        anzahl = np.bincount(df[spalte].cat.codes, minlength=len(kategorien))
+        groessen = np.array([sys.getsizeof(wert) for wert in kategorien])
+        dtype_vorher[spalte] = "object"
+        bytes_vorher[spalte] = 8 * len(df) + int(anzahl @ groessen)
+    for spalte in ["wirkungsgrad", "relative_yield", "orientation", "tilt"]:
+        dtype_vorher[spalte] = "float64"
+        bytes_vorher[spalte] = 8 * len(df)
+
+    bericht = pd.DataFrame(
+        {
+            "dtype_vorher": dtype_vorher,
+            "mb_vorher": bytes_vorher / 1e6,
+            "dtype_nachher": df.dtypes.astype(str),
+            "mb_nachher": nachher / 1e6,
+        }
+    )
+    bericht.loc["gesamt"] = [
+        "",
+        bericht["mb_vorher"].sum(),
+        "",
+        bericht["mb_nachher"].sum(),
+    ]
+    return bericht.round(2)
+
+
+def _ausgabe_layout(aggregated: pd.DataFrame) -> pd.DataFrame:
+    """Wandelt die Aggregate in die bisherigen Spaltentypen der Ausgabe zurück
+    (Strings und float64 mit NaN), wie sie auch berechne_aggregate liefert.
+    """
+    for spalte in ["building", "berechnungsart", "roof_type"]:
+        aggregated[spalte] = aggregated[spalte].astype(object)
+    for spalte in ["wirkungsgrad", "relative_yield", "orientation", "tilt"]:
+        aggregated[spalte] = aggregated[spalte].to_numpy(
+            dtype=np.float64, na_value=np.nan
+        )
+    return aggregated
+
+
+def _wert_nach(marke: str) -> "pl.Expr":
+    """Float-Wert nach einer Marke im Key wie bei _get_relative_yield und Co."""
+    return pl.col("key").str.extract(f"{marke}([^_]*)").cast(pl.Float64, strict=False)
+
+
+def _aggregiere_gebaeude_polars(
+    building: str, keys: list[str], leistungen: list[float]
+) -> "pl.LazyFrame":
+    """Lazy-Query für min, avg und max eines Gebäudes wie aggregate_group.
+
+    Die Keys werden mit denselben Regeln wie in aggregiere_ergebnisse zerlegt,
+    ungültige Keys fallen weg. Polars behält die Reihenfolge innerhalb einer
+    Gruppe bei, daher liefern arg_min/arg_max wie idxmin/idxmax den ersten
+    Datensatz und der Durchschnittsrecord übernimmt die Felder des ersten.
+
+    Args:
+        building (str): Name des Gebäudes.
+        keys (list[str]): Keys mit 'leistung_'-Präfix.
+        leistungen (list[float]): Leistung pro Key.
+
+    Returns:
+        pl.LazyFrame: Aggregierte Zeilen des Gebäudes, unsortiert.
+    """
+    rest = pl.col("key").str.strip_prefix("leistung_")
+    teile = pl.col("key").str.split("_")
+    roof_type = pl.col("roof_type")
+
+    records = (
+        pl.LazyFrame(
+            {"key": keys, "leistung": leistungen},
+            schema={"key": pl.String, "leistung": pl.Float64},
+        )
+        .with_row_index("zeile")
+        .with_columns(rest.alias("key"))
+        .with_columns(
+            teile.list.get(0, null_on_oob=True).alias("berechnungsart"),
+            teile.list.get(1, null_on_oob=True).alias("roof_type"),
+            _wert_nach("_wirkungsgrad_").alias("wirkungsgrad"),
+            _wert_nach("_globalstrahlung_").alias("globalstrahlung"),
+            pl.col("key")
+            .str.extract("_zeitstempel_(.*)$")
+            .str.replace_all("\ufeff", "", literal=True)
+            .str.strip_chars()
+            .str.to_datetime("%d.%m.%Y %H:%M", time_unit="ns", strict=False)
+            .alias("datum"),
+        )
+        .with_columns(
+            pl.when(roof_type == "flat")
+            .then(_wert_nach("_relative_yield_"))
+            .alias("relative_yield"),
+            pl.when(roof_type != "flat")
+            .then(_wert_nach("_with_orientation_"))
+            .alias("orientation"),
+            pl.when(roof_type != "flat").then(_wert_nach("_tilt_")).alias("tilt"),
+        )
+        .filter(
+            pl.col("berechnungsart").is_in(["scheaffler", "tum"]),
+            roof_type.is_in(["flat", "pitched", "gable"]),
+            pl.when(roof_type == "flat")
+            .then(pl.col("relative_yield").is_not_null())
+            .otherwise(
+                pl.col("orientation").is_not_null() & pl.col("tilt").is_not_null()
+            ),
+            pl.col("wirkungsgrad").is_not_null(),
+            pl.col("globalstrahlung").is_not_null(),
+            pl.col("datum").is_not_null(),
+        )
+        .with_columns(
+            pl.lit(building).alias("building"),
+            pl.col("datum").dt.truncate("1h").alias("hour"),
+        )
+    )
+
+    gruppen = records.group_by(["berechnungsart", "hour"]).agg(
+        pl.col("zeile").get(pl.col("leistung").arg_min()).alias("min"),
+        pl.col("zeile").first().alias("avg"),
+        pl.col("zeile").get(pl.col("leistung").arg_max()).alias("max"),
+        pl.col("leistung").mean().alias("leistung_avg"),
+    )
+
+    spalten = [
+        "building",
+        "berechnungsart",
+        "roof_type",
+        "wirkungsgrad",
+        "globalstrahlung",
+        "leistung",
+        "relative_yield",
+        "orientation",
+        "tilt",
+        "hour",
+        "statistic",
+    ]
+    felder = records.drop("berechnungsart", "hour")
+    statistiken = []
+    for statistic in ["min", "avg", "max"]:
+        zeilen = gruppen.select(
+            "berechnungsart", "hour", pl.col(statistic).alias("zeile"), "leistung_avg"
+        ).join(felder, on="zeile")
+        if statistic == "avg":
+            zeilen = zeilen.with_columns(pl.col("leistung_avg").alias("leistung"))
+        statistiken.append(
+            zeilen.with_columns(pl.lit(statistic).alias("statistic")).select(spalten)
+        )
+    return pl.concat(statistiken)
+
+
+def aggregiere_ergebnisse_polars(pfad: str = "data/ergebnisse.json") -> pd.DataFrame:
+    """Wie aggregiere_ergebnisse, aber mit Polars statt Python-Schleifen.
+
+    ijson liest nur die Keys und Leistungen der Gebäude. Zerlegen der Keys,
+    Flooring auf die Stunde, min/avg/max und Sortierung laufen als eine
+    Lazy-Query, die Polars parallel auf allen Kernen ausführt. Die Leistung
+    wird als Float statt als Decimal gelesen, der Durchschnitt kann daher in
+    der letzten Stelle abweichen.
+
+    Args:
+        pfad (str): Pfad zur ergebnisse.json.
+
+    Returns:
+        pd.DataFrame: Die sortierten, aggregierten Daten wie bei aggregiere_ergebnisse.
+    """
+    if pl is None:
+        raise ImportError("Für das Polars-Backend muss polars installiert sein")
+
+    gebaeude = []
+    with open(pfad, "rb") as f:
+        for building_obj in ijson.items(f, "item"):
+            building_name = building_obj.get("building")
+            if not building_name:
+                print("Fehlendes 'building' in Objekt:", building_obj)
+                continue
+
+            keys = [key for key in building_obj if key.startswith("leistung_")]
+            gebaeude.append(
+                _aggregiere_gebaeude_polars(
+                    building_name, keys, [building_obj[key] for key in keys]
+                )
+            )
+
+    stat_order = pl.col("statistic").replace_strict(
+        {"min": 0, "avg": 1, "max": 2}, return_dtype=pl.Int8
+    )
+    aggregated = (
+        pl.concat(gebaeude)
+        .sort(["building", "berechnungsart", stat_order, "hour"])
+        .collect()
+        .to_pandas()
+    )
+    aggregated["hour"] = aggregated["hour"].astype("datetime64[ns]")
+    return aggregated
+
 
+def sortiere_aggregate(aggregated: pd.DataFrame) -> pd.DataFrame:
+    """Sortiert die aggregierten Daten nach Gebäude, Berechnungsart, Statistik
+    (min, avg, max) und Stunde.
+
+    Args:
+        aggregated (pd.DataFrame): Die aggregierten Daten.
+
+    Returns:
+        pd.DataFrame: Die sortierten Daten.
+    """
     stat_order = {"min": 0, "avg": 1, "max": 2}
     aggregated["stat_order"] = aggregated["statistic"].map(stat_order)
     aggregated.sort_values(
         by=["building", "berechnungsart", "stat_order", "hour"], inplace=True
     )
     aggregated.drop(columns=["stat_order"], inplace=True)
-    aggregated.drop(columns=["datum"], inplace=True)
+    return aggregated
+
+
+def speichere_aggregate_als_excel(aggregated: pd.DataFrame) -> None:
+    """Speichert die aggregierten Daten als Excel-Datei, eine pro Gebäude.
 
-    # Speichern in Excel-Dateien, eine pro Gebäude
+    Args:
+        aggregated (pd.DataFrame): Die sortierten, aggregierten Daten.
+    """
     excel_folder = "data"
     if not os.path.exists(excel_folder):
         os.makedirs(excel_folder)
@@ -316,5 +682,332 @@ def auswertung():
         print(f"Die Spaltenbreiten in der Datei '{excel_filename}' wurden angepasst.")
 
 
+def _summen_nach_perioden(matrix: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Summiert die Spalten der Matrix abschnittsweise nach Periodencodes.
+
+    Sind die Codes aufsteigend sortiert, bilden sie zusammenhängende Abschnitte
+    und werden direkt mit np.add.reduceat summiert. Sonst werden die Spalten
+    vorher stabil nach Code sortiert.
+
+    Args:
+        matrix (np.ndarray): Leistung mit Form (Reihen, Stunden).
+        codes (np.ndarray): Periodencode pro Stunde.
+
+    Returns:
+        np.ndarray: Summen mit Form (Reihen, Perioden).
+    """
+    if np.any(codes[1:] < codes[:-1]):
+        reihenfolge = np.argsort(codes, kind="stable")
+        matrix = matrix[:, reihenfolge]
+        codes = codes[reihenfolge]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    return np.add.reduceat(matrix, starts, axis=1)
+
+
+def _perioden(stunden: np.ndarray, aufloesung: str) -> tuple[np.ndarray, np.ndarray]:
+    """Berechnet für jede Stunde den Code und die Bezeichnung ihrer Periode.
+
+    Args:
+        stunden (np.ndarray): Aufsteigende Stunden als datetime64.
+        aufloesung (str): Eine der ROLLUP_AUFLOESUNGEN.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Codes pro Stunde und Bezeichnungen pro Periode.
+    """
+    tage = stunden.astype("datetime64[D]")
+    monate = stunden.astype("datetime64[M]")
+
+    if aufloesung == "hour_of_day":
+        codes = (stunden - tage).astype("timedelta64[h]").astype(np.int64)
+    elif aufloesung == "day":
+        codes = tage.astype(np.int64)
+    elif aufloesung == "week":
+        # 1970-01-01 war ein Donnerstag, daher ergibt (Tag + 3) // 7 ISO-Wochen ab Montag
+        codes = (tage.astype(np.int64) + 3) // 7
+    elif aufloesung == "month":
+        codes = monate.astype(np.int64)
+    elif aufloesung == "season":
+        # Meteorologische Jahreszeiten: Dezember bis Februar ist Winter
+        codes = (monate.astype(np.int64) % 12 + 1) // 3 % 4
+    else:
+        raise ValueError(f"Unbekannte Auflösung: {aufloesung}")
+
+    eindeutige_codes = np.unique(codes)
+    if aufloesung == "day":
+        bezeichnungen = eindeutige_codes.astype("datetime64[D]")
+    elif aufloesung == "week":
+        bezeichnungen = (eindeutige_codes * 7 - 3).astype("datetime64[D]")
+    elif aufloesung == "month":
+        bezeichnungen = eindeutige_codes.astype("datetime64[M]")
+    elif aufloesung == "season":
+        bezeichnungen = np.array([JAHRESZEITEN[code] for code in eindeutige_codes])
+    else:
+        bezeichnungen = eindeutige_codes
+
+    return codes, bezeichnungen
+
+
+def berechne_rollups(aggregated: pd.DataFrame, aufloesung: str) -> pd.DataFrame:
+    """Summiert die stündliche Leistung nach Tageszeit, Tag, Woche, Monat oder Jahreszeit.
+
+    Die sortierten Aggregate bestehen aus gleich langen, zusammenhängenden
+    Stundenreihen pro Gebäude, Berechnungsart und Statistik. Diese werden ohne
+    groupby zu einer Matrix umgeformt und spaltenweise summiert.
+
+    Args:
+        aggregated (pd.DataFrame): Die sortierten, aggregierten Daten.
+        aufloesung (str): Eine der ROLLUP_AUFLOESUNGEN.
+
+    Returns:
+        pd.DataFrame: Summen pro Gebäude, Berechnungsart, Statistik und Periode.
+    """
+    stunden = aggregated["hour"].to_numpy(dtype="datetime64[ns]")
+    neue_reihen = np.flatnonzero(stunden[1:] <= stunden[:-1]) + 1
+    anzahl_stunden = int(neue_reihen[0]) if len(neue_reihen) else len(stunden)
+    anzahl_reihen = len(stunden) // anzahl_stunden
+
+    stunden_achse = stunden[:anzahl_stunden]
+    if len(stunden) % anzahl_stunden != 0 or not np.array_equal(
+        stunden.reshape(anzahl_reihen, anzahl_stunden),
+        np.broadcast_to(stunden_achse, (anzahl_reihen, anzahl_stunden)),
+    ):
+        raise ValueError("Die Stundenreihen der Aggregate sind nicht einheitlich")
+
+    matrix = (
+        aggregated["leistung"]
+        .to_numpy(dtype=np.float64)
+        .reshape(anzahl_reihen, anzahl_stunden)
+    )
+    codes, bezeichnungen = _perioden(stunden_achse, aufloesung)
+
+    ist_raster = (
+        aufloesung == "hour_of_day"
+        and anzahl_stunden % 24 == 0
+        and np.array_equal(codes, np.tile(np.arange(24), anzahl_stunden // 24))
+    )
+    if ist_raster:
+        # Volle Tage: (Reihen, Tage, 24) über die Tage summieren
+        summen = matrix.reshape(anzahl_reihen, -1, 24).sum(axis=1)
+    else:
+        summen = _summen_nach_perioden(matrix, codes)
+
+    schluessel = aggregated.iloc[::anzahl_stunden][
+        ["building", "berechnungsart", "statistic"]
+    ]
+    anzahl_perioden = summen.shape[1]
+    return pd.DataFrame(
+        {
+            "building": np.repeat(schluessel["building"].to_numpy(), anzahl_perioden),
+            "berechnungsart": np.repeat(
+                schluessel["berechnungsart"].to_numpy(), anzahl_perioden
+            ),
+            "statistic": np.repeat(schluessel["statistic"].to_numpy(), anzahl_perioden),
+            aufloesung: np.tile(bezeichnungen, anzahl_reihen),
+            "leistung": summen.ravel(),
+        }
+    )
+
+
+def speichere_rollups(aggregated: pd.DataFrame, aufloesungen: list[str]) -> None:
+    """Berechnet die Rollups und speichert sie als data/rollup_{aufloesung}.xlsx.
+
+    Args:
+        aggregated (pd.DataFrame): Die sortierten, aggregierten Daten.
+        aufloesungen (list[str]): Auflösungen aus ROLLUP_AUFLOESUNGEN.
+    """
+    for aufloesung in aufloesungen:
+        start = time.perf_counter()
+        rollup = berechne_rollups(aggregated, aufloesung)
+        dauer_ms = (time.perf_counter() - start) * 1000
+
+        excel_filename = os.path.join("data", f"rollup_{aufloesung}.xlsx")
+        rollup.to_excel(excel_filename, index=False)
+        print(
+            f"Rollup '{aufloesung}' in {dauer_ms:.1f} ms berechnet und in '{excel_filename}' gespeichert."
+        )
+
+
+def _plot_aufgaben(aggregated: pd.DataFrame, ordner: str) -> list[dict]:
+    """Zerlegt die Aggregate in eine Plot-Aufgabe pro Gebäude und Berechnungsart.
+
+    Der Hash deckt alles ab, was im Bild landet (Titel, Stunden, Leistungen und
+    PLOT_VERSION). Der Dateiname enthält einen kurzen Hash von Gebäude und
+    Berechnungsart, weil safe_filename z.B. "B 1" und "B_1" gleich abbildet.
+    """
+    aufgaben = []
+    for (building, berechnungsart), gruppe in aggregated.groupby(
+        ["building", "berechnungsart"], sort=False
+    ):
+        reihen = {
+            statistik: gruppe[gruppe["statistic"] == statistik]
+            for statistik in ["min", "avg", "max"]
+        }
+        stunden = {
+            statistik: reihe["hour"].to_numpy(dtype="datetime64[s]")
+            for statistik, reihe in reihen.items()
+        }
+        leistung = {
+            statistik: reihe["leistung"].to_numpy(dtype=np.float64)
+            for statistik, reihe in reihen.items()
+        }
+        titel = f"{building} ({berechnungsart})"
+        schluessel = hashlib.sha256(
+            f"{building}|{berechnungsart}".encode("utf-8")
+        ).hexdigest()
+
+        sha = hashlib.sha256(f"{PLOT_VERSION}|{titel}".encode())
+        for statistik in reihen:
+            sha.update(statistik.encode())
+            sha.update(stunden[statistik].tobytes())
+            sha.update(leistung[statistik].tobytes())
+
+        aufgaben.append(
+            {
+                "pfad": os.path.join(
+                    ordner,
+                    f"{safe_filename(str(building))}_{berechnungsart}"
+                    f".{schluessel[:16]}.png",
+                ),
+                "hash": sha.hexdigest(),
+                "titel": titel,
+                "stunden": stunden,
+                "leistung": leistung,
+            }
+        )
+    return aufgaben
+
+
+def zeichne_plot(aufgabe: dict) -> str:
+    """Zeichnet min, avg und max der Leistung eines Gebäudes und einer
+    Berechnungsart über das Jahr und speichert das Bild als PNG.
+
+    Args:
+        aufgabe (dict): Eine Aufgabe aus _plot_aufgaben.
+
+    Returns:
+        str: Pfad des PNG.
+    """
+    fig = Figure(figsize=(12, 4), dpi=100)
+    ax = fig.add_subplot()
+    stunden, leistung = aufgabe["stunden"], aufgabe["leistung"]
+    ax.plot(stunden["max"], leistung["max"], linewidth=0.5, label="max")
+    ax.plot(stunden["avg"], leistung["avg"], linewidth=0.5, label="avg")
+    ax.plot(stunden["min"], leistung["min"], linewidth=0.5, label="min")
+    ax.set_title(aufgabe["titel"])
+    ax.set_xlabel("Stunde")
+    ax.set_ylabel("Leistung in W")
+    ax.legend(loc="upper right")
+    # Feste Ränder statt tight_layout, das die Figur ein zweites Mal zeichnen würde
+    fig.subplots_adjust(left=0.07, right=0.98, top=0.92, bottom=0.12)
+
+    temporaer = f"{aufgabe['pfad']}.tmp.png"
+    fig.savefig(temporaer)
+    os.replace(temporaer, aufgabe["pfad"])
+    return aufgabe["pfad"]
+
+
+def speichere_plots(
+    aggregated: pd.DataFrame, ordner: str = PLOT_ORDNER, prozesse: int | None = None
+) -> None:
+    """Zeichnet pro Gebäude und Berechnungsart einen Plot von min, avg und max
+    parallel in einem Prozesspool.
+
+    Die Hashes der gezeichneten Daten stehen in {ordner}/plots.json. Plots, deren
+    Daten sich nicht geändert haben und deren PNG noch existiert, werden übersprungen.
+    Fehlgeschlagene Plots halten die übrigen nicht auf. Der Index wird in jedem Fall
+    für alle fertigen Plots geschrieben, danach werden die Fehler gemeldet.
+
+    Args:
+        aggregated (pd.DataFrame): Die sortierten, aggregierten Daten.
+        ordner (str): Ordner für die PNG-Dateien.
+        prozesse (int | None): Anzahl Prozesse (Standard: alle Kerne).
+
+    Raises:
+        RuntimeError: Wenn mindestens ein Plot nicht gezeichnet werden konnte.
+    """
+    if not MATPLOTLIB_VERFUEGBAR:
+        raise ImportError("Für die Plots muss matplotlib installiert sein")
+
+    start = time.perf_counter()
+    os.makedirs(ordner, exist_ok=True)
+    index_pfad = os.path.join(ordner, "plots.json")
+    index = {}
+    if os.path.exists(index_pfad):
+        with open(index_pfad, encoding="utf-8") as f:
+            index = json.load(f)
+
+    aufgaben = _plot_aufgaben(aggregated, ordner)
+    offen = [
+        aufgabe
+        for aufgabe in aufgaben
+        if index.get(os.path.basename(aufgabe["pfad"])) != aufgabe["hash"]
+        or not os.path.exists(aufgabe["pfad"])
+    ]
+    fehler = []
+    if offen:
+        try:
+            with ProcessPoolExecutor(max_workers=prozesse) as pool:
+                futures = {
+                    pool.submit(zeichne_plot, aufgabe): aufgabe for aufgabe in offen
+                }
+                for future in as_completed(futures):
+                    aufgabe = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        fehler.append(f"{os.path.basename(aufgabe['pfad'])}: {e}")
+                        continue
+                    index[os.path.basename(aufgabe["pfad"])] = aufgabe["hash"]
+        finally:
+            temporaer = f"{index_pfad}.tmp"
+            with open(temporaer, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2, sort_keys=True)
+            os.replace(temporaer, index_pfad)
+
+    print(
+        f"{len(offen) - len(fehler)} von {len(aufgaben)} Plots in "
+        f"{time.perf_counter() - start:.1f} s gezeichnet "
+        f"({len(aufgaben) - len(offen)} unverändert), gespeichert in '{ordner}'"
+    )
+    if fehler:
+        raise RuntimeError(f"{len(fehler)} Plots fehlgeschlagen: " + "; ".join(fehler))
+
+
 if __name__ == "__main__":
-    auswertung()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rollup",
+        nargs="+",
+        choices=ROLLUP_AUFLOESUNGEN,
+        default=[],
+        help="Zusätzlich Summen nach Tageszeit, Tag, Woche, Monat oder Jahreszeit speichern",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="pandas",
+        help="Engine für Einlesen, Aggregation und Sortierung (Standard: pandas)",
+    )
+    parser.add_argument(
+        "--memory-report",
+        action="store_true",
+        help="Speicherbedarf der eingelesenen Datensätze pro Spalte vor und nach der "
+        "Umstellung auf Kategorien und kompakte Datentypen ausgeben (nur pandas)",
+    )
+    parser.add_argument(
+        "--plots",
+        action="store_true",
+        help=f"min/avg/max pro Gebäude und Berechnungsart als PNG in {PLOT_ORDNER} "
+        "speichern (nur geänderte, benötigt matplotlib)",
+    )
+    args = parser.parse_args()
+
+    if args.backend == "polars" and pl is None:
+        sys.exit("Fehler: Für --backend polars muss polars installiert sein")
+    if args.plots and not MATPLOTLIB_VERFUEGBAR:
+        sys.exit("Fehler: Für --plots muss matplotlib installiert sein")
+
+    aggregated = auswertung(args.backend, speicherbericht=args.memory_report)
+    speichere_rollups(aggregated, args.rollup)
+    if args.plots:
+        speichere_plots(aggregated)
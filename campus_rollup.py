@@ -0,0 +1,303 @@
+"""Dieses File fasst die Excel-Dateien pro Gebäude zu Campus-Summen zusammen.
+
+Eingelesen werden alle Excel-Dateien aus speichere_aggregate_als_excel in einem
+Ordner (stromertrag.py --fused bzw. auswertung.py), parallel in einem Prozesspool.
+Andere Excel-Dateien (Rollups, Perzentile, ...) erkennt man an den Spalten bzw. am
+Dateinamen, der nicht zum Gebäude passt; sie werden übersprungen.
+
+Ausgabe (eine Excel-Datei, Standard data/aggregated_data.xlsx):
+    - Blatt "stunden": pro Berechnungsart, Statistik und Stunde die Summe der
+      Leistung über alle Gebäude und die Anzahl der Gebäude
+    - Blatt "jahr": pro Gebäude, Berechnungsart und Statistik die Jahressumme der
+      Leistung in Wh, am Ende die Zeilen "Campus" als Summe über alle Gebäude
+
+Cache:
+    Pro Datei liegt in data/cache/rollup/ eine .npz (Dateiname plus Hash des
+    absoluten Pfads) mit den benötigten Spalten, der Änderungszeit, der Größe und
+    dem SHA-256 der Datei. Stimmen Änderungszeit und Größe, wird die Datei nicht
+    geöffnet. Hat sich nur die Änderungszeit geändert (z.B. nach einem Kopieren),
+    entscheidet der Hash. Auch übersprungene Dateien werden so vermerkt.
+
+Aufruf:
+    python campus_rollup.py --input data --output data/aggregated_data.xlsx
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from auswertung import safe_filename
+from stromertrag import datei_hash
+
+CACHE_ORDNER = "data/cache/rollup"
+SPALTEN = ["berechnungsart", "statistic", "hour", "leistung"]
+CAMPUS = "Campus"
+
+
+def lies_gebaeude_aggregate(pfad: str) -> tuple[str, dict[str, np.ndarray]] | None:
+    """Diese Funktion liest die für die Summen benötigten Spalten einer Excel-Datei.
+
+    Args:
+        pfad (str): Excel-Datei aus speichere_aggregate_als_excel.
+
+    Returns:
+        tuple | None: Das Gebäude und die Spalten aus SPALTEN, None für Dateien, die
+            keine Aggregate eines Gebäudes enthalten.
+    """
+    arbeitsmappe = load_workbook(pfad, read_only=True)
+    try:
+        zeilen = arbeitsmappe.active.iter_rows(values_only=True)
+        kopf = next(zeilen, ())
+        if not {"building", *SPALTEN} <= set(kopf):
+            return None
+        idx_building = kopf.index("building")
+        indizes = [kopf.index(spalte) for spalte in SPALTEN]
+
+        building = None
+        werte = {spalte: [] for spalte in SPALTEN}
+        for zeile in zeilen:
+            if building is None:
+                building = zeile[idx_building]
+            for spalte, idx in zip(SPALTEN, indizes):
+                werte[spalte].append(zeile[idx])
+    finally:
+        arbeitsmappe.close()
+
+    if building is None or safe_filename(str(building)) + ".xlsx" != os.path.basename(
+        pfad
+    ):
+        return None
+    return str(building), {
+        "berechnungsart": np.array(werte["berechnungsart"], dtype=str),
+        "statistic": np.array(werte["statistic"], dtype=str),
+        "hour": pd.to_datetime(werte["hour"]).to_numpy(dtype="datetime64[s]"),
+        "leistung": np.array(werte["leistung"], dtype=np.float64),
+    }
+
+
+def _cache_pfad(pfad: str, ordner: str) -> str:
+    """Pfad der .npz im Cache für eine Excel-Datei.
+
+    Der Hash des absoluten Pfads im Namen trennt gleichnamige Dateien aus
+    verschiedenen Ordnern (z.B. data/alt/AUDIMAX.xlsx und data/AUDIMAX.xlsx).
+    """
+    schluessel = hashlib.sha256(os.path.abspath(pfad).encode("utf-8")).hexdigest()
+    return os.path.join(ordner, f"{os.path.basename(pfad)}.{schluessel[:16]}.npz")
+
+
+def _speichere_sidecar(
+    pfad: str,
+    cache_pfad: str,
+    hash_wert: str,
+    gebaeude: tuple[str, dict[str, np.ndarray]] | None,
+) -> None:
+    """Schreibt die .npz einer Excel-Datei, ein Abbruch hinterlässt keine halbe Datei."""
+    status = os.stat(pfad)
+    building, spalten = gebaeude if gebaeude is not None else ("", {})
+    temporaer = f"{cache_pfad}.tmp.npz"
+    np.savez(
+        temporaer,
+        mtime_ns=status.st_mtime_ns,
+        groesse=status.st_size,
+        hash=hash_wert,
+        building=building,
+        **spalten,
+    )
+    os.replace(temporaer, cache_pfad)
+
+
+def lade_mit_cache(aufgabe: tuple[str, str]) -> tuple[str, str, tuple | None]:
+    """Diese Funktion lädt eine Excel-Datei aus dem Cache oder liest sie neu ein.
+
+    Args:
+        aufgabe (tuple[str, str]): Excel-Datei und Ordner des Caches.
+
+    Returns:
+        tuple: Die Datei, die Quelle ("cache", "hash", "gelesen" oder "fehler")
+            und das Ergebnis von lies_gebaeude_aggregate.
+    """
+    pfad, ordner = aufgabe
+    cache_pfad = _cache_pfad(pfad, ordner)
+    status = os.stat(pfad)
+
+    if os.path.exists(cache_pfad):
+        with np.load(cache_pfad) as sidecar:
+            eintrag = {name: sidecar[name] for name in sidecar.files}
+        building = str(eintrag["building"])
+        gebaeude = (
+            (building, {spalte: eintrag[spalte] for spalte in SPALTEN})
+            if building
+            else None
+        )
+        if (
+            int(eintrag["mtime_ns"]) == status.st_mtime_ns
+            and int(eintrag["groesse"]) == status.st_size
+        ):
+            return pfad, "cache", gebaeude
+        hash_wert = datei_hash(pfad)
+        if str(eintrag["hash"]) == hash_wert:
+            _speichere_sidecar(pfad, cache_pfad, hash_wert, gebaeude)
+            return pfad, "hash", gebaeude
+    else:
+        hash_wert = datei_hash(pfad)
+
+    try:
+        gebaeude = lies_gebaeude_aggregate(pfad)
+    except (zipfile.BadZipFile, InvalidFileException) as fehler:
+        # Z.B. eine halb geschriebene Datei, wird beim nächsten Lauf erneut versucht
+        print(f"Fehler: '{pfad}' kann nicht gelesen werden ({fehler}), übersprungen")
+        return pfad, "fehler", None
+    _speichere_sidecar(pfad, cache_pfad, hash_wert, gebaeude)
+    return pfad, "gelesen", gebaeude
+
+
+def lade_gebaeude(
+    ordner: str, cache_ordner: str = CACHE_ORDNER, prozesse: int | None = None
+) -> tuple[pd.DataFrame, dict[str, int]]:
+    """Diese Funktion liest die Excel-Dateien aller Gebäude eines Ordners parallel.
+
+    Args:
+        ordner (str): Ordner mit den Excel-Dateien pro Gebäude.
+        cache_ordner (str): Ordner des Caches.
+        prozesse (int | None): Anzahl Prozesse (Standard: alle Kerne).
+
+    Returns:
+        tuple: Die Spalten building und SPALTEN aller Gebäude und pro Quelle
+            ("cache", "hash", "gelesen", "übersprungen", "fehler") die Anzahl Dateien.
+    """
+    if not os.path.isdir(ordner):
+        sys.exit(f"Fehler: Ordner {ordner} nicht gefunden")
+    dateien = sorted(
+        os.path.join(ordner, name)
+        for name in os.listdir(ordner)
+        if name.endswith(".xlsx") and not name.startswith("~$")
+    )
+    os.makedirs(cache_ordner, exist_ok=True)
+
+    teile = []
+    anzahl = {"cache": 0, "hash": 0, "gelesen": 0, "übersprungen": 0, "fehler": 0}
+    with ProcessPoolExecutor(max_workers=prozesse) as pool:
+        for _, quelle, gebaeude in pool.map(
+            lade_mit_cache, [(pfad, cache_ordner) for pfad in dateien]
+        ):
+            if gebaeude is None:
+                anzahl["fehler" if quelle == "fehler" else "übersprungen"] += 1
+                continue
+            anzahl[quelle] += 1
+            building, spalten = gebaeude
+            teile.append(pd.DataFrame({"building": building, **spalten}))
+
+    if not teile:
+        sys.exit(f"Fehler: Keine Excel-Dateien pro Gebäude in {ordner} gefunden")
+    return pd.concat(teile, ignore_index=True), anzahl
+
+
+def _sortiere(tabelle: pd.DataFrame, spalten: list[str]) -> pd.DataFrame:
+    """Sortiert nach den Spalten, die Statistik wie in sortiere_aggregate in der
+    Reihenfolge min, avg, max."""
+    reihenfolge = {"min": 0, "avg": 1, "max": 2}
+    return tabelle.sort_values(
+        spalten,
+        key=lambda spalte: (
+            spalte.map(reihenfolge) if spalte.name == "statistic" else spalte
+        ),
+        ignore_index=True,
+    )
+
+
+def berechne_campus_summen(
+    gebaeude: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Diese Funktion berechnet die stündlichen und jährlichen Campus-Summen.
+
+    Args:
+        gebaeude (pd.DataFrame): Ergebnis von lade_gebaeude.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Pro Berechnungsart, Statistik und Stunde
+            die Summe über die Gebäude und pro Gebäude (und Campus), Berechnungsart
+            und Statistik die Jahressumme.
+    """
+    stunden = (
+        gebaeude.groupby(["berechnungsart", "statistic", "hour"])
+        .agg(leistung=("leistung", "sum"), gebaeude=("building", "nunique"))
+        .reset_index()
+    )
+    stunden = _sortiere(stunden, ["berechnungsart", "statistic", "hour"])
+
+    jahr = (
+        gebaeude.groupby(["building", "berechnungsart", "statistic"])["leistung"]
+        .sum()
+        .reset_index()
+    )
+    campus = (
+        jahr.groupby(["berechnungsart", "statistic"])["leistung"]
+        .sum()
+        .reset_index()
+        .assign(building=CAMPUS)
+    )
+    # Campus-Zeilen nach den Gebäuden
+    jahr = pd.concat(
+        [
+            _sortiere(teil, ["building", "berechnungsart", "statistic"])
+            for teil in [jahr, campus[jahr.columns]]
+        ],
+        ignore_index=True,
+    )
+    return stunden, jahr
+
+
+def speichere_campus_summen(
+    stunden: pd.DataFrame, jahr: pd.DataFrame, pfad: str
+) -> None:
+    """Speichert beide Tabellen als Blätter "stunden" und "jahr" einer Excel-Datei."""
+    temporaer = f"{pfad}.tmp.xlsx"
+    with pd.ExcelWriter(temporaer) as writer:
+        stunden.to_excel(writer, sheet_name="stunden", index=False)
+        jahr.to_excel(writer, sheet_name="jahr", index=False)
+    os.replace(temporaer, pfad)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--input",
+        default="data",
+        help="Ordner mit den Excel-Dateien pro Gebäude (Standard: data)",
+    )
+    parser.add_argument("--output", default="data/aggregated_data.xlsx")
+    parser.add_argument("--cache-dir", default=CACHE_ORDNER)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Anzahl Prozesse zum Einlesen (Standard: alle Kerne)",
+    )
+    args = parser.parse_args()
+    if args.workers is not None and args.workers < 1:
+        sys.exit("Fehler: --workers muss mindestens 1 sein")
+
+    start = time.perf_counter()
+    gebaeude, anzahl = lade_gebaeude(args.input, args.cache_dir, args.workers)
+    dauer_lesen = time.perf_counter() - start
+
+    stunden, jahr = berechne_campus_summen(gebaeude)
+    speichere_campus_summen(stunden, jahr, args.output)
+    dauer = time.perf_counter() - start
+
+    print(
+        f"{gebaeude['building'].nunique()} Gebäude in {dauer_lesen:.2f} s geladen "
+        f"({anzahl['gelesen']} neu gelesen, {anzahl['cache']} aus dem Cache, "
+        f"{anzahl['hash']} per Hash bestätigt, {anzahl['übersprungen']} andere "
+        f"Dateien übersprungen, {anzahl['fehler']} fehlerhaft), Campus-Summen in "
+        f"{dauer:.2f} s in "
+        f"'{args.output}' gespeichert"
+    )
@@ -0,0 +1,379 @@
+"""Dieses File simuliert Eigenverbrauch, Einspeisung und Batteriespeicher pro Gebäude.
+
+Grundlage ist der stündliche Ertrag aller Konfigurationen eines Gebäudes (wie in
+calculate_globalstrahlung_pro_stunde) und ein stündliches Lastprofil pro Gebäude.
+
+Lastprofile (CSV, Semikolon-getrennt, Werte in kWh pro Stunde):
+    Zeitstempel;AUDIMAX;B 1;...
+    01.01.2023 00:00;12,5;3,1;...
+    - Zeitstempel im Format der Globalstrahlung, eine Spalte pro Gebäude
+    - Gebäude ohne Spalte werden übersprungen
+
+Batteriemodell pro Stunde:
+    - Direktverbrauch = min(PV, Last)
+    - Überschuss lädt die Batterie (begrenzt durch freie Kapazität und
+      Kapazität * C-Rate), der Rest wird eingespeist
+    - Defizit entlädt die Batterie (gleiche Grenzen), der Rest kommt aus dem Netz
+    - Lade- und Entladewirkungsgrad jeweils wirkungsgrad, Start mit leerer Batterie
+
+Die Simulation läuft Stunde für Stunde, aber vektorisiert über alle
+Konfigurationen und Batteriegrößen gleichzeitig. Die Gebäude werden in einem
+Prozesspool verteilt.
+
+Aufruf:
+    python eigenverbrauch.py --load-profiles data/lastprofile.csv --battery-sizes 0 10 50
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import stromertrag
+
+BATTERIEGROESSEN = [0, 5, 10, 20, 50, 100]
+
+
+def lese_lastprofil_gebaeude(pfad: str) -> list[str]:
+    """Diese Funktion liest nur die Kopfzeile der Lastprofile.
+
+    Args:
+        pfad (str): Pfad zur CSV im oben beschriebenen Format.
+
+    Returns:
+        list[str]: Die Gebäude, für die es eine Spalte gibt.
+    """
+    if not os.path.exists(pfad):
+        sys.exit(f"Fehler: Datei {pfad} nicht gefunden")
+
+    return list(pd.read_csv(pfad, sep=";", nrows=0, encoding="utf-8-sig").columns[1:])
+
+
+def lade_lastprofile(pfad: str, gebaeude: list[str] | None = None) -> pd.DataFrame:
+    """Diese Funktion liest die stündlichen Lastprofile ein.
+
+    Args:
+        pfad (str): Pfad zur CSV im oben beschriebenen Format.
+        gebaeude (list[str] | None): Nur diese Spalten lesen, None für alle. Bei
+            sehr vielen Gebäuden blockweise lesen, eine Datei mit 100.000 Spalten
+            passt nicht komplett in den Speicher.
+
+    Returns:
+        pd.DataFrame: Last in kWh mit den Stunden als Index und einer Spalte pro Gebäude.
+    """
+    if not os.path.exists(pfad):
+        sys.exit(f"Fehler: Datei {pfad} nicht gefunden")
+
+    spalten = None
+    if gebaeude is not None:
+        kopf = pd.read_csv(pfad, sep=";", nrows=0, encoding="utf-8-sig").columns
+        spalten = [kopf[0], *gebaeude]
+    tabelle = pd.read_csv(
+        pfad,
+        sep=";",
+        usecols=spalten,
+        decimal=",",
+        encoding="utf-8-sig",
+    )
+    zeitstempel = tabelle.columns[0]
+    stunden = pd.to_datetime(
+        tabelle.pop(zeitstempel).str.strip(), format="%d.%m.%Y %H:%M"
+    ).dt.floor("h")
+    # Spalten mit Dezimalpunkt statt -komma kommen als Text an
+    for spalte in tabelle.columns[tabelle.dtypes == object]:
+        tabelle[spalte] = tabelle[spalte].str.replace(",", ".").astype(float)
+    tabelle.index = pd.DatetimeIndex(stunden)
+    # Mehrere Werte pro Stunde (z.B. viertelstündlich) zu kWh pro Stunde summieren
+    return tabelle.groupby(level=0).sum()
+
+
+def simuliere_batterie(
+    pv: np.ndarray,
+    last: np.ndarray,
+    kapazitaeten: np.ndarray,
+    wirkungsgrad: float = 0.95,
+    c_rate: float = 1.0,
+    verlauf: bool = False,
+) -> dict[str, np.ndarray]:
+    """Diese Funktion simuliert Eigenverbrauch und Batterie für viele Konfigurationen.
+
+    Args:
+        pv (np.ndarray): PV-Ertrag in kWh mit Form (Stunden, Konfigurationen).
+        last (np.ndarray): Last in kWh mit Form (Stunden,).
+        kapazitaeten (np.ndarray): Nutzbare Batteriekapazitäten in kWh.
+        wirkungsgrad (float): Lade- und Entladewirkungsgrad (je Richtung).
+        c_rate (float): Maximale Lade- und Entladeleistung pro kWh Kapazität.
+        verlauf (bool): Zusätzlich den Ladezustand jeder Stunde zurückgeben.
+
+    Returns:
+        dict[str, np.ndarray]: Summen in kWh mit Form (Konfigurationen, Kapazitäten):
+            pv, last, eigenverbrauch (PV ohne Einspeisung), einspeisung, netzbezug,
+            geladen und entladen. Bei verlauf zusätzlich soc mit Form
+            (Stunden, Konfigurationen, Kapazitäten).
+    """
+    anzahl_stunden, anzahl_konfigurationen = pv.shape
+    kapazitaeten = np.asarray(kapazitaeten, dtype=np.float64)
+    form = (anzahl_konfigurationen, len(kapazitaeten))
+
+    direkt = np.minimum(pv, last[:, np.newaxis])
+    ueberschuss = pv - direkt
+    defizit = last[:, np.newaxis] - direkt
+
+    leistung_max = np.broadcast_to(kapazitaeten * c_rate, form)
+    soc = np.zeros(form)
+    geladen = np.zeros(form)
+    entladen = np.zeros(form)
+    menge = np.empty(form)
+    soc_verlauf = np.empty((anzahl_stunden,) + form) if verlauf else None
+
+    # Nur Stunden mit Überschuss oder Defizit in mindestens einer Konfiguration
+    lade_stunden = ueberschuss.any(axis=1)
+    entlade_stunden = defizit.any(axis=1)
+    for stunde in range(anzahl_stunden):
+        if lade_stunden[stunde]:
+            # menge = min(Überschuss, Leistung, freie Kapazität / Wirkungsgrad)
+            np.minimum(ueberschuss[stunde, :, np.newaxis], leistung_max, out=menge)
+            np.minimum(menge, (kapazitaeten - soc) / wirkungsgrad, out=menge)
+            geladen += menge
+            soc += menge * wirkungsgrad
+        if entlade_stunden[stunde]:
+            np.minimum(defizit[stunde, :, np.newaxis], leistung_max, out=menge)
+            np.minimum(menge, soc * wirkungsgrad, out=menge)
+            entladen += menge
+            soc -= menge / wirkungsgrad
+            np.maximum(soc, 0.0, out=soc)
+        if verlauf:
+            soc_verlauf[stunde] = soc
+
+    pv_summe = pv.sum(axis=0)[:, np.newaxis]
+    einspeisung = ueberschuss.sum(axis=0)[:, np.newaxis] - geladen
+    ergebnis = {
+        "pv": np.broadcast_to(pv_summe, form),
+        "last": np.full(form, last.sum()),
+        "eigenverbrauch": pv_summe - einspeisung,
+        "einspeisung": einspeisung,
+        "netzbezug": defizit.sum(axis=0)[:, np.newaxis] - entladen,
+        "geladen": geladen,
+        "entladen": entladen,
+    }
+    if verlauf:
+        ergebnis["soc"] = soc_verlauf
+    return ergebnis
+
+
+def _simuliere_gebaeude(aufgabe: tuple) -> pd.DataFrame:
+    """Simuliert alle Konfigurationen und Batteriegrößen eines Gebäudes.
+
+    Args:
+        aufgabe (tuple): (Gebäudemodell, Last, Globalstrahlungswerte, Gruppen,
+            Einstrahlung, Kapazitäten, Wirkungsgrad, C-Rate).
+
+    Returns:
+        pd.DataFrame: Eine Zeile pro Berechnungsart, Konfiguration und Batteriegröße.
+    """
+    (
+        gebaeude,
+        last,
+        werte,
+        gruppen,
+        einstrahlung,
+        kapazitaeten,
+        wirkungsgrad,
+        c_rate,
+    ) = aufgabe
+
+    teile = []
+    for berechnungsart, konfiguration in stromertrag.erstelle_konfigurationen(
+        gebaeude
+    ).items():
+        # Leistung in W über eine Stunde = Wh, die Last ist in kWh
+        pv = (
+            stromertrag.berechne_stundenleistung(
+                konfiguration, werte, gruppen, einstrahlung
+            )
+            / 1000
+        )
+        summen = simuliere_batterie(pv, last, kapazitaeten, wirkungsgrad, c_rate)
+
+        anzahl_konfigurationen = pv.shape[1]
+        idx = np.repeat(np.arange(anzahl_konfigurationen), len(kapazitaeten))
+        tabelle = pd.DataFrame(
+            {
+                "building": gebaeude.building,
+                "berechnungsart": berechnungsart,
+                "roof_type": konfiguration["roof_type"][idx],
+                "wirkungsgrad": konfiguration["wirkungsgrad"][idx],
+                "relative_yield": konfiguration["relative_yield"][idx],
+                "orientation": konfiguration["orientation"][idx],
+                "tilt": konfiguration["tilt"][idx],
+                "batterie_kwh": np.tile(kapazitaeten, anzahl_konfigurationen),
+            }
+        )
+        for feld in ["pv", "last", "eigenverbrauch", "einspeisung", "netzbezug"]:
+            tabelle[f"{feld}_kwh"] = summen[feld].ravel()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tabelle["eigenverbrauchsquote"] = (
+                tabelle["eigenverbrauch_kwh"] / tabelle["pv_kwh"]
+            )
+            tabelle["autarkiegrad"] = 1 - tabelle["netzbezug_kwh"] / tabelle["last_kwh"]
+        teile.append(tabelle)
+
+    return pd.concat(teile, ignore_index=True)
+
+
+def berechne_eigenverbrauch(
+    daten: list[stromertrag.Gebaeude],
+    lastprofil_datei: str,
+    kapazitaeten: list[float] = BATTERIEGROESSEN,
+    wirkungsgrad: float = 0.95,
+    c_rate: float = 1.0,
+    transposition: bool = False,
+    prozesse: int | None = None,
+    blockgroesse: int = 1000,
+) -> pd.DataFrame:
+    """Diese Funktion berechnet Eigenverbrauch und Batterieeffekt für alle Gebäude.
+
+    Die Lastprofile werden in Blöcken von blockgroesse Gebäuden gelesen und
+    simuliert, damit nie alle Spalten gleichzeitig im Speicher liegen.
+
+    Args:
+        daten (list[Gebaeude]): Gebäudemodelle aus erstelle_gebaeudemodell.
+        lastprofil_datei (str): CSV mit den Lastprofilen, siehe lade_lastprofile.
+        kapazitaeten (list[float]): Batteriegrößen in kWh, 0 für ohne Batterie.
+        wirkungsgrad (float): Lade- und Entladewirkungsgrad der Batterie.
+        c_rate (float): Maximale Lade- und Entladeleistung pro kWh Kapazität.
+        transposition (bool): Einstrahlung auf Modulebene statt des statischen
+            relativen Ertrags verwenden.
+        prozesse (int | None): Anzahl Worker-Prozesse, None für alle Kerne.
+        blockgroesse (int): Anzahl Gebäude, deren Lastprofile gemeinsam gelesen werden.
+
+    Returns:
+        pd.DataFrame: Eine Zeile pro Gebäude, Berechnungsart, Konfiguration und
+            Batteriegröße mit Jahressummen, Eigenverbrauchsquote und Autarkiegrad.
+    """
+    stunden, werte, gruppen, einstrahlung = (
+        stromertrag.lade_globalstrahlung_nach_stunde(transposition)
+    )
+    kapazitaeten = np.asarray(kapazitaeten, dtype=np.float64)
+
+    vorhanden = set(lese_lastprofil_gebaeude(lastprofil_datei))
+    mit_profil = []
+    for gebaeude in daten:
+        if gebaeude.building not in vorhanden:
+            print(f"Kein Lastprofil für Gebäude '{gebaeude.building}', übersprungen")
+            continue
+        mit_profil.append(gebaeude)
+
+    if not mit_profil:
+        sys.exit("Fehler: Für keines der Gebäude gibt es ein Lastprofil")
+
+    teile = []
+    with ProcessPoolExecutor(max_workers=prozesse) as executor:
+        for start in range(0, len(mit_profil), blockgroesse):
+            block = mit_profil[start : start + blockgroesse]
+            namen = list(dict.fromkeys(gebaeude.building for gebaeude in block))
+            lasten = lade_lastprofile(lastprofil_datei, namen).reindex(stunden)
+
+            aufgaben = []
+            for gebaeude in block:
+                last = lasten[gebaeude.building].to_numpy(dtype=np.float64)
+                if np.isnan(last).any():
+                    sys.exit(
+                        f"Fehler: Lastprofil von '{gebaeude.building}' deckt nicht "
+                        "alle Stunden der Globalstrahlung ab"
+                    )
+                aufgaben.append(
+                    (
+                        gebaeude,
+                        last,
+                        werte,
+                        gruppen,
+                        einstrahlung,
+                        kapazitaeten,
+                        wirkungsgrad,
+                        c_rate,
+                    )
+                )
+            teile.extend(executor.map(_simuliere_gebaeude, aufgaben))
+
+    return pd.concat(teile, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--load-profiles",
+        metavar="CSV",
+        required=True,
+        help="Stündliche Lastprofile in kWh, eine Spalte pro Gebäude",
+    )
+    parser.add_argument(
+        "--battery-sizes",
+        nargs="+",
+        type=float,
+        default=BATTERIEGROESSEN,
+        metavar="KWH",
+        help="Nutzbare Batteriekapazitäten in kWh, 0 für ohne Batterie "
+        f"(Standard: {' '.join(map(str, BATTERIEGROESSEN))})",
+    )
+    parser.add_argument(
+        "--battery-efficiency",
+        type=float,
+        default=0.95,
+        help="Lade- und Entladewirkungsgrad je Richtung (Standard: 0.95)",
+    )
+    parser.add_argument(
+        "--c-rate",
+        type=float,
+        default=1.0,
+        help="Maximale Lade-/Entladeleistung pro kWh Kapazität (Standard: 1.0)",
+    )
+    parser.add_argument(
+        "--buildings",
+        metavar="CSV",
+        default="data/grundflaeche.csv",
+        help="Gebäudebestand im Format von data/grundflaeche.csv",
+    )
+    parser.add_argument(
+        "--irradiance",
+        metavar="CSV",
+        default=stromertrag.globalstrahlung_datei,
+        help="Datei mit der stündlichen Globalstrahlung "
+        f"(Standard: {stromertrag.globalstrahlung_datei})",
+    )
+    parser.add_argument(
+        "--transposition",
+        action="store_true",
+        help="Einstrahlung auf Modulebene statt statischem relativen Ertrag",
+    )
+    parser.add_argument("--output", default="data/eigenverbrauch.csv")
+    args = parser.parse_args()
+    stromertrag.globalstrahlung_datei = args.irradiance
+
+    daten = [
+        stromertrag.erstelle_gebaeudemodell(gebaeude)
+        for block in stromertrag.lese_gebaeude_bloecke(args.buildings, 1000)
+        for gebaeude in block
+    ]
+
+    start = time.perf_counter()
+    ergebnis = berechne_eigenverbrauch(
+        daten,
+        args.load_profiles,
+        args.battery_sizes,
+        args.battery_efficiency,
+        args.c_rate,
+        args.transposition,
+    )
+    dauer = time.perf_counter() - start
+
+    ergebnis.to_csv(args.output, index=False)
+    print(
+        f"{len(ergebnis)} Kombinationen aus Konfiguration und Batteriegröße in "
+        f"{dauer:.1f} s simuliert ({len(ergebnis) / dauer:.0f}/s), "
+        f"gespeichert in '{args.output}'"
+    )
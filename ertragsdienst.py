@@ -0,0 +1,498 @@
+"""Dieses File stellt Dachflächen, relative Erträge und Erträge als lokalen HTTP-Dienst bereit.
+
+Endpunkte (POST, JSON, nur auf 127.0.0.1):
+    /roof_area       {"buildings": [Gebäude, ...]}
+    /relative_yield  {"items": [{"orientation": 165, "tilt": 30}, ...]}
+    /annual_yield    {"buildings": [Gebäude, ...]}
+    /hourly_yield    {"buildings": [Gebäude, ...]}
+    GET /health      Zustand und Anzahl Batches
+
+Ein Gebäude ist {"building": "B 1", "building_area": 286.47, "roof_type": "gable",
+"orientation": "60"} wie in erstelle_daten, roof_type auch als Dachart der CSV
+(z.B. "Satteldach"). Ungültige Eingaben werden vor der Berechnung geprüft und
+mit Status 400 beantwortet, statt wie in stromertrag.py das Programm zu beenden.
+
+Globalstrahlung, Jahressumme und Tabellen werden beim Start einmal in ein
+stromertrag.SolarYieldModel geladen und bleiben im Speicher. Pro Endpunkt sammelt
+ein Micro-Batcher die Einträge gleichzeitiger Anfragen (bis max_wartezeit oder
+max_groesse) und berechnet sie in einem Aufruf.
+
+Aufruf:
+    python ertragsdienst.py --port 8765
+    python ertragsdienst.py --benchmark
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.request
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import stromertrag
+from formulas.relative_yield_potential import orientations
+from formulas.relative_yield_potential import tilt_angles as tabellen_neigungen
+
+DACHTYPEN = stromertrag.dachtyp_namen
+
+
+class UngueltigeEingabe(ValueError):
+    """Eingabe einer Anfrage, die nicht berechnet werden kann (Status 400)."""
+
+
+def pruefe_gebaeude(eintrag: dict) -> dict:
+    """Prüft ein Gebäude und bringt es in die Form von erstelle_daten.
+
+    Args:
+        eintrag (dict): Gebäude aus der Anfrage.
+
+    Returns:
+        dict: Gebäudedaten für erstelle_gebaeudemodell.
+
+    Raises:
+        UngueltigeEingabe: Wenn ein Feld fehlt oder ungültig ist.
+    """
+    if not isinstance(eintrag, dict):
+        raise UngueltigeEingabe("Gebäude muss ein Objekt sein")
+
+    name = eintrag.get("building")
+    if not isinstance(name, str) or not name:
+        raise UngueltigeEingabe("Feld 'building' fehlt")
+
+    flaeche = eintrag.get("building_area")
+    if isinstance(flaeche, bool) or not isinstance(flaeche, (int, float)):
+        raise UngueltigeEingabe(f"{name}: 'building_area' muss eine Zahl sein")
+    if not np.isfinite(flaeche) or flaeche <= 0:
+        raise UngueltigeEingabe(f"{name}: 'building_area' muss positiv sein")
+
+    roof_type = DACHTYPEN.get(str(eintrag.get("roof_type", "")).lower())
+    if roof_type is None:
+        raise UngueltigeEingabe(
+            f"{name}: Dachtyp nicht bekannt: {eintrag.get('roof_type')}"
+        )
+
+    orientation = str(eintrag.get("orientation", "0")).strip()
+    if orientation != "variabel":
+        try:
+            gueltig = int(orientation) in orientations
+        except ValueError:
+            gueltig = False
+        if not gueltig:
+            raise UngueltigeEingabe(
+                f"{name}: Orientierung muss 'variabel' oder eine von {orientations} sein"
+            )
+
+    return {
+        "building": name,
+        "building_area": float(flaeche),
+        "roof_type": roof_type,
+        "orientation": orientation,
+    }
+
+
+def pruefe_ausrichtung(eintrag: dict) -> tuple[int, int]:
+    """Prüft ein Paar aus Orientierung und Neigung der Ertragstabelle."""
+    try:
+        orientation = int(eintrag["orientation"])
+        tilt = int(eintrag["tilt"])
+    except (KeyError, TypeError, ValueError):
+        raise UngueltigeEingabe("Einträge brauchen 'orientation' und 'tilt' als Zahl")
+    if orientation not in orientations or tilt not in tabellen_neigungen:
+        raise UngueltigeEingabe(
+            f"Keine Tabellenwerte für orientation={orientation}, tilt={tilt}"
+        )
+    return orientation, tilt
+
+
+def _json_wert(wert):
+    """NaN wird zu null, NumPy-Zahlen zu Python-Zahlen."""
+    if isinstance(wert, (float, np.floating)) and np.isnan(wert):
+        return None
+    if isinstance(wert, np.generic):
+        return wert.item()
+    return wert
+
+
+class MikroBatcher:
+    """Fasst Einträge gleichzeitiger Anfragen zu einem Berechnungsaufruf zusammen."""
+
+    def __init__(
+        self,
+        funktion: Callable[[list], list],
+        max_wartezeit: float = 0.002,
+        max_groesse: int = 512,
+    ):
+        """Startet den Thread, der die Warteschlange abarbeitet.
+
+        Args:
+            funktion (Callable[[list], list]): Berechnet für eine Liste von Einträgen
+                eine gleich lange Liste von Ergebnissen.
+            max_wartezeit (float): So lange in s wird nach dem ersten Eintrag auf
+                weitere Anfragen gewartet.
+            max_groesse (int): Ab so vielen Einträgen wird sofort gerechnet.
+        """
+        self.funktion = funktion
+        self.max_wartezeit = max_wartezeit
+        self.max_groesse = max_groesse
+        self.anzahl_batches = 0
+        self.anzahl_eintraege = 0
+        self._warteschlange: queue.Queue = queue.Queue()
+        threading.Thread(target=self._schleife, daemon=True).start()
+
+    def berechne(self, eintraege: list) -> list:
+        """Reiht die Einträge einer Anfrage ein und wartet auf ihre Ergebnisse."""
+        future: Future = Future()
+        self._warteschlange.put((eintraege, future))
+        return future.result()
+
+    def _schleife(self) -> None:
+        while True:
+            auftraege = [self._warteschlange.get()]
+            anzahl = len(auftraege[0][0])
+            frist = time.perf_counter() + self.max_wartezeit
+            while anzahl < self.max_groesse:
+                rest = frist - time.perf_counter()
+                if rest <= 0:
+                    break
+                try:
+                    auftraege.append(self._warteschlange.get(timeout=rest))
+                except queue.Empty:
+                    break
+                anzahl += len(auftraege[-1][0])
+
+            self._rechne(auftraege)
+
+    def _rechne(self, auftraege: list[tuple[list, Future]]) -> None:
+        """Berechnet die Einträge mehrerer Anfragen in einem Aufruf.
+
+        Scheitert der gemeinsame Aufruf, wird jede Anfrage einzeln nachgerechnet,
+        damit eine fehlerhafte Anfrage nicht die anderen im Batch mitreißt.
+        """
+        alle = [eintrag for eintraege, _ in auftraege for eintrag in eintraege]
+        try:
+            ergebnisse = self.funktion(alle)
+        except (Exception, SystemExit) as fehler:
+            # SystemExit aus sys.exit in stromertrag würde sonst den Thread beenden
+            if len(auftraege) == 1:
+                auftraege[0][1].set_exception(fehler)
+            else:
+                for auftrag in auftraege:
+                    self._rechne([auftrag])
+            return
+
+        self.anzahl_batches += 1
+        self.anzahl_eintraege += len(alle)
+        start = 0
+        for eintraege, future in auftraege:
+            future.set_result(ergebnisse[start : start + len(eintraege)])
+            start += len(eintraege)
+
+
+class Ertragsdienst:
+    """Hält Globalstrahlung und Tabellen warm und rechnet in Micro-Batches."""
+
+    def __init__(
+        self,
+        transposition: bool = False,
+        max_wartezeit: float = 0.002,
+        max_groesse: int = 512,
+    ):
+        """Lädt die Globalstrahlung und startet einen Micro-Batcher pro Endpunkt.
+
+        Args:
+            transposition (bool): Einstrahlung auf Modulebene statt statischem
+                relativen Ertrag verwenden.
+            max_wartezeit (float): Wartezeit der Micro-Batcher in s.
+            max_groesse (int): Maximale Anzahl Einträge pro Batch.
+        """
+        self.modell = stromertrag.SolarYieldModel(transposition)
+        self.stunden_iso = [stunde.isoformat() for stunde in self.modell.stunden]
+
+        self.batcher = {
+            pfad: MikroBatcher(funktion, max_wartezeit, max_groesse)
+            for pfad, funktion in [
+                ("/roof_area", self._dachflaechen),
+                ("/relative_yield", self._relative_ertraege),
+                ("/annual_yield", self._jahresertraege),
+                ("/hourly_yield", self._stundenertraege),
+            ]
+        }
+
+    def _dachflaechen(self, gebaeude_liste: list[dict]) -> list[dict]:
+        ergebnisse = []
+        for gebaeude in gebaeude_liste:
+            modell = stromertrag.erstelle_gebaeudemodell(gebaeude)
+            flaechen = {}
+            for i, berechnungsart in enumerate(stromertrag.berechnungsarten):
+                flaechen[berechnungsart] = {
+                    dachtyp: {
+                        str(neigung): float(modell.dachflaechen[i, j, k])
+                        for k, neigung in enumerate(stromertrag.neigungen)
+                        if not np.isnan(modell.dachflaechen[i, j, k])
+                    }
+                    for j, dachtyp in enumerate(stromertrag.dachtypen)
+                    if not np.all(np.isnan(modell.dachflaechen[i, j]))
+                }
+            ergebnisse.append({"building": modell.building, "roof_area": flaechen})
+        return ergebnisse
+
+    def _relative_ertraege(self, paare: list[tuple[int, int]]) -> list[float]:
+        orientation, tilt = np.array(paare, dtype=np.int64).reshape(-1, 2).T
+        return stromertrag.SolarYieldModel.relative_ertraege(orientation, tilt).tolist()
+
+    def _jahresertraege(self, gebaeude_liste: list[dict]) -> list[dict]:
+        tabelle = self.modell.predict(pd.DataFrame(gebaeude_liste))
+        tabelle["jahresertrag_kwh"] = tabelle.pop("jahresertrag") / 1000
+        spalten = [
+            "roof_type",
+            "wirkungsgrad",
+            "relative_yield",
+            "orientation",
+            "tilt",
+            "jahresertrag_kwh",
+        ]
+        zeilen = tabelle.to_dict("records")
+
+        # predict liefert pro Gebäude und Berechnungsart die Zeilen min, avg, max
+        pro_gebaeude = len(stromertrag.berechnungsarten) * 3
+        ergebnisse = []
+        for nummer, gebaeude in enumerate(gebaeude_liste):
+            ertraege: dict = {}
+            for zeile in zeilen[nummer * pro_gebaeude : (nummer + 1) * pro_gebaeude]:
+                ertraege.setdefault(zeile["berechnungsart"], {})[zeile["statistic"]] = {
+                    spalte: _json_wert(zeile[spalte]) for spalte in spalten
+                }
+            ergebnisse.append(
+                {"building": gebaeude["building"], "annual_yield": ertraege}
+            )
+        return ergebnisse
+
+    def _stundenertraege(self, gebaeude_liste: list[dict]) -> list[dict]:
+        ergebnisse = []
+        for gebaeude in gebaeude_liste:
+            statistiken = self.modell.stundenstatistiken(
+                self.modell.gebaeudemodell(**gebaeude)
+            )
+            ertraege = {
+                berechnungsart: {
+                    statistik: ergebnis["leistung"].tolist()
+                    for statistik, ergebnis in werte.items()
+                }
+                for berechnungsart, (_, werte) in statistiken.items()
+            }
+            ergebnisse.append(
+                {"building": gebaeude["building"], "hourly_yield_wh": ertraege}
+            )
+        return ergebnisse
+
+    def beantworte(self, pfad: str, anfrage: dict) -> dict:
+        """Prüft eine Anfrage und berechnet sie über den Micro-Batcher des Endpunkts.
+
+        Raises:
+            UngueltigeEingabe: Bei ungültigen Eingaben.
+            KeyError: Bei unbekanntem Endpunkt.
+        """
+        batcher = self.batcher[pfad]
+        if not isinstance(anfrage, dict):
+            raise UngueltigeEingabe("Anfrage muss ein JSON-Objekt sein")
+
+        if pfad == "/relative_yield":
+            eintraege = [pruefe_ausrichtung(e) for e in anfrage.get("items") or []]
+            if not eintraege:
+                raise UngueltigeEingabe("Feld 'items' fehlt oder ist leer")
+            return {"relative_yield": batcher.berechne(eintraege)}
+
+        eintraege = [pruefe_gebaeude(e) for e in anfrage.get("buildings") or []]
+        if not eintraege:
+            raise UngueltigeEingabe("Feld 'buildings' fehlt oder ist leer")
+        antwort = {"buildings": batcher.berechne(eintraege)}
+        if pfad == "/hourly_yield":
+            antwort["hours"] = self.stunden_iso
+        return antwort
+
+    def zustand(self) -> dict:
+        return {
+            "stunden": len(self.modell.stunden),
+            "batches": {
+                pfad: {
+                    "batches": batcher.anzahl_batches,
+                    "eintraege": batcher.anzahl_eintraege,
+                }
+                for pfad, batcher in self.batcher.items()
+            },
+        }
+
+
+def erstelle_server(dienst: Ertragsdienst, port: int = 8765) -> ThreadingHTTPServer:
+    """Erstellt den HTTP-Server auf 127.0.0.1, ein Thread pro Verbindung."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _antworte(self, status: int, inhalt: dict) -> None:
+            daten = json.dumps(inhalt).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(daten)))
+            self.end_headers()
+            self.wfile.write(daten)
+
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                self._antworte(200, dienst.zustand())
+            else:
+                self._antworte(404, {"fehler": f"Unbekannter Pfad {self.path}"})
+
+        def do_POST(self) -> None:
+            laenge = int(self.headers.get("Content-Length") or 0)
+            inhalt = self.rfile.read(laenge)
+            if self.path not in dienst.batcher:
+                self._antworte(404, {"fehler": f"Unbekannter Pfad {self.path}"})
+                return
+            try:
+                anfrage = json.loads(inhalt or b"null")
+                self._antworte(200, dienst.beantworte(self.path, anfrage))
+            except (json.JSONDecodeError, UngueltigeEingabe) as fehler:
+                self._antworte(400, {"fehler": str(fehler)})
+            except (Exception, SystemExit) as fehler:
+                # sys.exit("Fehler: ...") aus stromertrag darf den Dienst nicht beenden
+                self._antworte(500, {"fehler": str(fehler)})
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    class Server(ThreadingHTTPServer):
+        # Standard ist 5, bei vielen gleichzeitigen Clients werden sonst
+        # Verbindungen abgewiesen und erst nach einer Sekunde wiederholt
+        request_queue_size = 128
+        daemon_threads = True
+
+    return Server(("127.0.0.1", port), Handler)
+
+
+def _sende(url: str, inhalt: dict) -> float:
+    """Sendet eine Anfrage und gibt die Latenz in s zurück."""
+    anfrage = urllib.request.Request(
+        url,
+        data=json.dumps(inhalt).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(anfrage) as antwort:
+        antwort.read()
+    return time.perf_counter() - start
+
+
+def benchmark(
+    anfragen: int = 400, parallel: int = 16, transposition: bool = False
+) -> None:
+    """Misst p50/p99-Latenz und Durchsatz mit und ohne Micro-Batching.
+
+    Pro Endpunkt schicken `parallel` Clients insgesamt `anfragen` Anfragen mit je
+    einem Campus-Gebäude (bzw. einem Paar aus Orientierung und Neigung).
+    """
+    gebaeude = [
+        {
+            "building": g["building"],
+            "building_area": g["building_area"],
+            "roof_type": g["roof_type"],
+            "orientation": g["orientation"],
+        }
+        for g in stromertrag.erstelle_daten()
+    ]
+    inhalte = {
+        "/roof_area": lambda i: {"buildings": [gebaeude[i % len(gebaeude)]]},
+        "/relative_yield": lambda i: {
+            "items": [
+                {
+                    "orientation": orientations[i % len(orientations)],
+                    "tilt": 10 * (i % 10),
+                }
+            ]
+        },
+        "/annual_yield": lambda i: {"buildings": [gebaeude[i % len(gebaeude)]]},
+        "/hourly_yield": lambda i: {"buildings": [gebaeude[i % len(gebaeude)]]},
+    }
+
+    print(f"{anfragen} Anfragen pro Endpunkt, {parallel} parallele Clients")
+    print(
+        f"{'Endpunkt':<16} {'Batching':<9} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'Anfragen/s':>11} {'Ø Batch':>8}"
+    )
+    for max_wartezeit, max_groesse, name in [(0.0, 1, "aus"), (0.002, 512, "an")]:
+        dienst = Ertragsdienst(transposition, max_wartezeit, max_groesse)
+        server = erstelle_server(dienst, 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        basis = f"http://127.0.0.1:{server.server_address[1]}"
+
+        for pfad, inhalt in inhalte.items():
+            _sende(basis + pfad, inhalt(0))
+            batcher = dienst.batcher[pfad]
+            batches_vorher = batcher.anzahl_batches
+            eintraege_vorher = batcher.anzahl_eintraege
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(parallel) as executor:
+                latenzen = np.array(
+                    list(
+                        executor.map(
+                            lambda i: _sende(basis + pfad, inhalt(i)), range(anfragen)
+                        )
+                    )
+                )
+            dauer = time.perf_counter() - start
+
+            batches = batcher.anzahl_batches - batches_vorher
+            eintraege = batcher.anzahl_eintraege - eintraege_vorher
+            p50, p99 = np.percentile(latenzen * 1000, [50, 99])
+            print(
+                f"{pfad:<16} {name:<9} {p50:8.2f} {p99:8.2f} "
+                f"{anfragen / dauer:11.0f} {eintraege / batches:8.1f}"
+            )
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--irradiance",
+        metavar="CSV",
+        default=stromertrag.globalstrahlung_datei,
+        help="Datei mit der stündlichen Globalstrahlung "
+        f"(Standard: {stromertrag.globalstrahlung_datei})",
+    )
+    parser.add_argument(
+        "--transposition",
+        action="store_true",
+        help="Einstrahlung auf Modulebene statt statischem relativen Ertrag",
+    )
+    parser.add_argument(
+        "--batch-wait-ms",
+        type=float,
+        default=2.0,
+        help="Wartezeit der Micro-Batcher auf weitere Anfragen (Standard: 2 ms)",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="p50/p99-Latenz und Durchsatz mit und ohne Micro-Batching messen",
+    )
+    args = parser.parse_args()
+    stromertrag.globalstrahlung_datei = args.irradiance
+
+    if args.benchmark:
+        benchmark(transposition=args.transposition)
+    else:
+        server = erstelle_server(
+            Ertragsdienst(args.transposition, args.batch_wait_ms / 1000), args.port
+        )
+        print(f"Ertragsdienst läuft auf http://127.0.0.1:{args.port}")
+        server.serve_forever()
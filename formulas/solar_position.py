@@ -0,0 +1,196 @@
+"""This file contains the solar position and plane-of-array irradiance formulas."""
+
+from functools import lru_cache
+
+import numpy as np
+
+SOLAR_CONSTANT = 1367.0
+
+
+def solar_position(
+    times_utc: np.ndarray, latitude: float, longitude: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """Computes the solar zenith and azimuth angles for many points in time at once.
+
+    According to the NOAA solar calculation (Spencer's Fourier series for the
+    equation of time and the declination):
+        cos(zenith) = sin(lat) * sin(decl) + cos(lat) * cos(decl) * cos(hour_angle)
+        azimuth = atan2(sin(hour_angle), cos(hour_angle) * sin(lat) - tan(decl) * cos(lat))
+
+    Args:
+        times_utc (np.ndarray): Points in time as datetime64 in UTC.
+        latitude (float): The latitude of the site in degrees.
+        longitude (float): The longitude of the site in degrees (east positive).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Zenith and azimuth in degrees. The azimuth is
+            measured from south, west positive (0 = South, -90 = East, 90 = West),
+            like the orientations of the relative yield table.
+    """
+    times_utc = np.asarray(times_utc, dtype="datetime64[s]")
+    day_start = times_utc.astype("datetime64[D]")
+    year_start = times_utc.astype("datetime64[Y]").astype("datetime64[D]")
+
+    day_of_year = (day_start - year_start).astype(np.float64)
+    minutes = (times_utc - day_start).astype(np.float64) / 60.0
+
+    gamma = 2 * np.pi / 365 * (day_of_year + (minutes / 60 - 12) / 24)
+    equation_of_time = 229.18 * (
+        0.000075
+        + 0.001868 * np.cos(gamma)
+        - 0.032077 * np.sin(gamma)
+        - 0.014615 * np.cos(2 * gamma)
+        - 0.040849 * np.sin(2 * gamma)
+    )
+    declination = (
+        0.006918
+        - 0.399912 * np.cos(gamma)
+        + 0.070257 * np.sin(gamma)
+        - 0.006758 * np.cos(2 * gamma)
+        + 0.000907 * np.sin(2 * gamma)
+        - 0.002697 * np.cos(3 * gamma)
+        + 0.00148 * np.sin(3 * gamma)
+    )
+
+    true_solar_time = minutes + equation_of_time + 4 * longitude
+    hour_angle = np.radians(true_solar_time / 4 - 180)
+    latitude_rad = np.radians(latitude)
+
+    cos_zenith = np.sin(latitude_rad) * np.sin(declination) + np.cos(
+        latitude_rad
+    ) * np.cos(declination) * np.cos(hour_angle)
+    zenith = np.degrees(np.arccos(np.clip(cos_zenith, -1.0, 1.0)))
+    azimuth = np.degrees(
+        np.arctan2(
+            np.sin(hour_angle),
+            np.cos(hour_angle) * np.sin(latitude_rad)
+            - np.tan(declination) * np.cos(latitude_rad),
+        )
+    )
+    return zenith, azimuth
+
+
+@lru_cache(maxsize=32)
+def solar_position_for_year(
+    latitude: float, longitude: float, year: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Computes (and caches) the solar position for every hour of a year.
+
+    The position is evaluated at the middle of each UTC hour.
+
+    Args:
+        latitude (float): The latitude of the site in degrees.
+        longitude (float): The longitude of the site in degrees (east positive).
+        year (int): The calendar year (UTC).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Start of each UTC hour as
+            datetime64, zenith and azimuth in degrees. The arrays are read-only.
+    """
+    hours = np.arange(
+        np.datetime64(f"{year}-01-01T00"),
+        np.datetime64(f"{year + 1}-01-01T00"),
+        np.timedelta64(1, "h"),
+    )
+    zenith, azimuth = solar_position(
+        hours + np.timedelta64(30, "m"), latitude, longitude
+    )
+    for array in (hours, zenith, azimuth):
+        array.flags.writeable = False
+    return hours, zenith, azimuth
+
+
+def erbs_decomposition(
+    ghi: np.ndarray, zenith: np.ndarray, day_of_year: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Splits the global horizontal irradiance into direct normal and diffuse parts.
+
+    According to Erbs, Klein and Duffie (1982):
+        kt = ghi / (solar_constant * eccentricity * cos(zenith))
+        dhi = kd(kt) * ghi
+        dni = (ghi - dhi) / cos(zenith)
+
+    Args:
+        ghi (np.ndarray): The global horizontal irradiance in W/m^2.
+        zenith (np.ndarray): The solar zenith in degrees.
+        day_of_year (np.ndarray): The day of the year (0-365).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Direct normal and diffuse horizontal
+            irradiance in W/m^2.
+    """
+    cos_zenith = np.cos(np.radians(zenith))
+    extraterrestrial = SOLAR_CONSTANT * (
+        1 + 0.033 * np.cos(2 * np.pi * day_of_year / 365)
+    )
+    sun_up = cos_zenith > 0.065
+
+    kt = np.zeros_like(ghi)
+    np.divide(ghi, extraterrestrial * cos_zenith, out=kt, where=sun_up)
+    kt = np.clip(kt, 0.0, 1.0)
+
+    kd = np.where(
+        kt <= 0.22,
+        1 - 0.09 * kt,
+        np.where(
+            kt <= 0.8,
+            0.9511 - 0.1604 * kt + 4.388 * kt**2 - 16.638 * kt**3 + 12.336 * kt**4,
+            0.165,
+        ),
+    )
+    dhi = np.where(sun_up, kd * ghi, ghi)
+
+    dni = np.zeros_like(ghi)
+    np.divide(ghi - dhi, cos_zenith, out=dni, where=sun_up)
+    return dni, dhi
+
+
+def plane_of_array_irradiance(
+    ghi: np.ndarray,
+    zenith: np.ndarray,
+    azimuth: np.ndarray,
+    day_of_year: np.ndarray,
+    orientations: list[float],
+    tilts: list[float],
+    albedo: float = 0.2,
+) -> np.ndarray:
+    """Computes the plane-of-array irradiance for every orientation x tilt at once.
+
+    According to the isotropic sky model (Liu and Jordan):
+        poa = dni * max(cos(aoi), 0) + dhi * (1 + cos(tilt)) / 2
+              + ghi * albedo * (1 - cos(tilt)) / 2
+        cos(aoi) = cos(zenith) * cos(tilt)
+                   + sin(zenith) * sin(tilt) * cos(azimuth - orientation)
+
+    Args:
+        ghi (np.ndarray): The global horizontal irradiance in W/m^2, shape (hours,).
+        zenith (np.ndarray): The solar zenith in degrees, shape (hours,).
+        azimuth (np.ndarray): The solar azimuth in degrees from south, shape (hours,).
+        day_of_year (np.ndarray): The day of the year, shape (hours,).
+        orientations (list[float]): The module orientations in degrees from south.
+        tilts (list[float]): The module tilts in degrees.
+        albedo (float): The ground reflectance.
+
+    Returns:
+        np.ndarray: The plane-of-array irradiance in W/m^2 with shape
+            (orientations, tilts, hours).
+    """
+    dni, dhi = erbs_decomposition(ghi, zenith, day_of_year)
+
+    zenith_rad = np.radians(zenith)[np.newaxis, np.newaxis, :]
+    azimuth_rad = np.radians(azimuth)[np.newaxis, np.newaxis, :]
+    orientation_rad = np.radians(np.asarray(orientations, dtype=np.float64))[
+        :, np.newaxis, np.newaxis
+    ]
+    tilt_rad = np.radians(np.asarray(tilts, dtype=np.float64))[
+        np.newaxis, :, np.newaxis
+    ]
+
+    cos_aoi = np.cos(zenith_rad) * np.cos(tilt_rad) + np.sin(zenith_rad) * np.sin(
+        tilt_rad
+    ) * np.cos(azimuth_rad - orientation_rad)
+
+    beam = dni * np.maximum(cos_aoi, 0.0)
+    sky_diffuse = dhi * (1 + np.cos(tilt_rad)) / 2
+    ground_reflected = ghi * albedo * (1 - np.cos(tilt_rad)) / 2
+    return beam + sky_diffuse + ground_reflected
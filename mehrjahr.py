@@ -0,0 +1,200 @@
+"""Dieses File berechnet die Jahreserträge aller Konfigurationen über mehrere Messjahre.
+
+Die Globalstrahlung eines Standorts über viele Jahre wird als Matrix
+(Jahre, Stunden seit dem 1. Januar) gehalten, 8784 Spalten. Fehlende Stunden sind
+NaN, in Nicht-Schaltjahren auch die letzten 24 Spalten. Jahre mit weniger als
+MINDESTABDECKUNG der Stunden werden nicht ausgewertet, eine Lücke würde sie sonst
+zum schlechtesten Jahr machen. Aus der Matrix entstehen die Jahressummen (bzw. die
+Jahressummen auf Modulebene), mit denen stromertrag.berechne_ensemble_ertraege alle
+Jahre in einem Schritt auswertet.
+
+Cache:
+    Die Matrix wird beim ersten Lauf aus der CSV aufgebaut (blockweise, siehe
+    stromertrag.lese_globalstrahlung_gestreamt) und als .npy in data/cache/
+    gespeichert. Der Name enthält den Hash der CSV. Spätere Läufe öffnen die Datei
+    mit np.load(mmap_mode="r"), gelesen werden nur die benötigten Seiten.
+
+Aufruf:
+    python mehrjahr.py --irradiance data/synthetisch/globalstrahlung_stuendlich.csv
+"""
+
+import argparse
+import calendar
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import stromertrag
+
+CACHE_ORDNER = "data/cache"
+STUNDEN_PRO_JAHR = 366 * 24
+
+# Jahre mit weniger gültigen Stunden werden übersprungen
+MINDESTABDECKUNG = 0.95
+
+
+def _cache_pfade(pfad: str, ordner: str) -> tuple[str, str]:
+    """Pfade von Matrix und Jahren im Cache für eine Globalstrahlungsdatei."""
+    schluessel = stromertrag.datei_hash(pfad)[:16]
+    return (
+        os.path.join(ordner, f"globalstrahlung_{schluessel}_stunden.npy"),
+        os.path.join(ordner, f"globalstrahlung_{schluessel}_jahre.npy"),
+    )
+
+
+def _speichere_npy_atomar(pfad: str, array: np.ndarray) -> None:
+    """Schreibt ein Array als .npy, ein Abbruch hinterlässt keine halbe Datei."""
+    temporaer = f"{pfad}.tmp.npy"
+    np.save(temporaer, array)
+    os.replace(temporaer, pfad)
+
+
+def erstelle_jahresmatrix(pfad: str) -> tuple[np.ndarray, np.ndarray]:
+    """Diese Funktion baut die Matrix (Jahre, Stunden des Jahres) aus einer CSV auf.
+
+    Args:
+        pfad (str): Stündliche oder feiner aufgelöste Globalstrahlung über mehrere
+            Jahre (Format wie globalstrahlung_datei).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Die Jahre und die Matrix in W/m² mit Form
+            (Jahre, 8784), NaN für fehlende Stunden.
+    """
+    zeitstempel_liste, werte = stromertrag.lese_globalstrahlung_gestreamt(pfad, "1h")
+    stunden = pd.to_datetime(
+        pd.Series(zeitstempel_liste), format="%d.%m.%Y %H:%M"
+    ).to_numpy(dtype="datetime64[h]")
+
+    jahr_beginn = stunden.astype("datetime64[Y]")
+    stunde_im_jahr = (stunden - jahr_beginn.astype("datetime64[h]")).astype(np.int64)
+    jahre, zeile = np.unique(jahr_beginn.astype(np.int64) + 1970, return_inverse=True)
+
+    matrix = np.full((len(jahre), STUNDEN_PRO_JAHR), np.nan)
+    matrix[zeile, stunde_im_jahr] = werte
+    return jahre, matrix
+
+
+def lade_jahresmatrix(
+    pfad: str, ordner: str = CACHE_ORDNER
+) -> tuple[np.ndarray, np.ndarray]:
+    """Diese Funktion lädt die Matrix (Jahre, Stunden des Jahres) aus dem Cache.
+
+    Fehlt der Cache, wird er mit erstelle_jahresmatrix angelegt.
+
+    Args:
+        pfad (str): Globalstrahlung über mehrere Jahre.
+        ordner (str): Ordner des Caches.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Die Jahre und die Matrix als schreibgeschützte
+            Memory-Map.
+    """
+    if not os.path.exists(pfad):
+        sys.exit(f"Fehler: Datei {pfad} nicht gefunden")
+
+    matrix_pfad, jahre_pfad = _cache_pfade(pfad, ordner)
+    if not (os.path.exists(matrix_pfad) and os.path.exists(jahre_pfad)):
+        jahre, matrix = erstelle_jahresmatrix(pfad)
+        os.makedirs(ordner, exist_ok=True)
+        _speichere_npy_atomar(matrix_pfad, matrix)
+        _speichere_npy_atomar(jahre_pfad, jahre)
+        print(f"Cache für '{pfad}' in '{matrix_pfad}' angelegt.")
+
+    return np.load(jahre_pfad), np.load(matrix_pfad, mmap_mode="r")
+
+
+def berechne_jahressummen(
+    jahre: np.ndarray, matrix: np.ndarray, transposition: bool = False
+) -> np.ndarray:
+    """Diese Funktion summiert die Einstrahlung jedes Jahres.
+
+    Args:
+        jahre (np.ndarray): Die Jahre.
+        matrix (np.ndarray): Globalstrahlung mit Form (Jahre, Stunden des Jahres).
+        transposition (bool): Statt der Globalstrahlung die Einstrahlung auf
+            Modulebene summieren. Das geschieht Jahr für Jahr, damit immer nur eine
+            Zeile der Matrix im Speicher liegt.
+
+    Returns:
+        np.ndarray: Form (Jahre,) bzw. (orientations, [0] + tilt_angles, Jahre).
+    """
+    if not transposition:
+        return np.nansum(matrix, axis=1)
+
+    summen = []
+    for jahr, zeile in zip(jahre, matrix):
+        gueltig = np.flatnonzero(~np.isnan(zeile))
+        zeitpunkte = pd.DatetimeIndex(
+            np.datetime64(f"{jahr}-01-01T00", "h") + gueltig.astype("timedelta64[h]")
+        )
+        summen.append(
+            stromertrag.berechne_einstrahlung_modulebene(
+                zeitpunkte, np.asarray(zeile[gueltig])
+            ).sum(axis=-1)
+        )
+    return np.stack(summen, axis=-1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--irradiance",
+        metavar="CSV",
+        required=True,
+        help="Globalstrahlung über mehrere Jahre im Format der stündlichen Datei",
+    )
+    parser.add_argument(
+        "--buildings",
+        metavar="CSV",
+        default="data/grundflaeche.csv",
+        help="Gebäudebestand im Format von data/grundflaeche.csv",
+    )
+    parser.add_argument(
+        "--transposition",
+        action="store_true",
+        help="Einstrahlung auf Modulebene statt statischem relativen Ertrag",
+    )
+    parser.add_argument("--cache-dir", default=CACHE_ORDNER)
+    parser.add_argument("--output", default="data/mehrjahr.csv")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    jahre, matrix = lade_jahresmatrix(args.irradiance, args.cache_dir)
+
+    abdeckung = np.count_nonzero(~np.isnan(matrix), axis=1) / [
+        (366 if calendar.isleap(int(jahr)) else 365) * 24 for jahr in jahre
+    ]
+    for jahr, anteil in zip(jahre, abdeckung):
+        if anteil < MINDESTABDECKUNG:
+            print(
+                f"Jahr {jahr} ist unvollständig ({anteil:.0%} der Stunden), übersprungen"
+            )
+    vollstaendig = abdeckung >= MINDESTABDECKUNG
+    if not vollstaendig.any():
+        sys.exit("Fehler: Kein Jahr ist vollständig genug für die Auswertung")
+    jahre, matrix = jahre[vollstaendig], matrix[vollstaendig]
+
+    jahressummen = berechne_jahressummen(jahre, matrix, args.transposition)
+    dauer_laden = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ergebnis = stromertrag.berechne_ensemble_ertraege(
+        [
+            stromertrag.erstelle_gebaeudemodell(gebaeude)
+            for block in stromertrag.lese_gebaeude_bloecke(args.buildings, 1000)
+            for gebaeude in block
+        ],
+        jahre,
+        jahressummen,
+    )
+    dauer = time.perf_counter() - start
+
+    ergebnis.to_csv(args.output, index=False)
+    print(
+        f"{len(jahre)} Jahre ({jahre[0]}-{jahre[-1]}) in {dauer_laden:.2f} s geladen, "
+        f"{len(ergebnis)} Konfigurationen in {dauer:.2f} s berechnet, "
+        f"gespeichert in '{args.output}'"
+    )
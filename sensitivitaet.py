@@ -0,0 +1,430 @@
+"""Dieses File untersucht, wie unsichere Eingaben den Jahresertrag des Campus beeinflussen.
+
+Unsichere Eingaben (PARAMETER), jeweils mit einer Verteilung:
+    - wirkungsgrad: Modulwirkungsgrad statt der festen wirkungsgrad_liste
+    - reduction_factor: Reduktionsfaktor der Dachflächen statt 0.8
+    - globalstrahlung_faktor: Skalierung der Globalstrahlung (Messfehler, anderes Jahr)
+
+Verteilungen (Argumente durch ":" getrennt):
+    fixed:WERT, uniform:MIN:MAX, normal:MITTEL:STD, triangular:MIN:MODUS:MAX,
+    choice:WERT1:WERT2:...
+
+Der Jahresertrag einer Konfiguration ist linear in allen drei Eingaben:
+    Ertrag = (fix + reduction_factor * proportional) * wirkungsgrad * globalstrahlung_faktor
+fix und proportional werden einmal pro Konfiguration aus
+stromertrag.berechne_konfigurationsertraege bestimmt. Pro Block von Stichproben
+ist die Auswertung aller Gebäude dann eine Matrix (Stichproben, Konfigurationen) und
+ein np.maximum.reduceat bzw. np.minimum.reduceat über die Konfigurationen jedes
+Gebäudes. Bei --statistic avg reicht der Mittelwert über die Konfigurationen.
+
+Sensitivitätsindizes nach Sobol mit dem Saltelli-Schema: zwei unabhängige
+Stichprobenmatrizen A und B mit N Zeilen und je eine Matrix A_B^i, in der die Spalte
+i aus B stammt, also N * (Parameter + 2) Auswertungen. Erster Ordnung nach Saltelli
+(2010), Totaleffekt nach Jansen, Konfidenzintervalle per Bootstrap.
+
+Ausgabe:
+    - {output}_intervalle.csv: pro Gebäude und Berechnungsart (und Campus) Mittelwert,
+      Standardabweichung und Quantile des Jahresertrags in kWh (aus A)
+    - {output}_indizes.csv: pro Berechnungsart und Parameter S1 und ST des
+      Campus-Jahresertrags mit Konfidenzintervall
+
+Aufruf:
+    python sensitivitaet.py --samples 100000 --efficiency uniform:0.18:0.24
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import stromertrag
+
+PARAMETER = ["wirkungsgrad", "reduction_factor", "globalstrahlung_faktor"]
+
+# Anzahl Argumente pro Verteilung (None: beliebig viele, mindestens eines)
+VERTEILUNGEN = {"fixed": 1, "uniform": 2, "normal": 2, "triangular": 3, "choice": None}
+
+# Dachflächen, die proportional zum Reduktionsfaktor sind (siehe formulas/)
+MIT_REDUKTIONSFAKTOR = {("scheaffler", "pitched"), ("tum", "gable"), ("tum", "pitched")}
+
+# Elemente der Matrix (Stichproben, Konfigurationen) pro Block
+BLOCK_ELEMENTE = 4_000_000
+
+
+def verteilung(text: str) -> tuple[str, tuple[float, ...]]:
+    """Liest eine Verteilung wie "uniform:0.18:0.24" (als type für argparse).
+
+    Raises:
+        argparse.ArgumentTypeError: Bei unbekannter Verteilung oder falschen Argumenten.
+    """
+    name, *argumente = text.split(":")
+    if name not in VERTEILUNGEN:
+        raise argparse.ArgumentTypeError(
+            f"Verteilung nicht bekannt: {name} (möglich: {', '.join(VERTEILUNGEN)})"
+        )
+    try:
+        werte = tuple(float(argument) for argument in argumente)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Argumente müssen Zahlen sein: {text}")
+
+    anzahl = VERTEILUNGEN[name]
+    if (anzahl is None and not werte) or (anzahl is not None and len(werte) != anzahl):
+        raise argparse.ArgumentTypeError(f"Falsche Anzahl Argumente: {text}")
+    if name == "uniform" and werte[0] > werte[1]:
+        raise argparse.ArgumentTypeError(f"MIN muss kleiner als MAX sein: {text}")
+    if name == "normal" and werte[1] < 0:
+        raise argparse.ArgumentTypeError(f"STD darf nicht negativ sein: {text}")
+    if name == "triangular" and not werte[0] <= werte[1] <= werte[2]:
+        raise argparse.ArgumentTypeError(f"Es muss MIN <= MODUS <= MAX gelten: {text}")
+    return name, werte
+
+
+def ziehe(
+    verteilung: tuple[str, tuple[float, ...]], anzahl: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Zieht anzahl Werte aus einer Verteilung von verteilung()."""
+    name, werte = verteilung
+    if name == "fixed":
+        return np.full(anzahl, werte[0])
+    if name == "uniform":
+        return rng.uniform(werte[0], werte[1], anzahl)
+    if name == "normal":
+        return rng.normal(werte[0], werte[1], anzahl)
+    if name == "triangular":
+        if werte[0] == werte[2]:
+            return np.full(anzahl, werte[0])
+        return rng.triangular(werte[0], werte[1], werte[2], anzahl)
+    return rng.choice(np.array(werte), anzahl)
+
+
+def berechne_ertragsanteile(
+    daten: list[stromertrag.Gebaeude], jahressumme: float | np.ndarray
+) -> dict[str, dict[str, np.ndarray]]:
+    """Diese Funktion zerlegt den Jahresertrag jeder Konfiguration in fix und proportional.
+
+    Der Wirkungsgrad wird zur Eingabe, Konfigurationen unterscheiden sich daher nur
+    noch in Dachtyp, Orientierung und Neigung. Die Erträge gelten für Wirkungsgrad 1
+    und Globalstrahlungsfaktor 1.
+
+    Args:
+        daten (list[stromertrag.Gebaeude]): Gebäudemodelle aus erstelle_gebaeudemodell.
+        jahressumme (float | np.ndarray): Siehe stromertrag.lade_jahressumme.
+
+    Returns:
+        dict[str, dict[str, np.ndarray]]: Pro Berechnungsart fix und proportional
+            (Wh, Konfigurationen aller Gebäude hintereinander), start (erste
+            Konfiguration jedes Gebäudes) sowie fix_mittel und proportional_mittel
+            (Mittelwert über die Konfigurationen jedes Gebäudes).
+    """
+    konfigurationen = stromertrag.berechne_konfigurationsertraege(daten, jahressumme)
+    referenz = stromertrag.wirkungsgrad_liste[0]
+    konfigurationen = konfigurationen[konfigurationen["wirkungsgrad"] == referenz]
+
+    anteile = {}
+    for berechnungsart in stromertrag.berechnungsarten:
+        teil = konfigurationen[konfigurationen["berechnungsart"] == berechnungsart]
+        ertrag = teil["jahresertrag"].to_numpy(dtype=np.float64) / referenz
+        skaliert = np.isin(
+            teil["roof_type"].to_numpy(),
+            [dach for art, dach in MIT_REDUKTIONSFAKTOR if art == berechnungsart],
+        )
+        fix = np.where(skaliert, 0.0, ertrag)
+        proportional = np.where(skaliert, ertrag / stromertrag.reduction_factor, 0.0)
+
+        # Konfigurationen eines Gebäudes sind zusammenhängend
+        building = teil["building"].to_numpy()
+        start = np.flatnonzero(np.r_[True, building[1:] != building[:-1]])
+        anzahl = np.diff(np.r_[start, len(building)])
+        anteile[berechnungsart] = {
+            "fix": fix,
+            "proportional": proportional,
+            "start": start,
+            "fix_mittel": np.add.reduceat(fix, start) / anzahl,
+            "proportional_mittel": np.add.reduceat(proportional, start) / anzahl,
+        }
+    return anteile
+
+
+def werte_aus(
+    anteile: dict[str, np.ndarray], stichproben: np.ndarray, statistic: str = "avg"
+) -> np.ndarray:
+    """Diese Funktion berechnet den Jahresertrag aller Gebäude für Stichproben.
+
+    Args:
+        anteile (dict[str, np.ndarray]): Eine Berechnungsart aus
+            berechne_ertragsanteile.
+        stichproben (np.ndarray): Form (Stichproben, PARAMETER).
+        statistic (str): min, avg oder max über die Konfigurationen eines Gebäudes.
+
+    Returns:
+        np.ndarray: Jahresertrag in Wh mit Form (Stichproben, Gebäude).
+    """
+    wirkungsgrad, reduktion, faktor = stichproben.T
+    skalierung = (wirkungsgrad * faktor)[:, np.newaxis]
+    if statistic == "avg":
+        return (
+            anteile["fix_mittel"]
+            + reduktion[:, np.newaxis] * anteile["proportional_mittel"]
+        ) * skalierung
+
+    # Wirkungsgrad und Faktor sind positiv und ändern die beste Konfiguration nicht
+    reduziere = np.maximum if statistic == "max" else np.minimum
+    block = max(1, BLOCK_ELEMENTE // len(anteile["fix"]))
+    ergebnis = np.empty((len(stichproben), len(anteile["start"])))
+    for anfang in range(0, len(stichproben), block):
+        ende = min(anfang + block, len(stichproben))
+        ertraege = (
+            anteile["fix"]
+            + reduktion[anfang:ende, np.newaxis] * anteile["proportional"]
+        )
+        ergebnis[anfang:ende] = reduziere.reduceat(ertraege, anteile["start"], axis=1)
+    return ergebnis * skalierung
+
+
+def sobol_indizes(
+    f_a: np.ndarray, f_b: np.ndarray, f_ab: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Sobol-Indizes erster Ordnung (Saltelli 2010) und Totaleffekte (Jansen).
+
+    Args:
+        f_a (np.ndarray): Ausgabe für A mit Form (N,).
+        f_b (np.ndarray): Ausgabe für B mit Form (N,).
+        f_ab (np.ndarray): Ausgabe für A_B^i mit Form (Parameter, N).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: S1 und ST mit Form (Parameter,), NaN wenn
+            die Ausgabe nicht streut.
+    """
+    # Zentrieren ändert die Indizes nicht, verringert aber die Streuung des
+    # Schätzers erster Ordnung stark (Erträge liegen weit von 0 entfernt)
+    alle = np.concatenate([f_a, f_b])
+    mittelwert = alle.mean()
+    f_a, f_b, f_ab = f_a - mittelwert, f_b - mittelwert, f_ab - mittelwert
+    varianz = np.var(alle, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        erste_ordnung = np.mean(f_b * (f_ab - f_a), axis=-1) / varianz
+        total = 0.5 * np.mean((f_a - f_ab) ** 2, axis=-1) / varianz
+    return erste_ordnung, total
+
+
+def berechne_sensitivitaet(
+    daten: list[stromertrag.Gebaeude],
+    jahressumme: float | np.ndarray,
+    verteilungen: dict[str, tuple[str, tuple[float, ...]]],
+    anzahl: int = 10_000,
+    statistic: str = "avg",
+    konfidenz: float = 0.9,
+    bootstrap: int = 100,
+    seed: int = 0,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Diese Funktion berechnet Konfidenzintervalle und Sobol-Indizes des Jahresertrags.
+
+    Args:
+        daten (list[stromertrag.Gebaeude]): Gebäudemodelle aus erstelle_gebaeudemodell.
+        jahressumme (float | np.ndarray): Siehe stromertrag.lade_jahressumme.
+        verteilungen (dict): Pro Eintrag in PARAMETER eine Verteilung von verteilung().
+        anzahl (int): Anzahl N der Stichproben pro Matrix A und B.
+        statistic (str): min, avg oder max über die Konfigurationen eines Gebäudes.
+        konfidenz (float): Niveau der Intervalle, z.B. 0.9 für 5 % bis 95 %.
+        bootstrap (int): Anzahl Bootstrap-Stichproben für die Intervalle der Indizes.
+        seed (int): Startwert des Zufallsgenerators.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Intervalle pro Gebäude und Berechnungsart
+            (Gebäude "Campus" für die Summe) und Indizes pro Berechnungsart und
+            Parameter.
+    """
+    rng = np.random.default_rng(seed)
+    a = np.column_stack(
+        [ziehe(verteilungen[parameter], anzahl, rng) for parameter in PARAMETER]
+    )
+    b = np.column_stack(
+        [ziehe(verteilungen[parameter], anzahl, rng) for parameter in PARAMETER]
+    )
+    if (a < 0).any() or (b < 0).any():
+        negativ = [
+            p
+            for i, p in enumerate(PARAMETER)
+            if (a[:, i] < 0).any() or (b[:, i] < 0).any()
+        ]
+        sys.exit(
+            f"Fehler: Die Verteilung von {', '.join(negativ)} liefert negative Werte"
+        )
+    ab = np.repeat(a[np.newaxis], len(PARAMETER), axis=0)
+    for i in range(len(PARAMETER)):
+        ab[i, :, i] = b[:, i]
+
+    anteile = berechne_ertragsanteile(daten, jahressumme)
+    gebaeude = [g.building for g in daten]
+    quantile = [(1 - konfidenz) / 2, 0.5, (1 + konfidenz) / 2]
+
+    intervalle = []
+    indizes = []
+    for berechnungsart, anteil in anteile.items():
+        ertraege_a = werte_aus(anteil, a, statistic) / 1000
+        f_a = ertraege_a.sum(axis=1)
+        f_b = werte_aus(anteil, b, statistic).sum(axis=1) / 1000
+        f_ab = (
+            werte_aus(anteil, ab.reshape(-1, len(PARAMETER)), statistic)
+            .sum(axis=1)
+            .reshape(len(PARAMETER), anzahl)
+            / 1000
+        )
+
+        alle = np.column_stack([ertraege_a, f_a])
+        grenzen = np.quantile(alle, quantile, axis=0)
+        intervalle.append(
+            pd.DataFrame(
+                {
+                    "building": gebaeude + ["Campus"],
+                    "berechnungsart": berechnungsart,
+                    "jahresertrag_kwh_mittel": alle.mean(axis=0),
+                    "jahresertrag_kwh_std": alle.std(axis=0, ddof=1),
+                    "jahresertrag_kwh_unten": grenzen[0],
+                    "jahresertrag_kwh_median": grenzen[1],
+                    "jahresertrag_kwh_oben": grenzen[2],
+                }
+            )
+        )
+
+        erste_ordnung, total = sobol_indizes(f_a, f_b, f_ab)
+        bootstrap_s1 = np.empty((bootstrap, len(PARAMETER)))
+        bootstrap_st = np.empty((bootstrap, len(PARAMETER)))
+        for nummer in range(bootstrap):
+            stichprobe = rng.integers(0, anzahl, anzahl)
+            bootstrap_s1[nummer], bootstrap_st[nummer] = sobol_indizes(
+                f_a[stichprobe], f_b[stichprobe], f_ab[:, stichprobe]
+            )
+        niveau = [(1 - konfidenz) / 2, (1 + konfidenz) / 2]
+        s1_grenzen = np.quantile(bootstrap_s1, niveau, axis=0)
+        st_grenzen = np.quantile(bootstrap_st, niveau, axis=0)
+        indizes.append(
+            pd.DataFrame(
+                {
+                    "berechnungsart": berechnungsart,
+                    "parameter": PARAMETER,
+                    "verteilung": [
+                        ":".join([verteilungen[p][0], *map(str, verteilungen[p][1])])
+                        for p in PARAMETER
+                    ],
+                    "s1": erste_ordnung,
+                    "s1_unten": s1_grenzen[0],
+                    "s1_oben": s1_grenzen[1],
+                    "st": total,
+                    "st_unten": st_grenzen[0],
+                    "st_oben": st_grenzen[1],
+                }
+            )
+        )
+
+    return (
+        pd.concat(intervalle, ignore_index=True),
+        pd.concat(indizes, ignore_index=True),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=10_000,
+        help="Stichproben N pro Matrix, ausgewertet werden N * 5 (Standard: 10000)",
+    )
+    parser.add_argument(
+        "--efficiency",
+        type=verteilung,
+        default=verteilung(
+            f"uniform:{min(stromertrag.wirkungsgrad_liste)}"
+            f":{max(stromertrag.wirkungsgrad_liste)}"
+        ),
+        help="Verteilung des Wirkungsgrads (Standard: uniform über wirkungsgrad_liste)",
+    )
+    parser.add_argument(
+        "--reduction-factor",
+        type=verteilung,
+        default=verteilung("triangular:0.6:0.8:1.0"),
+        help="Verteilung des Reduktionsfaktors (Standard: triangular:0.6:0.8:1.0)",
+    )
+    parser.add_argument(
+        "--irradiance-scale",
+        type=verteilung,
+        default=verteilung("normal:1.0:0.05"),
+        help="Verteilung des Faktors auf die Globalstrahlung (Standard: normal:1.0:0.05)",
+    )
+    parser.add_argument(
+        "--statistic",
+        choices=["min", "avg", "max"],
+        default="avg",
+        help="Konfiguration pro Gebäude: schlechteste, Mittel oder beste (Standard: avg)",
+    )
+    parser.add_argument("--confidence", type=float, default=0.9)
+    parser.add_argument("--bootstrap", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--buildings",
+        metavar="CSV",
+        default="data/grundflaeche.csv",
+        help="Gebäudebestand im Format von data/grundflaeche.csv",
+    )
+    parser.add_argument(
+        "--irradiance",
+        metavar="CSV",
+        default=stromertrag.globalstrahlung_datei,
+        help="Datei mit der stündlichen Globalstrahlung "
+        f"(Standard: {stromertrag.globalstrahlung_datei})",
+    )
+    parser.add_argument(
+        "--transposition",
+        action="store_true",
+        help="Einstrahlung auf Modulebene statt statischem relativen Ertrag",
+    )
+    parser.add_argument(
+        "--output",
+        default="data/sensitivitaet",
+        help="Präfix der Ausgabedateien {output}_intervalle.csv und {output}_indizes.csv",
+    )
+    args = parser.parse_args()
+    stromertrag.globalstrahlung_datei = args.irradiance
+    if args.samples < 2 or args.bootstrap < 1:
+        sys.exit("Fehler: --samples muss mindestens 2, --bootstrap mindestens 1 sein")
+    if not 0 < args.confidence < 1:
+        sys.exit("Fehler: --confidence muss zwischen 0 und 1 liegen")
+
+    daten = [
+        stromertrag.erstelle_gebaeudemodell(gebaeude)
+        for block in stromertrag.lese_gebaeude_bloecke(args.buildings, 1000)
+        for gebaeude in block
+    ]
+    jahressumme = stromertrag.lade_jahressumme(args.transposition)
+
+    start = time.perf_counter()
+    intervalle, indizes = berechne_sensitivitaet(
+        daten,
+        jahressumme,
+        {
+            "wirkungsgrad": args.efficiency,
+            "reduction_factor": args.reduction_factor,
+            "globalstrahlung_faktor": args.irradiance_scale,
+        },
+        args.samples,
+        args.statistic,
+        args.confidence,
+        args.bootstrap,
+        args.seed,
+    )
+    dauer = time.perf_counter() - start
+
+    intervalle.to_csv(f"{args.output}_intervalle.csv", index=False)
+    indizes.to_csv(f"{args.output}_indizes.csv", index=False)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(intervalle[intervalle["building"] == "Campus"].to_string(index=False))
+        print()
+        print(indizes.to_string(index=False))
+    print(
+        f"\n{args.samples * (len(PARAMETER) + 2)} Auswertungen x {len(daten)} Gebäude "
+        f"in {dauer:.1f} s, gespeichert in '{args.output}_intervalle.csv' und "
+        f"'{args.output}_indizes.csv'"
+    )
@@ -33,10 +33,35 @@ Jährlicher Stromertrag:
         Parameter: roof_area, solar_irradiation, module_efficiency, relative_yield
 """
 
+import argparse
+import hashlib
 import json
 import os
 import sys
-
+import tempfile
+import textwrap
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from auswertung import (
+    MATPLOTLIB_VERFUEGBAR,
+    PLOT_ORDNER,
+    ROLLUP_AUFLOESUNGEN,
+    safe_filename,
+    sortiere_aggregate,
+    speichere_aggregate_als_excel,
+    speichere_plots,
+    speichere_rollups,
+)
+from leistungskern import KERNE, NUMBA_VERFUEGBAR, aggregiere_stunden
+from quantil_sketch import KllSketch
 from formulas.roof_areas_scheffler import (
     flat_roof_area_scheffler,
     gable_roof_area_scheffler,
@@ -47,14 +72,121 @@ from formulas.roof_areas_tum import (
     gable_roof_area_tum,
     pitched_roof_area_tum,
 )
+from formulas.annual_solar_yield import annual_solar_yield
 from formulas.relative_yield_potential import (
+    data as relative_yield_data,
     get_relative_yield,
     orientations,
+    tilt_angles as tabellen_neigungen,
+)
+from formulas.solar_position import (
+    plane_of_array_irradiance,
+    solar_position_for_year,
 )
 
 tilt_angles = [20, 30, 40, 50]
 wirkungsgrad_liste = [0.18, 0.20, 0.22, 0.24]
 
+# Reduktionsfaktor der Dachflächen (pitched nach Scheffler und TUM, gable nach TUM)
+reduction_factor = 0.8
+
+# Standort der Globalstrahlungsmessung (Mistelbach bei Bayreuth)
+standort_breitengrad = 49.91
+standort_laengengrad = 11.52
+standort_zeitzone = "Europe/Berlin"
+
+# Globalstrahlung für die array-basierten Berechnungen (siehe --irradiance)
+globalstrahlung_datei = "data/globalstrahlung_stuendlich_mistelbach.csv"
+
+# Zeitformat der Globalstrahlung und Auflösung der Analyse (siehe --resolution).
+# Bei None werden die Zeitschritte der Datei unverändert übernommen.
+globalstrahlung_format = "%d.%m.%Y %H:%M"
+globalstrahlung_aufloesung = None
+
+# Kern für min/avg/max pro Stunde in berechne_aggregate (siehe --kernel)
+leistungs_kern = "auto"
+
+# Zwischenstände der Berechnung pro Gebäude (siehe --resume). Die Version geht in
+# den Eingabe-Hash ein und wird erhöht, wenn sich dessen Inhalt ändert.
+checkpoint_ordner = "data/checkpoints"
+EINGABE_HASH_VERSION = 2
+
+# Achsen der Arrays im Gebäudemodell (Flachdach: Neigung 0°)
+berechnungsarten = ["scheaffler", "tum"]
+dachtypen = ["flat", "gable", "pitched"]
+neigungen = [0] + tilt_angles
+
+# Relativer Ertrag mit Form (orientations, neigungen)
+relative_ertrag_tabelle = np.array(
+    [
+        [get_relative_yield(orientation=i, tilt=j) for j in neigungen]
+        for i in orientations
+    ]
+)
+relative_ertrag_tabelle.flags.writeable = False
+
+# Relativer Ertrag der ganzen Tabelle mit Form (tabellen_neigungen, orientations)
+relative_ertrag_gesamt = np.array(relative_yield_data, dtype=np.float64) / 100
+relative_ertrag_gesamt.flags.writeable = False
+
+# Dachtypen, auch als Dachart der Grundflächen-CSV (SolarYieldModel, ertragsdienst)
+dachtyp_namen = {
+    "flat": "flat",
+    "flachdach": "flat",
+    "gable": "gable",
+    "satteldach": "gable",
+    "pitched": "pitched",
+    "schrägdach": "pitched",
+    "mixed": "mixed",
+    "gemischt": "mixed",
+}
+
+
+@dataclass(slots=True)
+class Gebaeude:
+    """Kompakte Gebäudedaten mit Dachflächen und relativen Erträgen als Arrays.
+
+    Attributes:
+        building (str): Name des Gebäudes.
+        building_area (float): Grundfläche in m².
+        roof_type (str): flat, gable, pitched oder mixed.
+        ausrichtungen (np.ndarray): Mögliche Orientierungen in Grad, bei "variabel"
+            alle orientations.
+        dachflaechen (np.ndarray): Dachflächen mit Form (berechnungsarten, dachtypen,
+            neigungen), NaN für nicht vorhandene Dachtypen.
+        relative_ertraege (np.ndarray): Relativer Ertrag mit Form
+            (ausrichtungen, neigungen).
+    """
+
+    building: str
+    building_area: float
+    roof_type: str
+    ausrichtungen: np.ndarray
+    dachflaechen: np.ndarray
+    relative_ertraege: np.ndarray
+
+
+@dataclass(slots=True)
+class Gebaeudegruppe:
+    """Gebäude mit gleichem Dachtyp und gleicher Orientierung, die dieselben
+    Konfigurationen haben und in SolarYieldModel.predict zusammen berechnet werden.
+
+    Attributes:
+        building_area (np.ndarray): Grundfläche in m² pro Gebäude.
+        roof_type (str): flat, gable, pitched oder mixed.
+        ausrichtungen (np.ndarray): Mögliche Orientierungen in Grad wie in Gebaeude.
+        dachflaechen (np.ndarray): Dachflächen mit Form (Gebäude, berechnungsarten,
+            dachtypen, neigungen).
+        relative_ertraege (np.ndarray): Relativer Ertrag mit Form
+            (ausrichtungen, neigungen).
+    """
+
+    building_area: np.ndarray
+    roof_type: str
+    ausrichtungen: np.ndarray
+    dachflaechen: np.ndarray
+    relative_ertraege: np.ndarray
+
 
 def erstelle_daten() -> list:
     """Diese Funktion liest die Grundfläche ein und gibt sie als Liste zurück.
@@ -73,36 +205,103 @@ def erstelle_daten() -> list:
                 print("INFO: CSV hat folgende Spalten: ", inhalte)
                 continue
 
-            if len(inhalte) != 4:
-                sys.exit("Fehler: CSV hat nicht die richtige Anzahl an Spalten")
-
-            roof_type = ""
-            match inhalte[2].lower():
-                case "satteldach":
-                    roof_type = "gable"
-                case "flachdach":
-                    roof_type = "flat"
-                case "schrägdach":
-                    roof_type = "pitched"
-                case "gemischt":
-                    roof_type = "mixed"
-                case _:
-                    sys.exit("Fehler: Dachtyp nicht bekannt: " + inhalte[2])
-
-            daten.append(
-                {
-                    "building": inhalte[0],
-                    "building_area": float(
-                        inhalte[1].replace(".", "").replace(",", ".")
-                    ),
-                    "roof_type": roof_type,
-                    "orientation": inhalte[3],
-                }
-            )
+            try:
+                daten.append(_parse_gebaeude(inhalte))
+            except ValueError as e:
+                sys.exit(f"Fehler: data/grundflaeche.csv, Zeile {idx + 1}: {e}")
 
     return daten
 
 
+def _parse_gebaeude(inhalte: list[str]) -> dict:
+    """Wandelt die Spalten einer Zeile der Grundflächen-CSV in Gebäudedaten um.
+
+    Args:
+        inhalte (list[str]): Gebäude, Grundfläche, Dachart und Orientierung.
+
+    Returns:
+        dict: Gebäudedaten.
+
+    Raises:
+        ValueError: Bei falscher Spaltenzahl, unbekanntem Dachtyp, einer Grundfläche,
+            die keine positive Zahl ist, oder unbekannter Orientierung (wie
+            SolarYieldModel.pruefe).
+    """
+    if len(inhalte) != 4:
+        raise ValueError("CSV hat nicht die richtige Anzahl an Spalten")
+
+    roof_type = ""
+    match inhalte[2].lower():
+        case "satteldach":
+            roof_type = "gable"
+        case "flachdach":
+            roof_type = "flat"
+        case "schrägdach":
+            roof_type = "pitched"
+        case "gemischt":
+            roof_type = "mixed"
+        case _:
+            raise ValueError("Dachtyp nicht bekannt: " + inhalte[2])
+
+    try:
+        building_area = float(inhalte[1].replace(".", "").replace(",", "."))
+    except ValueError:
+        building_area = np.nan
+    if not (np.isfinite(building_area) and building_area > 0):
+        raise ValueError(f"Grundfläche muss eine positive Zahl sein: {inhalte[1]}")
+
+    if inhalte[3] != "variabel":
+        try:
+            gueltig = float(inhalte[3]) in orientations
+        except ValueError:
+            gueltig = False
+        if not gueltig:
+            raise ValueError(
+                f"Orientierung muss 'variabel' oder eine von {orientations} sein: "
+                + inhalte[3]
+            )
+
+    return {
+        "building": inhalte[0],
+        "building_area": building_area,
+        "roof_type": roof_type,
+        "orientation": inhalte[3],
+    }
+
+
+def lese_gebaeude_bloecke(pfad: str, block_groesse: int) -> Iterator[list[dict]]:
+    """Diese Funktion liest eine Grundflächen-CSV blockweise ein.
+
+    Es wird immer nur ein Block von Gebäuden im Speicher gehalten. Eine fehlerhafte
+    Zeile beendet das Programm mit Datei und Zeilennummer.
+
+    Args:
+        pfad (str): Pfad zur CSV im Format von data/grundflaeche.csv.
+        block_groesse (int): Anzahl Gebäude pro Block.
+
+    Yields:
+        list[dict]: Gebäudedaten eines Blocks.
+    """
+    if not os.path.exists(pfad):
+        sys.exit(f"Fehler: Datei {pfad} nicht gefunden")
+
+    block = []
+    with open(pfad, "r", encoding="utf-8") as file:
+        next(file, None)
+        for nummer, zeile in enumerate(file, start=2):
+            if not zeile.strip():
+                continue
+            try:
+                block.append(_parse_gebaeude(zeile.strip().split(";")[:4]))
+            except ValueError as e:
+                sys.exit(f"Fehler: {pfad}, Zeile {nummer}: {e}")
+            if len(block) == block_groesse:
+                yield block
+                block = []
+    if block:
+        yield block
+
+
 def calulate_roof_area(daten: list[dict]) -> list[dict]:
     """Diese Funktion berechnet die Dachfläche.
 
@@ -131,7 +330,9 @@ def calulate_roof_area(daten: list[dict]) -> list[dict]:
                 )
                 gebaeude[f"roof_area_tum_gable_with_tilt_angle_{i}"] = (
                     gable_roof_area_tum(
-                        building_area=building_area, reduction_factor=0.8, tilt_angle=i
+                        building_area=building_area,
+                        reduction_factor=reduction_factor,
+                        tilt_angle=i,
                     )
                 )
 
@@ -139,12 +340,16 @@ def calulate_roof_area(daten: list[dict]) -> list[dict]:
             for i in tilt_angles:
                 gebaeude[f"roof_area_schaeffler_pitched_with_tilt_angle_{i}"] = (
                     pitched_roof_area_scheffler(
-                        building_area=building_area, reduction_factor=0.8, tilt_angle=i
+                        building_area=building_area,
+                        reduction_factor=reduction_factor,
+                        tilt_angle=i,
                     )
                 )
                 gebaeude[f"roof_area_tum_pitched_with_tilt_angle_{i}"] = (
                     pitched_roof_area_tum(
-                        building_area=building_area, reduction_factor=0.8, tilt_angle=i
+                        building_area=building_area,
+                        reduction_factor=reduction_factor,
+                        tilt_angle=i,
                     )
                 )
 
@@ -162,18 +367,24 @@ def calulate_roof_area(daten: list[dict]) -> list[dict]:
                 )
                 gebaeude[f"roof_area_tum_gable_with_tilt_angle_{i}"] = (
                     gable_roof_area_tum(
-                        building_area=building_area, reduction_factor=0.8, tilt_angle=i
+                        building_area=building_area,
+                        reduction_factor=reduction_factor,
+                        tilt_angle=i,
                     )
                 )
 
                 gebaeude[f"roof_area_schaeffler_pitched_with_tilt_angle_{i}"] = (
                     pitched_roof_area_scheffler(
-                        building_area=building_area, reduction_factor=0.8, tilt_angle=i
+                        building_area=building_area,
+                        reduction_factor=reduction_factor,
+                        tilt_angle=i,
                     )
                 )
                 gebaeude[f"roof_area_tum_pitched_with_tilt_angle_{i}"] = (
                     pitched_roof_area_tum(
-                        building_area=building_area, reduction_factor=0.8, tilt_angle=i
+                        building_area=building_area,
+                        reduction_factor=reduction_factor,
+                        tilt_angle=i,
                     )
                 )
 
@@ -241,27 +452,28 @@ def calculate_globalstrahlung_pro_stunde(daten: list[dict]) -> list[dict]:
     Returns:
         list[dict]: Liste mit den Gebäudedaten und der Globalstrahlung.
     """
-    if not os.path.exists("data/globalstrahlung_stuendlich_mistelbach.csv"):
-        sys.exit(
-            "Fehler: Datei data/globalstrahlung_stuendlich_mistelbach.csv nicht gefunden"
-        )
+    if not os.path.exists(globalstrahlung_datei):
+        sys.exit(f"Fehler: Datei {globalstrahlung_datei} nicht gefunden")
 
     globalstrahlungs_werte: list[dict] = []
-    with open(
-        "data/globalstrahlung_stuendlich_mistelbach.csv", "r", encoding="utf-8"
-    ) as file:
-        for zeile in file:
-            zeitstempel, wert = zeile.strip().split(";")
-
-            if not isinstance(zeitstempel, str) or not isinstance(wert, str):
-                sys.exit("Fehler: Datei hat nicht das richtige Format")
-
-            globalstrahlungs_werte.append(
-                {
-                    "zeitstempel": zeitstempel,
-                    "wert": float(wert.replace(",", ".")),
-                }
-            )
+    if globalstrahlung_aufloesung is not None:
+        zeitstempel_liste, werte = lese_globalstrahlung_gestreamt(globalstrahlung_datei)
+        for zeitstempel, wert in zip(zeitstempel_liste, werte.tolist()):
+            globalstrahlungs_werte.append({"zeitstempel": zeitstempel, "wert": wert})
+    else:
+        with open(globalstrahlung_datei, "r", encoding="utf-8") as file:
+            for zeile in file:
+                zeitstempel, wert = zeile.strip().split(";")
+
+                if not isinstance(zeitstempel, str) or not isinstance(wert, str):
+                    sys.exit("Fehler: Datei hat nicht das richtige Format")
+
+                globalstrahlungs_werte.append(
+                    {
+                        "zeitstempel": zeitstempel,
+                        "wert": float(wert.replace(",", ".")),
+                    }
+                )
 
     for gebaeude in daten:
         roof_type = gebaeude.get("roof_type")
@@ -845,19 +1057,1685 @@ def calculate_globalstrahlung_pro_stunde(daten: list[dict]) -> list[dict]:
     return daten
 
 
-def speichere_daten_als_json(daten: list[dict]) -> None:
+def speichere_daten_als_json(
+    daten: list[dict], pfad: str = "data/ergebnisse.json"
+) -> None:
     """Diese Funktion speichert die Daten als JSON-Datei.
 
     Args:
         daten (list[dict]): Liste mit den Gebäudedaten.
+        pfad (str): Zieldatei.
     """
-    with open("data/ergebnisse.json", "w", encoding="utf-8") as file:
+    with open(pfad, "w", encoding="utf-8") as file:
         json.dump(daten, file, indent=4)
 
 
+def schreibe_atomar(pfad: str, inhalt: str) -> None:
+    """Schreibt eine Datei so, dass sie entweder vollständig oder gar nicht existiert.
+
+    Der Inhalt wird zuerst in eine temporäre Datei im selben Ordner geschrieben
+    und dann per os.replace umbenannt.
+    """
+    ordner = os.path.dirname(pfad) or "."
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=ordner, suffix=".tmp", delete=False
+    ) as file:
+        file.write(inhalt)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(file.name, pfad)
+
+
+def datei_hash(pfad: str) -> str:
+    """SHA-256 einer Datei."""
+    sha = hashlib.sha256()
+    with open(pfad, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _eingabe_hash(gebaeude: dict, globalstrahlung_hash: str) -> str:
+    """Hash aller Eingaben, von denen das Ergebnis eines Gebäudes abhängt.
+
+    Args:
+        gebaeude (dict): Gebäudedaten aus erstelle_daten.
+        globalstrahlung_hash (str): SHA-256 der Globalstrahlungsdatei.
+
+    Returns:
+        str: SHA-256 über Gebäudezeile, Globalstrahlung und ihre Auflösung,
+            Neigungen, Wirkungsgrade und Reduktionsfaktor.
+    """
+    eingaben = {
+        "version": EINGABE_HASH_VERSION,
+        "gebaeude": [
+            gebaeude.get(feld)
+            for feld in ["building", "building_area", "roof_type", "orientation"]
+        ],
+        "globalstrahlung": globalstrahlung_hash,
+        "globalstrahlung_aufloesung": [
+            globalstrahlung_aufloesung,
+            globalstrahlung_format,
+        ],
+        "tilt_angles": tilt_angles,
+        "wirkungsgrad_liste": wirkungsgrad_liste,
+        "reduction_factor": reduction_factor,
+    }
+    return hashlib.sha256(json.dumps(eingaben).encode("utf-8")).hexdigest()
+
+
+def _lies_checkpoint_hash(pfad: str) -> str | None:
+    """Liest den Eingabe-Hash aus der ersten Zeile eines Checkpoints."""
+    if not os.path.exists(pfad):
+        return None
+    with open(pfad, "r", encoding="utf-8") as file:
+        try:
+            return json.loads(file.readline()).get("eingabe_hash")
+        except (json.JSONDecodeError, AttributeError):
+            return None
+
+
+def berechne_mit_checkpoints(
+    daten: list[dict], resume: bool = False, ordner: str = checkpoint_ordner
+) -> list[str]:
+    """Diese Funktion berechnet die Globalstrahlung pro Stunde Gebäude für Gebäude
+    und speichert jedes Ergebnis sofort als Checkpoint.
+
+    Ein Checkpoint besteht aus einer Kopfzeile mit dem Eingabe-Hash und den
+    Gebäudedaten als JSON. Er wird atomar geschrieben, ein Abbruch hinterlässt also
+    nie einen halben Checkpoint. Mit resume werden Gebäude übersprungen, deren
+    Checkpoint zum aktuellen Eingabe-Hash passt. Es wird immer nur ein Gebäude
+    im Speicher gehalten.
+
+    Args:
+        daten (list[dict]): Liste mit den Gebäudedaten, Dachflächen und relativen Erträgen.
+        resume (bool): Vorhandene, gültige Checkpoints wiederverwenden.
+        ordner (str): Ordner für die Checkpoints.
+
+    Returns:
+        list[str]: Pfade der Checkpoints in der Reihenfolge der Gebäude.
+    """
+    if not os.path.exists(globalstrahlung_datei):
+        sys.exit(f"Fehler: Datei {globalstrahlung_datei} nicht gefunden")
+    globalstrahlung_hash = datei_hash(globalstrahlung_datei)
+
+    os.makedirs(ordner, exist_ok=True)
+    pfade = []
+    for idx, gebaeude in enumerate(daten):
+        pfad = os.path.join(
+            ordner, f"{idx:05d}_{safe_filename(gebaeude.get('building'))}.json"
+        )
+        pfade.append(pfad)
+        eingabe_hash = _eingabe_hash(gebaeude, globalstrahlung_hash)
+
+        if resume:
+            checkpoint_hash = _lies_checkpoint_hash(pfad)
+            if checkpoint_hash == eingabe_hash:
+                print(f"Checkpoint für {gebaeude.get('building')} wird verwendet")
+                continue
+            if checkpoint_hash is not None:
+                print(
+                    f"Checkpoint für {gebaeude.get('building')} passt nicht zu den "
+                    "Eingaben und wird neu berechnet"
+                )
+
+        ergebnis = calculate_globalstrahlung_pro_stunde([dict(gebaeude)])[0]
+        schreibe_atomar(
+            pfad,
+            json.dumps({"eingabe_hash": eingabe_hash})
+            + "\n"
+            + json.dumps(ergebnis)
+            + "\n",
+        )
+
+    return pfade
+
+
+def speichere_checkpoints_als_json(
+    pfade: list[str], pfad: str = "data/ergebnisse.json"
+) -> None:
+    """Diese Funktion fügt die Checkpoints zur ergebnisse.json zusammen.
+
+    Die Datei ist identisch zu der von speichere_daten_als_json, es wird aber
+    immer nur ein Gebäude gleichzeitig geladen.
+
+    Args:
+        pfade (list[str]): Pfade der Checkpoints aus berechne_mit_checkpoints.
+        pfad (str): Zieldatei.
+    """
+    if not pfade:
+        speichere_daten_als_json([], pfad)
+        return
+
+    temporaer = pfad + ".tmp"
+    with open(temporaer, "w", encoding="utf-8") as file:
+        file.write("[\n")
+        for idx, checkpoint in enumerate(pfade):
+            with open(checkpoint, "r", encoding="utf-8") as eingabe:
+                eingabe.readline()
+                gebaeude = json.loads(eingabe.readline())
+            if idx > 0:
+                file.write(",\n")
+            file.write(textwrap.indent(json.dumps(gebaeude, indent=4), "    "))
+        file.write("\n]")
+    os.replace(temporaer, pfad)
+
+
+def lade_globalstrahlung(pfad: str | None = None) -> tuple[list[str], np.ndarray]:
+    """Diese Funktion liest die stündliche Globalstrahlung als Array ein.
+
+    Args:
+        pfad (str | None): Pfad zur CSV, Standard ist globalstrahlung_datei.
+
+    Returns:
+        tuple[list[str], np.ndarray]: Zeitstempel und Globalstrahlungswerte.
+    """
+    pfad = pfad or globalstrahlung_datei
+    if not os.path.exists(pfad):
+        sys.exit(f"Fehler: Datei {pfad} nicht gefunden")
+    if globalstrahlung_aufloesung is not None:
+        return lese_globalstrahlung_gestreamt(pfad)
+
+    zeitstempel_liste = []
+    werte = []
+    with open(pfad, "r", encoding="utf-8") as file:
+        for zeile in file:
+            zeitstempel, wert = zeile.strip().split(";")
+            zeitstempel_liste.append(zeitstempel)
+            werte.append(float(wert.replace(",", ".")))
+
+    return zeitstempel_liste, np.array(werte, dtype=np.float64)
+
+
+def lese_globalstrahlung_gestreamt(
+    pfad: str,
+    aufloesung: str | None = None,
+    zeitformat: str | None = None,
+    chunk_zeilen: int = 100_000,
+) -> tuple[list[str], np.ndarray]:
+    """Diese Funktion liest Globalstrahlung beliebiger fester Zeitschritte blockweise
+    ein und mittelt sie auf die Auflösung der Analyse.
+
+    Pro Block werden die Zeitstempel vektorisiert geparst, auf den Beginn ihres
+    Intervalls abgerundet und Summe und Anzahl pro Intervall gebildet. Im Speicher
+    liegen nur ein Block und die Teilsummen, unabhängig von der Länge der Datei.
+    Zeilen mit ungültigem Zeitstempel oder Wert werden übersprungen.
+
+    Args:
+        pfad (str): Pfad zur CSV (Zeitstempel;Wert).
+        aufloesung (str | None): Pandas-Frequenz wie "1h" oder "15min",
+            Standard ist globalstrahlung_aufloesung bzw. "1h".
+        zeitformat (str | None): strptime-Format der Zeitstempel, Standard ist
+            globalstrahlung_format.
+        chunk_zeilen (int): Anzahl Zeilen pro Block.
+
+    Returns:
+        tuple[list[str], np.ndarray]: Beginn jedes Intervalls im Format
+            "%d.%m.%Y %H:%M" und die mittlere Globalstrahlung des Intervalls.
+    """
+    aufloesung = aufloesung or globalstrahlung_aufloesung or "1h"
+    zeitformat = zeitformat or globalstrahlung_format
+    if not os.path.exists(pfad):
+        sys.exit(f"Fehler: Datei {pfad} nicht gefunden")
+
+    teilsummen = []
+    ungueltig = 0
+    for block in pd.read_csv(
+        pfad,
+        sep=";",
+        header=None,
+        usecols=[0, 1],
+        names=["zeitstempel", "wert"],
+        dtype={"zeitstempel": str},
+        skipinitialspace=True,
+        encoding="utf-8-sig",
+        chunksize=chunk_zeilen,
+    ):
+        zeitpunkte = pd.to_datetime(
+            block["zeitstempel"], format=zeitformat, errors="coerce"
+        )
+        werte = block["wert"]
+        if not pd.api.types.is_numeric_dtype(werte):
+            # Dezimalkomma oder ungültige Werte: der C-Parser liefert dann Strings
+            werte = pd.to_numeric(
+                werte.astype(str).str.replace(",", "."), errors="coerce"
+            )
+        gueltig = zeitpunkte.notna() & werte.notna()
+        ungueltig += int((~gueltig).sum())
+
+        teilsummen.append(
+            werte[gueltig]
+            .groupby(zeitpunkte[gueltig].dt.floor(aufloesung))
+            .agg(["sum", "count"])
+        )
+
+    if ungueltig:
+        print(f"{ungueltig} Zeilen mit ungültigem Zeitstempel oder Wert übersprungen")
+    if not teilsummen or not sum(len(teil) for teil in teilsummen):
+        sys.exit(f"Fehler: Datei {pfad} enthält keine gültigen Werte")
+
+    # Intervalle an Blockgrenzen kommen in zwei Teilsummen vor
+    summen = pd.concat(teilsummen).groupby(level=0).sum()
+    mittelwerte = (summen["sum"] / summen["count"]).to_numpy(dtype=np.float64)
+    return summen.index.strftime("%d.%m.%Y %H:%M").tolist(), mittelwerte
+
+
+def berechne_dachflaechen(
+    building_area: float | np.ndarray,
+    roof_type: str,
+    reduktionsfaktor: float | None = None,
+) -> np.ndarray:
+    """Diese Funktion berechnet die Dachflächen aller Berechnungsarten, Dachtypen und
+    Neigungen für ein Gebäude oder ein Array von Gebäuden gleichen Dachtyps.
+
+    Die Formeln werden mit dem ganzen Array aufgerufen, die Werte sind deshalb
+    identisch zu einem Aufruf pro Gebäude.
+
+    Args:
+        building_area (float | np.ndarray): Grundfläche(n) in m².
+        roof_type (str): flat, gable, pitched oder mixed.
+        reduktionsfaktor (float | None): Standard ist reduction_factor.
+
+    Returns:
+        np.ndarray: Dachflächen mit Form (*building_area.shape, berechnungsarten,
+            dachtypen, neigungen), NaN für nicht vorhandene Dachtypen.
+    """
+    if reduktionsfaktor is None:
+        reduktionsfaktor = reduction_factor
+    building_area = np.asarray(building_area, dtype=np.float64)
+    dachflaechen = np.full(
+        building_area.shape + (len(berechnungsarten), len(dachtypen), len(neigungen)),
+        np.nan,
+    )
+    if roof_type in ["flat", "mixed"]:
+        dachflaechen[..., 0, 0] = np.stack(
+            [
+                flat_roof_area_scheffler(building_area=building_area),
+                flat_roof_area_tum(building_area=building_area),
+            ],
+            axis=-1,
+        )
+    for idx, i in enumerate(tilt_angles, start=1):
+        if roof_type in ["gable", "mixed"]:
+            dachflaechen[..., 1, idx] = np.stack(
+                [
+                    gable_roof_area_scheffler(
+                        building_area=building_area, tilt_angle=i
+                    ),
+                    gable_roof_area_tum(
+                        building_area=building_area,
+                        reduction_factor=reduktionsfaktor,
+                        tilt_angle=i,
+                    ),
+                ],
+                axis=-1,
+            )
+        if roof_type in ["pitched", "mixed"]:
+            dachflaechen[..., 2, idx] = np.stack(
+                [
+                    pitched_roof_area_scheffler(
+                        building_area=building_area,
+                        reduction_factor=reduktionsfaktor,
+                        tilt_angle=i,
+                    ),
+                    pitched_roof_area_tum(
+                        building_area=building_area,
+                        reduction_factor=reduktionsfaktor,
+                        tilt_angle=i,
+                    ),
+                ],
+                axis=-1,
+            )
+    return dachflaechen
+
+
+def erstelle_gebaeudemodell(gebaeude: dict) -> Gebaeude:
+    """Diese Funktion berechnet Dachflächen und relative Erträge eines Gebäudes als Arrays.
+
+    Die Werte entsprechen denen von calulate_roof_area und calculate_relative_yield,
+    stehen aber nicht in einzelnen Feldern, sondern in Arrays.
+
+    Args:
+        gebaeude (dict): Gebäudedaten aus erstelle_daten.
+
+    Returns:
+        Gebaeude: Das Gebäudemodell.
+    """
+    building_area = gebaeude.get("building_area")
+    roof_type = gebaeude.get("roof_type")
+    orientation = gebaeude.get("orientation")
+
+    if roof_type not in ["flat", "gable", "pitched", "mixed"]:
+        sys.exit("Fehler: Dachtyp nicht bekannt: " + str(roof_type))
+    dachflaechen = berechne_dachflaechen(building_area, roof_type)
+
+    if orientation == "variabel" and roof_type != "flat":
+        ausrichtungen = np.array(orientations)
+    else:
+        ausrichtungen = np.array([int(orientation)])
+
+    return Gebaeude(
+        building=gebaeude.get("building"),
+        building_area=building_area,
+        roof_type=roof_type,
+        ausrichtungen=ausrichtungen,
+        dachflaechen=dachflaechen,
+        relative_ertraege=relative_ertrag_tabelle[
+            np.searchsorted(orientations, ausrichtungen)
+        ],
+    )
+
+
+@lru_cache(maxsize=None)
+def _konfigurationsindizes(roof_type: str, anzahl_ausrichtungen: int) -> tuple:
+    """Indizes aller Konfigurationen in die Achsen des Gebäudemodells.
+
+    Die Indizes hängen nur vom Dachtyp und der Anzahl Orientierungen ab und werden
+    deshalb einmal berechnet und für alle Gebäude wiederverwendet.
+
+    Returns:
+        tuple: dachtyp_idx, ausrichtung_idx, neigung_idx, Wirkungsgrade, Maske der
+            Flachdach-Konfigurationen, roof_type und Neigung in Grad. Die Arrays
+            sind schreibgeschützt.
+    """
+    anzahl_wirkungsgrade = len(wirkungsgrad_liste)
+    dachtyp_idx, ausrichtung_idx, neigung_idx, wirkungsgrade = [], [], [], []
+
+    if roof_type in ["flat", "mixed"]:
+        dachtyp_idx.append(np.zeros(anzahl_wirkungsgrade, dtype=np.intp))
+        # Wie in calculate_relative_yield gilt bei "variabel" die letzte Orientierung
+        ausrichtung_idx.append(
+            np.full(anzahl_wirkungsgrade, anzahl_ausrichtungen - 1, dtype=np.intp)
+        )
+        neigung_idx.append(np.zeros(anzahl_wirkungsgrade, dtype=np.intp))
+        wirkungsgrade.append(np.array(wirkungsgrad_liste))
+
+    if roof_type in ["gable", "pitched", "mixed"]:
+        geneigte = ["gable", "pitched"] if roof_type == "mixed" else [roof_type]
+        anzahl = anzahl_ausrichtungen * len(tilt_angles) * anzahl_wirkungsgrade
+        for dachtyp in geneigte:
+            dachtyp_idx.append(np.full(anzahl, dachtypen.index(dachtyp)))
+            ausrichtung_idx.append(
+                np.repeat(
+                    np.arange(anzahl_ausrichtungen),
+                    len(tilt_angles) * anzahl_wirkungsgrade,
+                )
+            )
+            neigung_idx.append(
+                np.tile(
+                    np.repeat(np.arange(1, len(neigungen)), anzahl_wirkungsgrade),
+                    anzahl_ausrichtungen,
+                )
+            )
+            wirkungsgrade.append(
+                np.tile(wirkungsgrad_liste, anzahl_ausrichtungen * len(tilt_angles))
+            )
+
+    if not dachtyp_idx:
+        sys.exit("Fehler: Dachtyp nicht bekannt: " + str(roof_type))
+
+    dachtyp_idx = np.concatenate(dachtyp_idx)
+    indizes = (
+        dachtyp_idx,
+        np.concatenate(ausrichtung_idx),
+        np.concatenate(neigung_idx),
+        np.concatenate(wirkungsgrade),
+        dachtyp_idx == 0,
+        np.array(dachtypen, dtype=object)[dachtyp_idx],
+        np.asarray(neigungen)[np.concatenate(neigung_idx)],
+    )
+    for array in indizes:
+        array.flags.writeable = False
+    return indizes
+
+
+def erstelle_konfigurationen(gebaeude: Gebaeude | Gebaeudegruppe) -> dict[str, dict]:
+    """Diese Funktion stellt alle Konfigurationen eines Gebäudes als Arrays zusammen.
+
+    Die Reihenfolge der Konfigurationen entspricht der Reihenfolge, in der
+    calculate_globalstrahlung_pro_stunde die Leistungen schreibt (Flachdach, dann
+    pro Dachtyp Orientierung x Neigung, jeweils x Wirkungsgrad). Dadurch liefern
+    min, avg und max dieselben Datensätze wie auswertung.aggregate_group.
+
+    Args:
+        gebaeude (Gebaeude | Gebaeudegruppe): Gebäudemodell aus
+            erstelle_gebaeudemodell oder SolarYieldModel.gebaeudegruppe.
+
+    Returns:
+        dict[str, dict]: Pro Berechnungsart ("scheaffler", "tum") die Arrays
+            koeffizient (Dachfläche * relativer Ertrag * Wirkungsgrad), dachflaeche,
+            roof_type, wirkungsgrad, relative_yield, orientation und tilt sowie
+            ausrichtung und neigung der Module (Flachdach: 0° Neigung). Bei einer
+            Gebaeudegruppe haben koeffizient und dachflaeche vorne eine Achse der
+            Gebäude.
+    """
+    (
+        dachtyp_idx,
+        ausrichtung_idx,
+        neigung_idx,
+        wirkungsgrade,
+        flach,
+        roof_type,
+        neigung,
+    ) = _konfigurationsindizes(gebaeude.roof_type, len(gebaeude.ausrichtungen))
+
+    relative_yield = gebaeude.relative_ertraege[ausrichtung_idx, neigung_idx]
+    ausrichtung = np.where(flach, 0, gebaeude.ausrichtungen[ausrichtung_idx])
+    gemeinsam = {
+        "roof_type": roof_type,
+        "wirkungsgrad": wirkungsgrade,
+        "relative_yield": np.where(flach, relative_yield, np.nan),
+        "orientation": np.where(flach, np.nan, ausrichtung.astype(np.float64)),
+        "tilt": np.where(flach, np.nan, neigung.astype(np.float64)),
+        "ausrichtung": ausrichtung,
+        "neigung": neigung,
+    }
+
+    konfigurationen = {}
+    for idx, berechnungsart in enumerate(berechnungsarten):
+        dachflaeche = gebaeude.dachflaechen[..., idx, dachtyp_idx, neigung_idx]
+        konfigurationen[berechnungsart] = {
+            # Gleiche Rechenreihenfolge wie in calculate_globalstrahlung_pro_stunde
+            "koeffizient": dachflaeche * relative_yield * wirkungsgrade,
+            "dachflaeche": dachflaeche,
+            **gemeinsam,
+        }
+
+    return konfigurationen
+
+
+def _gruppiere_stunden(
+    zeitstempel_liste: list[str], werte: np.ndarray
+) -> tuple[np.ndarray, pd.DatetimeIndex, list[np.ndarray], pd.DatetimeIndex]:
+    """Ordnet die Globalstrahlungswerte ihren vollen Stunden zu.
+
+    Wie beim Umweg über die ergebnisse.json werden doppelte Zeilen (gleicher
+    Zeitstempel und Wert) nur einmal gezählt und ungültige Zeitstempel übersprungen.
+
+    Returns:
+        tuple: Zeilenindizes der gültigen Werte, die Stunden, pro Stunde die
+            Positionen innerhalb der gültigen Werte und die Zeitpunkte der
+            gültigen Werte.
+    """
+    gesehen = set()
+    zeilen = []
+    datum = []
+    for idx, (zeitstempel, wert) in enumerate(zip(zeitstempel_liste, werte)):
+        if (zeitstempel, wert) in gesehen:
+            continue
+        gesehen.add((zeitstempel, wert))
+
+        timestamp_str = zeitstempel.replace("\ufeff", "").strip()
+        try:
+            datum.append(datetime.strptime(timestamp_str, "%d.%m.%Y %H:%M"))
+        except ValueError:
+            print("Fehler beim Parsen des Zeitstempels:", timestamp_str)
+            continue
+        zeilen.append(idx)
+
+    zeitpunkte = pd.DatetimeIndex(datum)
+    stunden = zeitpunkte.floor("h")
+    codes, eindeutige_stunden = pd.factorize(stunden, sort=True)
+    reihenfolge = np.argsort(codes, kind="stable")
+    grenzen = np.flatnonzero(np.diff(codes[reihenfolge])) + 1
+    gruppen = np.split(reihenfolge, grenzen)
+
+    return np.array(zeilen, dtype=np.intp), eindeutige_stunden, gruppen, zeitpunkte
+
+
+def _leistungsmatrix(
+    konfiguration: dict, werte: np.ndarray, einstrahlung: np.ndarray | None = None
+) -> np.ndarray:
+    """Berechnet die Leistung aller Konfigurationen für alle Globalstrahlungswerte.
+
+    Args:
+        konfiguration (dict): Konfigurations-Arrays aus erstelle_konfigurationen.
+        werte (np.ndarray): Gültige Globalstrahlungswerte.
+        einstrahlung (np.ndarray | None): Optional die Einstrahlung auf Modulebene
+            aus berechne_einstrahlung_modulebene. Dann ersetzt sie
+            Globalstrahlung * relativer Ertrag.
+
+    Returns:
+        np.ndarray: Leistung mit Form (Globalstrahlungswerte, Konfigurationen).
+    """
+    if einstrahlung is None:
+        return werte[:, np.newaxis] * konfiguration["koeffizient"][np.newaxis, :]
+
+    idx_ausrichtung = np.searchsorted(orientations, konfiguration["ausrichtung"])
+    idx_neigung = np.searchsorted([0] + tilt_angles, konfiguration["neigung"])
+    faktor = konfiguration["dachflaeche"] * konfiguration["wirkungsgrad"]
+    return einstrahlung[idx_ausrichtung, idx_neigung, :].T * faktor[np.newaxis, :]
+
+
+def _kern_faktoren(
+    konfiguration: dict, einstrahlung: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Spalten und Faktoren der Konfigurationen für leistungskern.aggregiere_stunden.
+
+    Die Leistung ist wie in _leistungsmatrix basis[:, spalte] * faktor, mit der
+    Globalstrahlung als einziger Spalte bzw. der Einstrahlung auf Modulebene mit
+    einer Spalte pro Ausrichtung und Neigung.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Spalte und Faktor pro Konfiguration.
+    """
+    if einstrahlung is None:
+        spalte = np.zeros(len(konfiguration["koeffizient"]), dtype=np.intp)
+        return spalte, konfiguration["koeffizient"]
+
+    idx_ausrichtung = np.searchsorted(orientations, konfiguration["ausrichtung"])
+    idx_neigung = np.searchsorted([0] + tilt_angles, konfiguration["neigung"])
+    faktor = konfiguration["dachflaeche"] * konfiguration["wirkungsgrad"]
+    return idx_ausrichtung * einstrahlung.shape[1] + idx_neigung, faktor
+
+
+def berechne_einstrahlung_modulebene(
+    zeitpunkte: pd.DatetimeIndex, werte: np.ndarray
+) -> np.ndarray:
+    """Diese Funktion rechnet die Globalstrahlung auf die geneigte Modulebene um.
+
+    Der Sonnenstand wird pro Standort und Jahr einmal für alle Stunden berechnet
+    und zwischengespeichert. Die Zeitstempel gelten als Ortszeit zu Beginn der Stunde.
+
+    Args:
+        zeitpunkte (pd.DatetimeIndex): Zeitpunkte der Globalstrahlungswerte (Ortszeit).
+        werte (np.ndarray): Globalstrahlungswerte in W/m².
+
+    Returns:
+        np.ndarray: Einstrahlung mit Form (orientations, [0] + tilt_angles, Werte).
+    """
+    utc = (
+        zeitpunkte.tz_localize(
+            standort_zeitzone,
+            ambiguous=np.ones(len(zeitpunkte), dtype=bool),
+            nonexistent="shift_forward",
+        )
+        .tz_convert("UTC")
+        .tz_localize(None)
+        .to_numpy()
+        .astype("datetime64[h]")
+    )
+
+    zenit = np.empty(len(utc))
+    azimut = np.empty(len(utc))
+    jahre = utc.astype("datetime64[Y]")
+    for jahr in np.unique(jahre):
+        maske = jahre == jahr
+        stunden, jahr_zenit, jahr_azimut = solar_position_for_year(
+            standort_breitengrad, standort_laengengrad, int(str(jahr))
+        )
+        idx = (utc[maske] - stunden[0]).astype(np.int64)
+        zenit[maske] = jahr_zenit[idx]
+        azimut[maske] = jahr_azimut[idx]
+
+    tag_im_jahr = (utc.astype("datetime64[D]") - jahre.astype("datetime64[D]")).astype(
+        np.float64
+    )
+    return plane_of_array_irradiance(
+        werte, zenit, azimut, tag_im_jahr, orientations, [0] + tilt_angles
+    )
+
+
+def _aggregiere_berechnungsart(
+    leistung: np.ndarray, werte: np.ndarray, gruppen: list[np.ndarray]
+) -> dict[str, dict]:
+    """Berechnet min, avg und max der Leistung pro Stunde für eine Berechnungsart
+    mit mehreren Globalstrahlungswerten pro Stunde.
+
+    Ein Wert pro Stunde wird ohne Leistungsmatrix mit _aggregiere_stuendlich
+    berechnet.
+
+    Args:
+        leistung (np.ndarray): Leistung mit Form (Globalstrahlungswerte, Konfigurationen).
+        werte (np.ndarray): Gültige Globalstrahlungswerte.
+        gruppen (list[np.ndarray]): Positionen in werte pro Stunde.
+
+    Returns:
+        dict[str, dict]: Pro Statistik die Konfigurationsindizes, die Leistung
+            und die Globalstrahlung jeder Stunde.
+    """
+    # Reihenfolge wie in der ergebnisse.json, also zuerst nach Konfiguration
+    # und dann nach Zeitstempel
+    ergebnis = {
+        statistik: {"konfiguration": [], "leistung": [], "globalstrahlung": []}
+        for statistik in ["min", "avg", "max"]
+    }
+    for gruppe in gruppen:
+        block = leistung[gruppe].T.ravel()
+        for statistik, position in [
+            ("min", int(block.argmin())),
+            ("avg", 0),
+            ("max", int(block.argmax())),
+        ]:
+            idx_konfiguration, idx_wert = divmod(position, len(gruppe))
+            ergebnis[statistik]["konfiguration"].append(idx_konfiguration)
+            ergebnis[statistik]["globalstrahlung"].append(werte[gruppe[idx_wert]])
+            ergebnis[statistik]["leistung"].append(
+                block.mean() if statistik == "avg" else block[position]
+            )
+
+    return {
+        statistik: {feld: np.array(liste) for feld, liste in felder.items()}
+        for statistik, felder in ergebnis.items()
+    }
+
+
+def _aggregiere_stuendlich(
+    konfiguration: dict,
+    basis: np.ndarray,
+    globalstrahlung: np.ndarray,
+    einstrahlung: np.ndarray | None = None,
+) -> dict[str, dict]:
+    """Berechnet min, avg und max der Leistung pro Stunde für eine Berechnungsart
+    mit einem Globalstrahlungswert pro Stunde im fusionierten Kern.
+
+    Args:
+        konfiguration (dict): Konfigurations-Arrays aus erstelle_konfigurationen.
+        basis (np.ndarray): Globalstrahlung bzw. Einstrahlung auf Modulebene mit
+            Form (Stunden, Spalten), siehe _kern_faktoren.
+        globalstrahlung (np.ndarray): Globalstrahlung jeder Stunde.
+        einstrahlung (np.ndarray | None): Einstrahlung auf Modulebene, nur für die
+            Form der Spalten.
+
+    Returns:
+        dict[str, dict]: Wie _aggregiere_berechnungsart.
+    """
+    spalte, faktor = _kern_faktoren(konfiguration, einstrahlung)
+    ergebnis = aggregiere_stunden(basis, spalte, faktor, kern=leistungs_kern)
+    return {
+        "min": {
+            "konfiguration": ergebnis["idx_min"],
+            "leistung": ergebnis["min"],
+            "globalstrahlung": globalstrahlung,
+        },
+        "avg": {
+            "konfiguration": np.zeros(len(globalstrahlung), dtype=np.intp),
+            "leistung": ergebnis["avg"],
+            "globalstrahlung": globalstrahlung,
+        },
+        "max": {
+            "konfiguration": ergebnis["idx_max"],
+            "leistung": ergebnis["max"],
+            "globalstrahlung": globalstrahlung,
+        },
+    }
+
+
+def berechne_aggregate(
+    daten: list[Gebaeude],
+    transposition: bool = False,
+    fortschritt: Callable[[int, int], None] | None = None,
+) -> pd.DataFrame:
+    """Diese Funktion berechnet min, avg und max der Leistung pro Gebäude,
+    Berechnungsart und Stunde direkt aus den Arrays im Speicher.
+
+    Das Ergebnis entspricht dem von auswertung.auswertung(), ohne den Umweg
+    über die ergebnisse.json.
+
+    Args:
+        daten (list[Gebaeude]): Gebäudemodelle aus erstelle_gebaeudemodell.
+        transposition (bool): Statt Globalstrahlung * relativer Ertrag die stündliche
+            Einstrahlung auf Modulebene verwenden (berechne_einstrahlung_modulebene).
+        fortschritt (Callable[[int, int], None] | None): Wird nach jedem Gebäude mit
+            der Anzahl fertiger und aller Gebäude aufgerufen. Eine Exception darin
+            bricht die Berechnung ab.
+
+    Returns:
+        pd.DataFrame: Die aggregierten Daten im Format der Auswertung.
+    """
+    modell = SolarYieldModel(transposition)
+
+    teile = []
+    for nummer, gebaeude in enumerate(daten, start=1):
+        teile.append(modell.aggregiere(gebaeude))
+        print(f"Aggregation für {gebaeude.building} abgeschlossen")
+        if fortschritt is not None:
+            fortschritt(nummer, len(daten))
+
+    return pd.concat(teile, ignore_index=True)
+
+
+def lade_globalstrahlung_nach_stunde(
+    transposition: bool = False,
+) -> tuple[pd.DatetimeIndex, np.ndarray, list[np.ndarray], np.ndarray | None]:
+    """Diese Funktion liest die gültigen Globalstrahlungswerte mit ihren Stunden ein.
+
+    Args:
+        transposition (bool): Zusätzlich die Einstrahlung auf Modulebene berechnen.
+
+    Returns:
+        tuple: Die Stunden, die gültigen Globalstrahlungswerte, pro Stunde die
+            Positionen in den Werten und die Einstrahlung auf Modulebene (oder None).
+    """
+    zeitstempel_liste, alle_werte = lade_globalstrahlung()
+    zeilen, stunden, gruppen, zeitpunkte = _gruppiere_stunden(
+        zeitstempel_liste, alle_werte
+    )
+    werte = alle_werte[zeilen]
+    einstrahlung = (
+        berechne_einstrahlung_modulebene(zeitpunkte, werte) if transposition else None
+    )
+    return stunden, werte, gruppen, einstrahlung
+
+
+def berechne_stundenleistung(
+    konfiguration: dict,
+    werte: np.ndarray,
+    gruppen: list[np.ndarray],
+    einstrahlung: np.ndarray | None = None,
+) -> np.ndarray:
+    """Diese Funktion berechnet die mittlere Leistung aller Konfigurationen pro Stunde.
+
+    Args:
+        konfiguration (dict): Konfigurations-Arrays aus erstelle_konfigurationen.
+        werte (np.ndarray): Gültige Globalstrahlungswerte.
+        gruppen (list[np.ndarray]): Positionen in werte pro Stunde.
+        einstrahlung (np.ndarray | None): Einstrahlung auf Modulebene, siehe
+            _leistungsmatrix.
+
+    Returns:
+        np.ndarray: Leistung mit Form (Stunden, Konfigurationen). Bei stündlichen
+            Werten entspricht sie dem Ertrag der Stunde in Wh.
+    """
+    leistung = _leistungsmatrix(konfiguration, werte, einstrahlung)
+    if len(gruppen) == len(werte):
+        return leistung[np.concatenate(gruppen)]
+    return np.stack([leistung[gruppe].mean(axis=0) for gruppe in gruppen])
+
+
+def lade_globalstrahlung_nach_tagesstunde(
+    transposition: bool = False,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    """Diese Funktion liest die gültigen Globalstrahlungswerte mit ihrer Tagesstunde ein.
+
+    Args:
+        transposition (bool): Zusätzlich die Einstrahlung auf Modulebene berechnen.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray | None]: Globalstrahlungswerte,
+            Tagesstunde (0-23) pro Wert und die Einstrahlung auf Modulebene (oder None).
+    """
+    zeitstempel_liste, alle_werte = lade_globalstrahlung()
+    zeilen, stunden, gruppen, zeitpunkte = _gruppiere_stunden(
+        zeitstempel_liste, alle_werte
+    )
+    werte = alle_werte[zeilen]
+
+    tagesstunden = np.empty(len(zeilen), dtype=np.int64)
+    tagesstunden[np.concatenate(gruppen)] = np.repeat(
+        stunden.hour.to_numpy(), [len(gruppe) for gruppe in gruppen]
+    )
+    einstrahlung = (
+        berechne_einstrahlung_modulebene(zeitpunkte, werte) if transposition else None
+    )
+    return werte, tagesstunden, einstrahlung
+
+
+def _perzentil_sketches(aufgabe: tuple) -> dict[tuple, KllSketch]:
+    """Füllt pro Tagesstunde einen Sketch mit den Leistungen eines Konfigurationsblocks.
+
+    Args:
+        aufgabe (tuple): (building, berechnungsart, basis, spalte, faktor,
+            tagesstunden, k, seed). Die Leistung einer Konfiguration ist
+            basis[spalte] * faktor, siehe _kern_faktoren.
+
+    Returns:
+        dict[tuple, KllSketch]: Sketch pro (building, berechnungsart, Tagesstunde).
+    """
+    building, berechnungsart, basis, spalte, faktor, tagesstunden, k, seed = aufgabe
+    leistung = basis[spalte].T * faktor[np.newaxis, :]
+
+    sketches = {}
+    for stunde in range(24):
+        sketch = KllSketch(k=k, seed=seed * 24 + stunde)
+        sketch.update(leistung[tagesstunden == stunde])
+        sketches[(building, berechnungsart, stunde)] = sketch
+    return sketches
+
+
+def berechne_perzentile(
+    daten: list[Gebaeude],
+    quantile: list[float],
+    k: int = 200,
+    prozesse: int | None = None,
+    block_groesse: int = 64,
+    transposition: bool = False,
+) -> pd.DataFrame:
+    """Diese Funktion schätzt Perzentile der Leistung über alle Konfigurationen
+    eines Gebäudes pro Berechnungsart und Tagesstunde.
+
+    Die Konfigurationen werden in Blöcke aufgeteilt und in einem Prozesspool
+    verarbeitet. Jeder Block liefert KLL-Sketches, die anschließend gemergt werden.
+    Dadurch wird nie die vollständige Wertemenge sortiert oder gehalten.
+
+    Args:
+        daten (list[Gebaeude]): Gebäudemodelle aus erstelle_gebaeudemodell.
+        quantile (list[float]): Gesuchte Quantile zwischen 0 und 1.
+        k (int): Genauigkeitsparameter der Sketches (siehe quantil_sketch.py).
+        prozesse (int | None): Anzahl Worker-Prozesse, None für alle Kerne.
+        block_groesse (int): Anzahl Konfigurationen pro Aufgabe.
+        transposition (bool): Statt Globalstrahlung * relativer Ertrag die stündliche
+            Einstrahlung auf Modulebene verwenden (berechne_einstrahlung_modulebene).
+
+    Returns:
+        pd.DataFrame: Eine Zeile pro Gebäude, Berechnungsart und Tagesstunde mit
+            einer Spalte p{Perzentil} pro Quantil.
+    """
+    werte, tagesstunden, einstrahlung = lade_globalstrahlung_nach_tagesstunde(
+        transposition
+    )
+    # Eine Zeile pro Spalte aus _kern_faktoren, jeder Block bekommt nur seine Zeilen
+    basis = (
+        werte[np.newaxis, :]
+        if einstrahlung is None
+        else einstrahlung.reshape(-1, len(werte))
+    )
+
+    aufgaben = []
+    for gebaeude in daten:
+        konfigurationen = erstelle_konfigurationen(gebaeude)
+        for berechnungsart, konfiguration in konfigurationen.items():
+            spalten, faktoren = _kern_faktoren(konfiguration, einstrahlung)
+            for start in range(0, len(faktoren), block_groesse):
+                benoetigt, spalte = np.unique(
+                    spalten[start : start + block_groesse], return_inverse=True
+                )
+                aufgaben.append(
+                    (
+                        gebaeude.building,
+                        berechnungsart,
+                        basis[benoetigt],
+                        spalte,
+                        faktoren[start : start + block_groesse],
+                        tagesstunden,
+                        k,
+                        len(aufgaben),
+                    )
+                )
+
+    sketches: dict[tuple, KllSketch] = {}
+    with ProcessPoolExecutor(max_workers=prozesse) as executor:
+        for teil in executor.map(_perzentil_sketches, aufgaben):
+            for schluessel, sketch in teil.items():
+                if schluessel in sketches:
+                    sketches[schluessel].merge(sketch)
+                else:
+                    sketches[schluessel] = sketch
+
+    zeilen = []
+    for (building, berechnungsart, stunde), sketch in sketches.items():
+        zeile = {
+            "building": building,
+            "berechnungsart": berechnungsart,
+            "hour_of_day": stunde,
+        }
+        for quantil, wert in zip(quantile, sketch.quantile(np.array(quantile))):
+            zeile[f"p{round(quantil * 100)}"] = wert
+        zeilen.append(zeile)
+
+    return pd.DataFrame(zeilen)
+
+
+def berechne_konfigurationsertraege(
+    daten: list[Gebaeude], jahressumme: float | np.ndarray
+) -> pd.DataFrame:
+    """Diese Funktion berechnet den Jahresertrag jeder einzelnen Konfiguration.
+
+    Anders als SolarYieldModel.predict werden die Konfigurationen nicht zu min,
+    avg und max zusammengefasst. Die Spalten werden pro Gebäude als Arrays
+    gesammelt und erst am Ende zusammengefügt.
+
+    Args:
+        daten (list[Gebaeude]): Gebäudemodelle aus erstelle_gebaeudemodell.
+        jahressumme (float | np.ndarray): Jahressumme der Globalstrahlung oder der
+            Einstrahlung auf Modulebene, siehe lade_jahressumme.
+
+    Returns:
+        pd.DataFrame: Eine Zeile pro Gebäude, Berechnungsart und Konfiguration mit
+            Dachfläche und Jahresertrag.
+    """
+    felder = [
+        "roof_type",
+        "wirkungsgrad",
+        "relative_yield",
+        "orientation",
+        "tilt",
+        "dachflaeche",
+    ]
+    spalten = {
+        spalte: []
+        for spalte in ["building", "berechnungsart"] + felder + ["jahresertrag"]
+    }
+    einstrahlung = None if np.ndim(jahressumme) == 0 else jahressumme[..., np.newaxis]
+
+    for gebaeude in daten:
+        for berechnungsart, konfiguration in erstelle_konfigurationen(gebaeude).items():
+            anzahl = len(konfiguration["koeffizient"])
+            spalten["building"].append(np.repeat(gebaeude.building, anzahl))
+            spalten["berechnungsart"].append(np.repeat(berechnungsart, anzahl))
+            for feld in felder:
+                spalten[feld].append(konfiguration[feld])
+            spalten["jahresertrag"].append(
+                _leistungsmatrix(
+                    konfiguration, np.atleast_1d(jahressumme), einstrahlung
+                )[0]
+            )
+
+    return pd.DataFrame(
+        {spalte: np.concatenate(teile) for spalte, teile in spalten.items()}
+    )
+
+
+def berechne_ensemble_ertraege(
+    daten: list[Gebaeude], jahre: np.ndarray, jahressummen: np.ndarray
+) -> pd.DataFrame:
+    """Diese Funktion berechnet den Jahresertrag jeder Konfiguration für mehrere Jahre.
+
+    Pro Konfiguration entsteht in einem Schritt eine Matrix (Jahre, Konfigurationen),
+    aus der Mittelwert, schlechtestes und bestes Jahr gebildet werden. Die Kosten
+    wachsen daher kaum mit der Anzahl Jahre.
+
+    Args:
+        daten (list[Gebaeude]): Gebäudemodelle aus erstelle_gebaeudemodell.
+        jahre (np.ndarray): Die Jahre.
+        jahressummen (np.ndarray): Summe der Globalstrahlung pro Jahr mit Form (Jahre,)
+            oder der Einstrahlung auf Modulebene mit Form
+            (orientations, [0] + tilt_angles, Jahre).
+
+    Returns:
+        pd.DataFrame: Eine Zeile pro Gebäude, Berechnungsart und Konfiguration mit
+            mittlerem, minimalem und maximalem Jahresertrag und den zugehörigen Jahren.
+    """
+    felder = [
+        "roof_type",
+        "wirkungsgrad",
+        "relative_yield",
+        "orientation",
+        "tilt",
+        "dachflaeche",
+    ]
+    ergebnisse = [
+        "jahresertrag_mittel",
+        "jahresertrag_min",
+        "schlechtestes_jahr",
+        "jahresertrag_max",
+        "bestes_jahr",
+    ]
+    spalten = {
+        spalte: [] for spalte in ["building", "berechnungsart"] + felder + ergebnisse
+    }
+    einstrahlung = None if np.ndim(jahressummen) == 1 else jahressummen
+    jahre = np.asarray(jahre)
+
+    for gebaeude in daten:
+        for berechnungsart, konfiguration in erstelle_konfigurationen(gebaeude).items():
+            anzahl = len(konfiguration["koeffizient"])
+            spalten["building"].append(np.repeat(gebaeude.building, anzahl))
+            spalten["berechnungsart"].append(np.repeat(berechnungsart, anzahl))
+            for feld in felder:
+                spalten[feld].append(konfiguration[feld])
+
+            ertraege = _leistungsmatrix(konfiguration, jahressummen, einstrahlung)
+            idx_min = ertraege.argmin(axis=0)
+            idx_max = ertraege.argmax(axis=0)
+            konfigurationen = np.arange(anzahl)
+            spalten["jahresertrag_mittel"].append(ertraege.mean(axis=0))
+            spalten["jahresertrag_min"].append(ertraege[idx_min, konfigurationen])
+            spalten["schlechtestes_jahr"].append(jahre[idx_min])
+            spalten["jahresertrag_max"].append(ertraege[idx_max, konfigurationen])
+            spalten["bestes_jahr"].append(jahre[idx_max])
+
+    return pd.DataFrame(
+        {spalte: np.concatenate(teile) for spalte, teile in spalten.items()}
+    )
+
+
+def lade_jahressumme(transposition: bool = False) -> float | np.ndarray:
+    """Diese Funktion summiert die gültigen Globalstrahlungswerte über den Zeitraum.
+
+    Args:
+        transposition (bool): Statt der Globalstrahlung die Einstrahlung auf
+            Modulebene summieren.
+
+    Returns:
+        float | np.ndarray: Summe der Globalstrahlung oder Summe der Einstrahlung
+            mit Form (orientations, [0] + tilt_angles).
+    """
+    zeitstempel_liste, alle_werte = lade_globalstrahlung()
+    zeilen, _, _, zeitpunkte = _gruppiere_stunden(zeitstempel_liste, alle_werte)
+    werte = alle_werte[zeilen]
+    if transposition:
+        return berechne_einstrahlung_modulebene(zeitpunkte, werte).sum(axis=-1)
+    return werte.sum()
+
+
+class SolarYieldModel:
+    """Ertragsmodell mit einmal geladener Globalstrahlung für viele Gebäude.
+
+    Beim Erstellen werden die Globalstrahlung (bzw. die Einstrahlung auf
+    Modulebene), ihre Jahressumme und die Basis für leistungskern einmal berechnet.
+    Danach rechnen predict und predict_hourly für beliebig viele Gebäude ohne
+    weitere Vorbereitung. Ungültige Gebäude lösen einen ValueError aus, statt wie
+    erstelle_gebaeudemodell das Programm zu beenden.
+
+    Gebäude kommen als DataFrame mit den Spalten building, building_area,
+    roof_type und orientation wie in erstelle_daten, roof_type auch als Dachart der
+    CSV (z.B. "Satteldach").
+
+    Aufruf:
+        modell = SolarYieldModel(transposition=False)
+        jahresertraege = modell.predict(gebaeude)
+        stundenwerte = modell.predict_hourly(gebaeude)
+    """
+
+    GEBAEUDE_SPALTEN = ["building", "building_area", "roof_type", "orientation"]
+
+    def __init__(self, transposition: bool = False):
+        """Lädt die Globalstrahlung und bereitet die Arrays für alle Gebäude vor.
+
+        Args:
+            transposition (bool): Einstrahlung auf Modulebene statt statischem
+                relativen Ertrag verwenden.
+
+        Raises:
+            FileNotFoundError: Wenn globalstrahlung_datei nicht existiert.
+        """
+        if not os.path.exists(globalstrahlung_datei):
+            raise FileNotFoundError(f"Datei {globalstrahlung_datei} nicht gefunden")
+
+        self.transposition = transposition
+        self.stunden, self.werte, self.gruppen, self.einstrahlung = (
+            lade_globalstrahlung_nach_stunde(transposition)
+        )
+        # Wie lade_jahressumme, aber ohne die Datei erneut zu lesen
+        self.jahressumme = (
+            self.werte.sum()
+            if self.einstrahlung is None
+            else self.einstrahlung.sum(axis=-1)
+        )
+
+        # Ein Wert pro Stunde: Einstrahlung einmal in Stundenreihenfolge als
+        # (Stunden, Spalten) für den fusionierten Kern
+        self.stuendlich = len(self.gruppen) == len(self.werte)
+        self.basis = None
+        if self.stuendlich:
+            self.reihenfolge = np.concatenate(self.gruppen)
+            if self.einstrahlung is None:
+                self.basis = self.werte[self.reihenfolge, np.newaxis]
+            else:
+                self.basis = np.ascontiguousarray(
+                    self.einstrahlung.reshape(-1, len(self.werte))[
+                        :, self.reihenfolge
+                    ].T
+                )
+
+    @classmethod
+    def pruefe(cls, gebaeude: pd.DataFrame) -> pd.DataFrame:
+        """Prüft die Gebäude und bringt sie in die Form von erstelle_daten.
+
+        Args:
+            gebaeude (pd.DataFrame): Gebäude mit den Spalten GEBAEUDE_SPALTEN.
+
+        Returns:
+            pd.DataFrame: Die Spalten GEBAEUDE_SPALTEN mit building_area als float,
+                roof_type als flat, gable, pitched oder mixed und orientation als
+                "variabel" oder Gradzahl aus orientations (als String).
+
+        Raises:
+            ValueError: Wenn eine Spalte fehlt oder ein Wert ungültig ist.
+        """
+        fehlend = [s for s in cls.GEBAEUDE_SPALTEN if s not in gebaeude.columns]
+        if fehlend:
+            raise ValueError(f"Spalten fehlen: {fehlend}")
+        if gebaeude.empty:
+            raise ValueError("Keine Gebäude")
+
+        building = gebaeude["building"].astype(str).to_numpy()
+        building_area = pd.to_numeric(
+            gebaeude["building_area"], errors="coerce"
+        ).to_numpy(dtype=np.float64)
+        roof_type = (
+            gebaeude["roof_type"].astype(str).str.strip().str.lower().map(dachtyp_namen)
+        )
+        orientation = gebaeude["orientation"].astype(str).str.strip()
+        gradzahl = pd.to_numeric(orientation, errors="coerce")
+        variabel = (orientation == "variabel").to_numpy()
+
+        for maske, meldung in [
+            (
+                ~(np.isfinite(building_area) & (building_area > 0)),
+                "'building_area' muss eine positive Zahl sein",
+            ),
+            (roof_type.isna().to_numpy(), "Dachtyp nicht bekannt"),
+            (
+                ~variabel & ~gradzahl.isin(orientations).to_numpy(),
+                f"Orientierung muss 'variabel' oder eine von {orientations} sein",
+            ),
+        ]:
+            if maske.any():
+                zeile = int(np.flatnonzero(maske)[0])
+                raise ValueError(
+                    f"{building[zeile]}: {meldung} "
+                    f"(Zeile {zeile}, {int(maske.sum())} Gebäude betroffen)"
+                )
+
+        return pd.DataFrame(
+            {
+                "building": building,
+                "building_area": building_area,
+                "roof_type": roof_type.to_numpy(),
+                "orientation": np.where(
+                    variabel,
+                    "variabel",
+                    gradzahl.fillna(0).astype(np.int64).astype(str).to_numpy(),
+                ),
+            }
+        )
+
+    @staticmethod
+    def _ausrichtungen(orientation: str) -> tuple[np.ndarray, np.ndarray]:
+        """Mögliche Orientierungen und ihre relativen Erträge für eine geprüfte
+        Orientierung aus pruefe."""
+        if orientation == "variabel":
+            ausrichtungen = np.array(orientations)
+        else:
+            ausrichtungen = np.array([int(orientation)])
+        return (
+            ausrichtungen,
+            relative_ertrag_tabelle[np.searchsorted(orientations, ausrichtungen)],
+        )
+
+    @classmethod
+    def gebaeudemodell(
+        cls, building: str, building_area: float, roof_type: str, orientation: str
+    ) -> Gebaeude:
+        """Wie erstelle_gebaeudemodell für geprüfte Gebäude aus pruefe."""
+        ausrichtungen, relative_ertraege = cls._ausrichtungen(orientation)
+        return Gebaeude(
+            building=building,
+            building_area=building_area,
+            roof_type=roof_type,
+            ausrichtungen=ausrichtungen,
+            dachflaechen=berechne_dachflaechen(building_area, roof_type),
+            relative_ertraege=relative_ertraege,
+        )
+
+    @classmethod
+    def gebaeudegruppe(
+        cls, building_area: np.ndarray, roof_type: str, orientation: str
+    ) -> Gebaeudegruppe:
+        """Wie gebaeudemodell für mehrere Gebäude mit gleichem Dachtyp und gleicher
+        Orientierung."""
+        ausrichtungen, relative_ertraege = cls._ausrichtungen(orientation)
+        return Gebaeudegruppe(
+            building_area=building_area,
+            roof_type=roof_type,
+            ausrichtungen=ausrichtungen,
+            dachflaechen=berechne_dachflaechen(building_area, roof_type),
+            relative_ertraege=relative_ertraege,
+        )
+
+    def predict(self, gebaeude: pd.DataFrame) -> pd.DataFrame:
+        """Diese Methode berechnet min, avg und max des Jahresertrags pro Gebäude und
+        Berechnungsart über alle Konfigurationen.
+
+        Gebäude mit gleichem Dachtyp und gleicher Orientierung haben dieselben
+        Konfigurationen und werden in einer Matrix (Gebäude, Konfigurationen)
+        zusammen berechnet.
+
+        Args:
+            gebaeude (pd.DataFrame): Gebäude, siehe pruefe.
+
+        Returns:
+            pd.DataFrame: Eine Zeile pro Gebäude, Berechnungsart und Statistik mit
+                der Konfiguration und dem Jahresertrag, in der Reihenfolge der Gebäude.
+
+        Raises:
+            ValueError: Bei ungültigen Gebäuden.
+        """
+        tabelle = self.pruefe(gebaeude)
+        form = (len(tabelle), len(berechnungsarten), 3)
+        spalten = {
+            "roof_type": np.empty(form, dtype=object),
+            "wirkungsgrad": np.empty(form),
+            "relative_yield": np.empty(form),
+            "orientation": np.empty(form),
+            "tilt": np.empty(form),
+            "jahresertrag": np.empty(form),
+        }
+        einstrahlung = (
+            None
+            if np.ndim(self.jahressumme) == 0
+            else self.jahressumme[..., np.newaxis]
+        )
+        building_area = tabelle["building_area"].to_numpy()
+
+        for (roof_type, orientation), positionen in tabelle.groupby(
+            ["roof_type", "orientation"], sort=False
+        ).indices.items():
+            gruppe = self.gebaeudegruppe(
+                building_area[positionen], roof_type, orientation
+            )
+            zeilen = np.arange(len(positionen))
+            for idx, konfiguration in enumerate(
+                erstelle_konfigurationen(gruppe).values()
+            ):
+                jahresertrag = _leistungsmatrix(
+                    konfiguration, np.atleast_1d(self.jahressumme), einstrahlung
+                )[0]
+                idx_min = jahresertrag.argmin(axis=1)
+                idx_max = jahresertrag.argmax(axis=1)
+                auswahl = np.stack([idx_min, np.zeros_like(idx_min), idx_max], axis=1)
+                for spalte in list(spalten)[:-1]:
+                    spalten[spalte][positionen, idx] = konfiguration[spalte][auswahl]
+                spalten["jahresertrag"][positionen, idx] = np.stack(
+                    [
+                        jahresertrag[zeilen, idx_min],
+                        # Pro Zeile, mean(axis=1) summiert in anderer Reihenfolge
+                        [zeile.mean() for zeile in jahresertrag],
+                        jahresertrag[zeilen, idx_max],
+                    ],
+                    axis=1,
+                )
+
+        anzahl = len(tabelle) * len(berechnungsarten)
+        return pd.DataFrame(
+            {
+                "building": np.repeat(tabelle["building"].to_numpy(), form[1] * 3),
+                "berechnungsart": np.tile(np.repeat(berechnungsarten, 3), form[0]),
+                **{spalte: werte.ravel() for spalte, werte in spalten.items()},
+                "statistic": ["min", "avg", "max"] * anzahl,
+            }
+        )
+
+    def stundenstatistiken(self, gebaeude: Gebaeude) -> dict[str, tuple[dict, dict]]:
+        """Diese Methode berechnet min, avg und max der Leistung pro Berechnungsart
+        und Stunde für ein Gebäudemodell.
+
+        Args:
+            gebaeude (Gebaeude): Gebäudemodell aus erstelle_gebaeudemodell.
+
+        Returns:
+            dict[str, tuple[dict, dict]]: Pro Berechnungsart die Konfigurationen aus
+                erstelle_konfigurationen und die Statistiken wie in
+                _aggregiere_berechnungsart.
+        """
+        statistiken = {}
+        for berechnungsart, konfiguration in erstelle_konfigurationen(gebaeude).items():
+            if self.stuendlich:
+                statistiken[berechnungsart] = konfiguration, _aggregiere_stuendlich(
+                    konfiguration,
+                    self.basis,
+                    self.werte[self.reihenfolge],
+                    self.einstrahlung,
+                )
+            else:
+                leistung = _leistungsmatrix(
+                    konfiguration, self.werte, self.einstrahlung
+                )
+                statistiken[berechnungsart] = konfiguration, _aggregiere_berechnungsart(
+                    leistung, self.werte, self.gruppen
+                )
+        return statistiken
+
+    def aggregiere(self, gebaeude: Gebaeude) -> pd.DataFrame:
+        """Wie stundenstatistiken, als Tabelle im Format von berechne_aggregate."""
+        teile = []
+        for berechnungsart, (konfiguration, statistiken) in self.stundenstatistiken(
+            gebaeude
+        ).items():
+            for statistik, ergebnis in statistiken.items():
+                idx = ergebnis["konfiguration"]
+                teile.append(
+                    pd.DataFrame(
+                        {
+                            "building": gebaeude.building,
+                            "berechnungsart": berechnungsart,
+                            "roof_type": konfiguration["roof_type"][idx],
+                            "wirkungsgrad": konfiguration["wirkungsgrad"][idx],
+                            "globalstrahlung": ergebnis["globalstrahlung"],
+                            "leistung": ergebnis["leistung"],
+                            "relative_yield": konfiguration["relative_yield"][idx],
+                            "orientation": konfiguration["orientation"][idx],
+                            "tilt": konfiguration["tilt"][idx],
+                            "hour": self.stunden,
+                            "statistic": statistik,
+                        }
+                    )
+                )
+        return pd.concat(teile, ignore_index=True)
+
+    def predict_hourly(self, gebaeude: pd.DataFrame) -> pd.DataFrame:
+        """Diese Methode berechnet min, avg und max der Leistung pro Gebäude,
+        Berechnungsart und Stunde.
+
+        Args:
+            gebaeude (pd.DataFrame): Gebäude, siehe pruefe.
+
+        Returns:
+            pd.DataFrame: Wie berechne_aggregate, in der Reihenfolge der Gebäude.
+                Bei stündlichen Werten entspricht die Leistung dem Ertrag der
+                Stunde in Wh.
+
+        Raises:
+            ValueError: Bei ungültigen Gebäuden.
+        """
+        return pd.concat(
+            [
+                self.aggregiere(self.gebaeudemodell(*zeile))
+                for zeile in self.pruefe(gebaeude).itertuples(index=False)
+            ],
+            ignore_index=True,
+        )
+
+    @staticmethod
+    def relative_ertraege(orientation: np.ndarray, tilt: np.ndarray) -> np.ndarray:
+        """Relativer Ertrag (0 bis 1) für Paare aus Orientierung und Neigung der
+        ganzen Tabelle, wie get_relative_yield.
+
+        Raises:
+            ValueError: Wenn ein Paar nicht in der Tabelle steht.
+        """
+        orientation = np.asarray(orientation, dtype=np.float64)
+        tilt = np.asarray(tilt, dtype=np.float64)
+        idx_ausrichtung = np.searchsorted(orientations, orientation)
+        idx_neigung = np.searchsorted(tabellen_neigungen, tilt)
+        gueltig = (idx_ausrichtung < len(orientations)) & (
+            idx_neigung < len(tabellen_neigungen)
+        )
+        gueltig[gueltig] = (
+            np.asarray(orientations)[idx_ausrichtung[gueltig]] == orientation[gueltig]
+        ) & (np.asarray(tabellen_neigungen)[idx_neigung[gueltig]] == tilt[gueltig])
+        if not gueltig.all():
+            erste = int(np.flatnonzero(~gueltig)[0])
+            raise ValueError(
+                f"Keine Tabellenwerte für orientation={orientation[erste]:g}, "
+                f"tilt={tilt[erste]:g} ({int((~gueltig).sum())} Einträge)"
+            )
+        return relative_ertrag_gesamt[idx_neigung, idx_ausrichtung]
+
+    @classmethod
+    def predict_configured(
+        cls, gebaeude: pd.DataFrame, reduktionsfaktor: float | None = None
+    ) -> pd.DataFrame:
+        """Diese Methode berechnet Dachflächen und Jahreserträge für Gebäude mit
+        fester Konfiguration, wie im Upload der App.
+
+        Braucht keine Globalstrahlung, die Einstrahlung steht pro Gebäude in
+        solar_irradiation. Dachflächen werden pro Neigung einmal für alle Gebäude
+        berechnet.
+
+        Args:
+            gebaeude (pd.DataFrame): Spalten building_area, roof ("flat", "gable"
+                oder "pitched", auch als Teil des Namens), tilt_angle, orientation,
+                module_efficiency und solar_irradiation in kWh/m².
+            reduktionsfaktor (float | None): Standard ist reduction_factor.
+
+        Returns:
+            pd.DataFrame: Mit dem Index von gebaeude die Spalten
+                computed_scheffler_area, computed_tum_area, scheffler_yield,
+                tum_yield und total_yield (kWh). NaN bei unbekanntem Dachtyp.
+
+        Raises:
+            ValueError: Wenn Orientierung und Neigung nicht in der Tabelle stehen.
+        """
+        if reduktionsfaktor is None:
+            reduktionsfaktor = reduction_factor
+        dach = gebaeude["roof"].astype(str).str.lower()
+        flach = dach.str.contains("flat").to_numpy()
+        sattel = ~flach & dach.str.contains("gable").to_numpy()
+        schraeg = ~flach & ~sattel & dach.str.contains("pitched").to_numpy()
+
+        building_area = pd.to_numeric(gebaeude["building_area"]).to_numpy(
+            dtype=np.float64
+        )
+        neigung = pd.to_numeric(gebaeude["tilt_angle"]).to_numpy(dtype=np.float64)
+        scheffler = np.full(len(gebaeude), np.nan)
+        tum = np.full(len(gebaeude), np.nan)
+        scheffler[flach] = flat_roof_area_scheffler(building_area[flach])
+        tum[flach] = flat_roof_area_tum(building_area[flach])
+        for wert in np.unique(neigung[sattel | schraeg]):
+            maske = sattel & (neigung == wert)
+            scheffler[maske] = gable_roof_area_scheffler(building_area[maske], wert)
+            tum[maske] = gable_roof_area_tum(
+                building_area[maske], reduktionsfaktor, wert
+            )
+            maske = schraeg & (neigung == wert)
+            scheffler[maske] = pitched_roof_area_scheffler(
+                building_area[maske], reduktionsfaktor, wert
+            )
+            tum[maske] = pitched_roof_area_tum(
+                building_area[maske], reduktionsfaktor, wert
+            )
+
+        # Wie int() in der App werden Nachkommastellen abgeschnitten
+        relative_yield = cls.relative_ertraege(
+            np.trunc(pd.to_numeric(gebaeude["orientation"]).to_numpy(dtype=np.float64)),
+            np.trunc(neigung),
+        )
+        einstrahlung = pd.to_numeric(gebaeude["solar_irradiation"]).to_numpy(
+            dtype=np.float64
+        )
+        wirkungsgrad = pd.to_numeric(gebaeude["module_efficiency"]).to_numpy(
+            dtype=np.float64
+        )
+        ergebnis = pd.DataFrame(
+            {"computed_scheffler_area": scheffler, "computed_tum_area": tum},
+            index=gebaeude.index,
+        )
+        for name, flaeche in [("scheffler", scheffler), ("tum", tum)]:
+            ergebnis[f"{name}_yield"] = annual_solar_yield(
+                roof_area=flaeche,
+                solar_irradiation=einstrahlung,
+                module_efficiency=wirkungsgrad,
+                relative_yield=relative_yield,
+            )
+        ergebnis["total_yield"] = ergebnis["scheffler_yield"] + ergebnis["tum_yield"]
+        return ergebnis
+
+
+def berechne_in_bloecken(
+    pfad: str,
+    block_groesse: int = 1000,
+    ausgabe_ordner: str = "data/jahresertraege",
+    transposition: bool = False,
+) -> None:
+    """Diese Funktion berechnet die Jahreserträge für große Gebäudebestände blockweise.
+
+    Die Globalstrahlung wird einmal für alle Blöcke geladen. Jeder Block wird mit
+    SolarYieldModel.predict in einem Aufruf berechnet und als eigene Partition
+    ausgabe_ordner/teil_{nummer}.csv gespeichert. Der Speicherbedarf hängt nur von
+    der Blockgröße ab, nicht von der Anzahl Gebäude.
+    Fehlerhafte Gebäude beenden die Berechnung mit Datei und Zeile bzw. Block.
+
+    Args:
+        pfad (str): Pfad zur CSV im Format von data/grundflaeche.csv.
+        block_groesse (int): Anzahl Gebäude pro Block.
+        ausgabe_ordner (str): Ordner für die Partitionen.
+        transposition (bool): Einstrahlung auf Modulebene statt des statischen
+            relativen Ertrags verwenden.
+    """
+    modell = SolarYieldModel(transposition)
+
+    os.makedirs(ausgabe_ordner, exist_ok=True)
+
+    start = time.perf_counter()
+    anzahl_gebaeude = 0
+    for nummer, block in enumerate(lese_gebaeude_bloecke(pfad, block_groesse)):
+        block_start = time.perf_counter()
+        try:
+            ergebnis = modell.predict(pd.DataFrame(block))
+        except ValueError as e:
+            # Zeile in der Meldung von predict zählt ab dem Anfang des Blocks
+            sys.exit(
+                f"Fehler: {pfad}, Block {nummer} (Gebäude {anzahl_gebaeude + 1} "
+                f"bis {anzahl_gebaeude + len(block)}): {e}"
+            )
+
+        ergebnis.to_csv(
+            os.path.join(ausgabe_ordner, f"teil_{nummer:05d}.csv"), index=False
+        )
+        anzahl_gebaeude += len(block)
+        print(
+            f"Block {nummer}: {len(block)} Gebäude, "
+            f"{len(block) / (time.perf_counter() - block_start):.0f} Gebäude/s"
+        )
+
+    dauer = time.perf_counter() - start
+    print(
+        f"{anzahl_gebaeude} Gebäude in {dauer:.1f} s berechnet "
+        f"({anzahl_gebaeude / dauer:.0f} Gebäude/s), Partitionen in '{ausgabe_ordner}'"
+    )
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--fused",
+        action="store_true",
+        help="Aggregate direkt berechnen und als Excel speichern, ohne ergebnisse.json",
+    )
+    parser.add_argument(
+        "--rollup",
+        nargs="+",
+        choices=ROLLUP_AUFLOESUNGEN,
+        default=[],
+        help="Mit --fused zusätzlich Summen nach Tageszeit, Tag, Woche, Monat oder Jahreszeit speichern",
+    )
+    parser.add_argument(
+        "--plots",
+        action="store_true",
+        help=f"Mit --fused min/avg/max pro Gebäude und Berechnungsart als PNG in "
+        f"{PLOT_ORDNER} speichern (nur geänderte, benötigt matplotlib)",
+    )
+    parser.add_argument(
+        "--transposition",
+        action="store_true",
+        help="Mit --fused, --chunked oder --percentiles die Einstrahlung stündlich aus "
+        "dem Sonnenstand auf die Modulebene umrechnen statt den statischen relativen "
+        "Ertrag zu verwenden",
+    )
+    parser.add_argument(
+        "--percentiles",
+        nargs="*",
+        type=float,
+        metavar="P",
+        help="Perzentile (Standard: 10 50 90) der Leistung pro Gebäude und Tagesstunde "
+        "mit KLL-Sketches schätzen und in data/perzentile.xlsx speichern",
+    )
+    parser.add_argument(
+        "--irradiance",
+        metavar="CSV",
+        default=globalstrahlung_datei,
+        help="Datei mit der stündlichen Globalstrahlung "
+        f"(Standard: {globalstrahlung_datei})",
+    )
+    parser.add_argument(
+        "--chunked",
+        metavar="CSV",
+        help="Jahreserträge für einen großen Gebäudebestand (Format wie "
+        "data/grundflaeche.csv) blockweise nach data/jahresertraege/ berechnen",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="Anzahl Gebäude pro Block für --chunked (Standard: 1000)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=f"Gültige Checkpoints aus {checkpoint_ordner} wiederverwenden, statt "
+        "alle Gebäude neu zu berechnen",
+    )
+    parser.add_argument(
+        "--resolution",
+        metavar="FREQ",
+        help="Globalstrahlung blockweise einlesen und auf diese Auflösung mitteln, "
+        'z.B. "1h" für Minutenwerte von Datenloggern (Standard: Zeitschritte der Datei)',
+    )
+    parser.add_argument(
+        "--irradiance-format",
+        default=globalstrahlung_format,
+        help="strptime-Format der Zeitstempel der Globalstrahlung mit --resolution "
+        f"(Standard: {globalstrahlung_format.replace('%', '%%')})",
+    )
+    parser.add_argument(
+        "--kernel",
+        choices=KERNE,
+        help="Kern für min/avg/max pro Stunde mit --fused: numba (kompiliert, alle "
+        "Kerne, optional) oder numpy (blockweise), auto nimmt numba falls installiert "
+        f"(Standard: {leistungs_kern})",
+    )
+    args = parser.parse_args()
+    # Optionen, die im gewählten Modus nichts bewirken, nicht stillschweigend ignorieren
+    if args.chunked:
+        for option, gesetzt in [
+            ("--fused", args.fused),
+            ("--rollup", args.rollup),
+            ("--plots", args.plots),
+            ("--kernel", args.kernel is not None),
+            ("--percentiles", args.percentiles is not None),
+            ("--resume", args.resume),
+        ]:
+            if gesetzt:
+                parser.error(f"{option} wirkt nicht zusammen mit --chunked")
+    elif args.fused:
+        if args.resume:
+            parser.error("--resume wirkt nicht zusammen mit --fused")
+    else:
+        for option, gesetzt in [
+            ("--rollup", args.rollup),
+            ("--plots", args.plots),
+            ("--kernel", args.kernel is not None),
+        ]:
+            if gesetzt:
+                parser.error(f"{option} wirkt nur zusammen mit --fused")
+        if args.transposition and args.percentiles is None:
+            parser.error(
+                "--transposition wirkt nur zusammen mit --fused, --chunked "
+                "oder --percentiles"
+            )
+    if args.kernel == "numba" and not NUMBA_VERFUEGBAR:
+        sys.exit("Fehler: Für --kernel numba muss numba installiert sein")
+    if args.plots and not MATPLOTLIB_VERFUEGBAR:
+        sys.exit("Fehler: Für --plots muss matplotlib installiert sein")
+    leistungs_kern = args.kernel or leistungs_kern
+    globalstrahlung_datei = args.irradiance
+    globalstrahlung_aufloesung = args.resolution
+    globalstrahlung_format = args.irradiance_format
+
+    if args.chunked:
+        berechne_in_bloecken(
+            args.chunked, args.chunk_size, transposition=args.transposition
+        )
+        sys.exit(0)
+
     daten = erstelle_daten()
-    daten = calulate_roof_area(daten)
-    daten = calculate_relative_yield(daten)
-    daten = calculate_globalstrahlung_pro_stunde(daten)
-    speichere_daten_als_json(daten)
+    gebaeude_liste = [erstelle_gebaeudemodell(gebaeude) for gebaeude in daten]
+
+    if args.fused:
+        aggregated = sortiere_aggregate(
+            berechne_aggregate(gebaeude_liste, transposition=args.transposition)
+        )
+        speichere_aggregate_als_excel(aggregated)
+        speichere_rollups(aggregated, args.rollup)
+        if args.plots:
+            speichere_plots(aggregated)
+    else:
+        daten = calulate_roof_area(daten)
+        daten = calculate_relative_yield(daten)
+        checkpoints = berechne_mit_checkpoints(daten, resume=args.resume)
+        speichere_checkpoints_als_json(checkpoints)
+        for checkpoint in checkpoints:
+            os.remove(checkpoint)
+
+    if args.percentiles is not None:
+        perzentile = args.percentiles or [10, 50, 90]
+        perzentil_tabelle = berechne_perzentile(
+            gebaeude_liste,
+            [perzentil / 100 for perzentil in perzentile],
+            transposition=args.transposition,
+        )
+        perzentil_tabelle.to_excel("data/perzentile.xlsx", index=False)
+        print("Die Perzentile wurden in 'data/perzentile.xlsx' gespeichert.")
@@ -0,0 +1,282 @@
+"""Dieses File erzeugt synthetische Gebäudebestände und Globalstrahlungsreihen für Last- und Benchmarktests.
+
+Gebäudebestand (Format wie data/grundflaeche.csv):
+    Campus/Gebäude;Grundfläche in m2;Dachart;Orientierung
+    - Grundfläche log-normalverteilt mit deutschem Zahlenformat (z.B. 1.620,98)
+    - Dacharten Flachdach, Satteldach, Schrägdach und gemischt
+    - Orientierung aus der Tabelle des relativen Ertragspotentials oder "variabel"
+
+Globalstrahlung (Format wie data/globalstrahlung_stuendlich_mistelbach.csv):
+    dd.mm.YYYY HH:MM;Wert
+    - Klarhimmel-Strahlung nach Haurwitz aus dem Sonnenstand am Standort
+    - Bewölkung als AR(1)-Prozess pro Tag mit stündlichem Rauschen
+
+Lastprofile (Format wie in eigenverbrauch.py, optional mit --load-profiles):
+    Zeitstempel;<Gebäude 1>;<Gebäude 2>;...
+    - Jahresverbrauch proportional zur Grundfläche
+    - Werktags höhere Last zwischen 7 und 19 Uhr, am Wochenende Grundlast
+    - Multiplikatives Rauschen pro Stunde
+    - Tageweise erzeugt und geschrieben, auch bei vielen Gebäuden speicherschonend
+
+Alle Daten sind über den Seed reproduzierbar.
+
+Aufruf:
+    python synthetische_daten.py --buildings 100000 --years 10 --seed 42
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from formulas.relative_yield_potential import orientations
+from formulas.solar_position import solar_position
+
+# Anteile der Dacharten und Grundflächen in Anlehnung an data/grundflaeche.csv
+DACHARTEN = ["Flachdach", "Satteldach", "Schrägdach", "gemischt"]
+DACHART_ANTEILE = [0.55, 0.25, 0.1, 0.1]
+GRUNDFLAECHE_MEDIAN = 1500.0
+GRUNDFLAECHE_STREUUNG = 1.1
+
+# Stromverbrauch pro m² Grundfläche und Jahr in kWh
+VERBRAUCH_PRO_M2 = 60.0
+
+STANDORT_BREITENGRAD = 49.91
+STANDORT_LAENGENGRAD = 11.52
+# Wie die Messreihe: Ortszeit mit Sommerzeit
+STANDORT_ZEITZONE = "Europe/Berlin"
+
+
+def _deutsche_zahl(wert: float) -> str:
+    """Formatiert eine Zahl mit Tausenderpunkt und Dezimalkomma, z.B. 1.620,98."""
+    return f"{wert:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def erzeuge_gebaeudebestand(
+    pfad: str, anzahl: int, seed: int = 0, anteil_variabel: float = 0.3
+) -> None:
+    """Diese Funktion schreibt einen synthetischen Gebäudebestand als CSV.
+
+    Args:
+        pfad (str): Zieldatei.
+        anzahl (int): Anzahl Gebäude.
+        seed (int): Seed des Zufallsgenerators.
+        anteil_variabel (float): Anteil der geneigten und gemischten Dächer mit
+            Orientierung "variabel".
+    """
+    rng = np.random.default_rng(seed)
+
+    flaechen = rng.lognormal(np.log(GRUNDFLAECHE_MEDIAN), GRUNDFLAECHE_STREUUNG, anzahl)
+    flaechen = np.clip(flaechen, 20.0, 50000.0)
+    dacharten = rng.choice(len(DACHARTEN), size=anzahl, p=DACHART_ANTEILE)
+    ausrichtungen = rng.choice(orientations, size=anzahl)
+    variabel = rng.random(anzahl) < anteil_variabel
+
+    os.makedirs(os.path.dirname(pfad) or ".", exist_ok=True)
+    with open(pfad, "w", encoding="utf-8-sig") as file:
+        file.write("Campus/Gebäude;Grundfläche in m2;Dachart;Orientierung\n")
+        for idx in range(anzahl):
+            dachart = DACHARTEN[dacharten[idx]]
+            if dachart == "Flachdach":
+                orientierung = "0"
+            elif variabel[idx] and dachart != "Satteldach":
+                orientierung = "variabel"
+            else:
+                orientierung = str(ausrichtungen[idx])
+
+            file.write(
+                f"Gebäude {idx + 1};{_deutsche_zahl(flaechen[idx])};{dachart};{orientierung}\n"
+            )
+
+
+def berechne_synthetische_globalstrahlung(
+    jahre: int, start_jahr: int = 2023, seed: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Diese Funktion erzeugt eine stündliche Globalstrahlungsreihe über mehrere Jahre.
+
+    Args:
+        jahre (int): Anzahl Jahre.
+        start_jahr (int): Erstes Jahr.
+        seed (int): Seed des Zufallsgenerators.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Stunden (datetime64, Ortszeit mit
+            Sommerzeit wie in der Messreihe) und Globalstrahlung in W/m².
+    """
+    rng = np.random.default_rng(seed)
+
+    zeitpunkte = pd.date_range(
+        f"{start_jahr}-01-01",
+        f"{start_jahr + jahre}-01-01",
+        freq="h",
+        tz=STANDORT_ZEITZONE,
+        inclusive="left",
+    )
+    # Ende März fehlt 02:00, Ende Oktober kommt 02:00 doppelt vor
+    stunden = zeitpunkte.tz_localize(None).to_numpy().astype("datetime64[h]")
+    utc = zeitpunkte.tz_convert("UTC").tz_localize(None).to_numpy()
+    # Strahlung als Mittel über die Stunde
+    zenit, _ = solar_position(
+        utc.astype("datetime64[m]") + np.timedelta64(30, "m"),
+        STANDORT_BREITENGRAD,
+        STANDORT_LAENGENGRAD,
+    )
+    # Haurwitz (1945): ghi = 1098 * cos(zenit) * exp(-0.057 / cos(zenit))
+    cos_zenit = np.cos(np.radians(zenit))
+    sonne = cos_zenit > 0
+    klarhimmel = np.zeros_like(cos_zenit)
+    klarhimmel[sonne] = 1098.0 * cos_zenit[sonne] * np.exp(-0.057 / cos_zenit[sonne])
+
+    # Bewölkung: Tagesmittel als AR(1)-Prozess, dazu stündliches Rauschen
+    tage = len(stunden) // 24
+    tages_rauschen = rng.normal(0.0, 1.0, tage)
+    bewoelkung = np.empty(tage)
+    bewoelkung[0] = tages_rauschen[0]
+    for tag in range(1, tage):
+        bewoelkung[tag] = 0.7 * bewoelkung[tag - 1] + 0.71 * tages_rauschen[tag]
+    klarheit = 1 / (1 + np.exp(-(bewoelkung + 0.3)))
+    klarheit = np.repeat(klarheit, 24) + rng.normal(0.0, 0.08, len(stunden))
+
+    werte = np.round(klarhimmel * np.clip(klarheit, 0.05, 1.0), 1)
+    return stunden, werte
+
+
+def erzeuge_globalstrahlung(
+    pfad: str, jahre: int, start_jahr: int = 2023, seed: int = 0
+) -> None:
+    """Diese Funktion schreibt eine synthetische Globalstrahlungsreihe als CSV.
+
+    Args:
+        pfad (str): Zieldatei.
+        jahre (int): Anzahl Jahre.
+        start_jahr (int): Erstes Jahr.
+        seed (int): Seed des Zufallsgenerators.
+    """
+    stunden, werte = berechne_synthetische_globalstrahlung(jahre, start_jahr, seed)
+    zeitstempel = stunden.astype("datetime64[m]").astype(str)
+
+    os.makedirs(os.path.dirname(pfad) or ".", exist_ok=True)
+    with open(pfad, "w", encoding="utf-8") as file:
+        for iso, wert in zip(zeitstempel, werte):
+            # YYYY-MM-DDTHH:MM -> dd.mm.YYYY HH:MM
+            file.write(f"{iso[8:10]}.{iso[5:7]}.{iso[0:4]} {iso[11:16]};{wert:g}\n")
+
+
+def _tagesrauschen(seed: int, tag: int, anzahl_gebaeude: int) -> np.ndarray:
+    """Zieht das multiplikative Rauschen eines Tages, reproduzierbar pro Tag."""
+    rng = np.random.default_rng([seed, tag])
+    return rng.lognormal(0.0, 0.15, (24, anzahl_gebaeude))
+
+
+def erzeuge_lastprofile(
+    pfad: str,
+    gebaeude_datei: str,
+    jahre: int,
+    start_jahr: int = 2023,
+    seed: int = 0,
+) -> None:
+    """Diese Funktion schreibt synthetische stündliche Lastprofile als CSV.
+
+    Die Last wird tageweise erzeugt und geschrieben, damit auch bei 100.000
+    Gebäuden nur ein Tag im Speicher liegt. Das Rauschen jedes Tages wird dafür
+    zweimal mit demselben Seed gezogen, zuerst für die Jahressumme zur Normierung
+    und dann zum Schreiben.
+
+    Args:
+        pfad (str): Zieldatei.
+        gebaeude_datei (str): Gebäudebestand im Format von data/grundflaeche.csv.
+        jahre (int): Anzahl Jahre.
+        start_jahr (int): Erstes Jahr.
+        seed (int): Seed des Zufallsgenerators.
+    """
+    gebaeude = pd.read_csv(
+        gebaeude_datei,
+        sep=";",
+        usecols=[0, 1],
+        thousands=".",
+        decimal=",",
+        encoding="utf-8-sig",
+    )
+    namen = gebaeude.iloc[:, 0].to_numpy()
+    flaechen = gebaeude.iloc[:, 1].to_numpy(dtype=np.float64)
+
+    stunden = np.arange(
+        np.datetime64(f"{start_jahr}-01-01T00"),
+        np.datetime64(f"{start_jahr + jahre}-01-01T00"),
+        np.timedelta64(1, "h"),
+    )
+    tage = stunden.astype("datetime64[D]")
+    tagesstunde = (stunden - tage).astype(np.int64)
+    # 1970-01-01 war ein Donnerstag, Wochentag 0 ist Montag
+    werktag = (tage.astype(np.int64) + 3) % 7 < 5
+    form = np.where(werktag & (tagesstunde >= 7) & (tagesstunde < 19), 1.0, 0.35)
+    form = form.reshape(-1, 24)
+
+    summe = np.zeros(len(namen))
+    for tag in range(len(form)):
+        summe += form[tag] @ _tagesrauschen(seed, tag, len(namen))
+    skalierung = flaechen * VERBRAUCH_PRO_M2 * jahre / summe
+
+    zeitstempel = stunden.astype("datetime64[m]").astype(str)
+    # YYYY-MM-DDTHH:MM -> dd.mm.YYYY HH:MM
+    zeitstempel = [
+        f"{iso[8:10]}.{iso[5:7]}.{iso[0:4]} {iso[11:16]}" for iso in zeitstempel
+    ]
+
+    os.makedirs(os.path.dirname(pfad) or ".", exist_ok=True)
+    with open(pfad, "w", encoding="utf-8", newline="") as file:
+        pd.DataFrame(columns=["Zeitstempel", *namen]).to_csv(file, sep=";", index=False)
+        for tag in range(len(form)):
+            last = form[tag, :, np.newaxis] * _tagesrauschen(seed, tag, len(namen))
+            last *= skalierung
+            pd.DataFrame(
+                np.round(last, 3), index=zeitstempel[tag * 24 : (tag + 1) * 24]
+            ).to_csv(file, sep=";", header=False, decimal=",")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buildings", type=int, default=100000)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--start-year", type=int, default=2023)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--variable-share",
+        type=float,
+        default=0.3,
+        help='Anteil der geneigten und gemischten Dächer mit Orientierung "variabel"',
+    )
+    parser.add_argument("--output", default="data/synthetisch")
+    parser.add_argument(
+        "--load-profiles",
+        nargs="?",
+        const="",
+        metavar="CSV",
+        help="Zusätzlich Lastprofile schreiben, für den erzeugten oder den "
+        "angegebenen Gebäudebestand (z.B. data/grundflaeche.csv)",
+    )
+    args = parser.parse_args()
+
+    gebaeude_pfad = os.path.join(args.output, "grundflaeche.csv")
+    erzeuge_gebaeudebestand(
+        gebaeude_pfad, args.buildings, args.seed, args.variable_share
+    )
+    print(f"{args.buildings} Gebäude wurden in '{gebaeude_pfad}' gespeichert.")
+
+    strahlung_pfad = os.path.join(args.output, "globalstrahlung_stuendlich.csv")
+    erzeuge_globalstrahlung(strahlung_pfad, args.years, args.start_year, args.seed)
+    print(
+        f"{args.years} Jahr(e) Globalstrahlung wurden in '{strahlung_pfad}' gespeichert."
+    )
+
+    if args.load_profiles is not None:
+        last_pfad = os.path.join(args.output, "lastprofile.csv")
+        erzeuge_lastprofile(
+            last_pfad,
+            args.load_profiles or gebaeude_pfad,
+            args.years,
+            args.start_year,
+            args.seed,
+        )
+        print(f"Lastprofile wurden in '{last_pfad}' gespeichert.")
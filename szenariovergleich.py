@@ -0,0 +1,433 @@
+"""Dieses File vergleicht zwei Ergebnisstände (z.B. vor und nach einer Änderung von
+wirkungsgrad_liste, reduction_factor oder der Globalstrahlung) Gebäude für Gebäude.
+
+Ergebnisstände:
+    - ergebnisse.json (stromertrag.py ohne --fused): Leistung pro Konfiguration und
+      Zeitstempel, Schlüssel (berechnungsart, roof_type, orientation, tilt,
+      relative_yield, wirkungsgrad, zeitstempel)
+    - Ordner mit den Excel-Dateien pro Gebäude (stromertrag.py --fused bzw.
+      auswertung.py): Schlüssel (berechnungsart, statistic, hour)
+
+Beide Stände werden gebäudeweise gestreamt, im Speicher liegt pro Seite nur das
+aktuelle Gebäude. Gebäude werden in der Reihenfolge der Stände zusammengeführt
+(bei gleichem Gebäudebestand ist die Reihenfolge gleich). Ein Gebäude ohne
+Gegenstück wird gepuffert, bis es auf der anderen Seite auftaucht, oder am Ende als
+"nur links"/"nur rechts" gemeldet.
+
+Innerhalb eines Gebäudes werden die Zeilen beider Seiten in einem Sort-Merge-Join
+ausgerichtet: ein lexsort über die Schlüssel beider Seiten, Treffer sind benachbarte
+Zeilen mit gleichem Schlüssel, eine links, eine rechts.
+
+Ausgabe:
+    - {output}_top.csv: die größten absoluten Änderungen der Leistung
+    - {output}_gebaeude.csv: pro Gebäude und Berechnungsart (bei Excel-Ständen auch
+      Statistik) Summen der gemeinsamen Zeilen links und rechts, Differenz, relative
+      Differenz, maximale Abweichung, Anzahl geänderter Zeilen und Zeilen, die nur
+      auf einer Seite stehen
+
+Aufruf:
+    python szenariovergleich.py data/ergebnisse_alt.json data/ergebnisse.json
+    python szenariovergleich.py data/alt data --top 50
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections.abc import Iterator
+from itertools import zip_longest
+
+import ijson
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from auswertung import safe_filename
+
+JSON_SCHLUESSEL = [
+    "berechnungsart",
+    "roof_type",
+    "orientation",
+    "tilt",
+    "relative_yield",
+    "wirkungsgrad",
+    "zeitstempel",
+]
+EXCEL_SCHLUESSEL = ["berechnungsart", "statistic", "hour"]
+
+# Aufbau der Keys siehe auswertung.py. Wie dort zählt nur der erste Wert nach
+# "_wirkungsgrad_" (gable-Keys gemischter Dächer enthalten ihn doppelt).
+LEISTUNG_KEY = (
+    r"^leistung_(?P<berechnungsart>[^_]+)_(?P<roof_type>[^_]+)_"
+    r"(?:relative_yield_(?P<relative_yield>[^_]+)"
+    r"|with_orientation_(?P<orientation>[^_]+)_tilt_(?P<tilt>[^_]+))"
+    r"_wirkungsgrad_(?P<wirkungsgrad>[^_]+).*?_globalstrahlung_[^_]*"
+    r"_zeitstempel_\ufeff?(?P<zeitstempel>.+)$"
+)
+
+
+def _zerlege_gebaeude(keys: list[str], leistungen: list[float]) -> pd.DataFrame:
+    """Zerlegt die leistung_-Keys eines Gebäudes vektorisiert in Schlüsselspalten."""
+    tabelle = pd.Series(keys, dtype=object).str.extract(LEISTUNG_KEY)
+    for spalte in ["orientation", "tilt", "relative_yield", "wirkungsgrad"]:
+        tabelle[spalte] = pd.to_numeric(tabelle[spalte], errors="coerce")
+    tabelle["zeitstempel"] = pd.to_datetime(
+        tabelle["zeitstempel"].str.strip(), format="%d.%m.%Y %H:%M", errors="coerce"
+    )
+    tabelle["leistung"] = np.asarray(leistungen, dtype=np.float64)
+
+    ungueltig = tabelle["berechnungsart"].isna() | tabelle["zeitstempel"].isna()
+    if ungueltig.any():
+        print(
+            f"Überspringe {int(ungueltig.sum())} Keys, die nicht zerlegt werden können"
+        )
+        tabelle = tabelle[~ungueltig]
+    return tabelle
+
+
+def lies_json_stand(pfad: str) -> Iterator[tuple[str, pd.DataFrame]]:
+    """Liest eine ergebnisse.json Gebäude für Gebäude.
+
+    Args:
+        pfad (str): Pfad zur ergebnisse.json.
+
+    Yields:
+        tuple[str, pd.DataFrame]: Gebäude und Tabelle mit JSON_SCHLUESSEL und leistung.
+    """
+    with open(pfad, "rb") as f:
+        for building_obj in ijson.items(f, "item", use_float=True):
+            building_name = building_obj.get("building")
+            if not building_name:
+                print("Fehlendes 'building' in Objekt, wird übersprungen")
+                continue
+
+            keys = [key for key in building_obj if key.startswith("leistung_")]
+            yield building_name, _zerlege_gebaeude(
+                keys, [building_obj[key] for key in keys]
+            )
+
+
+def _excel_gebaeude(pfad: str) -> str | None:
+    """Gebäude einer Excel-Datei aus speichere_aggregate_als_excel, sonst None.
+
+    Andere Excel-Dateien im Ordner (Rollups, Perzentile, ...) haben andere Spalten
+    oder einen Dateinamen, der nicht zum Gebäude passt.
+    """
+    arbeitsmappe = load_workbook(pfad, read_only=True)
+    try:
+        zeilen = arbeitsmappe.active.iter_rows(max_row=2, values_only=True)
+        kopf = next(zeilen, ())
+        erste_zeile = next(zeilen, None)
+    finally:
+        arbeitsmappe.close()
+
+    if erste_zeile is None or not {"building", "leistung", *EXCEL_SCHLUESSEL} <= set(
+        kopf
+    ):
+        return None
+    building = erste_zeile[kopf.index("building")]
+    if safe_filename(str(building)) + ".xlsx" != os.path.basename(pfad):
+        return None
+    return building
+
+
+def lies_excel_stand(ordner: str) -> Iterator[tuple[str, pd.DataFrame]]:
+    """Liest die Excel-Dateien pro Gebäude eines Ordners nach Dateinamen sortiert.
+
+    Args:
+        ordner (str): Ordner mit den Excel-Dateien.
+
+    Yields:
+        tuple[str, pd.DataFrame]: Gebäude und Tabelle mit EXCEL_SCHLUESSEL und leistung.
+    """
+    for datei in sorted(os.listdir(ordner)):
+        pfad = os.path.join(ordner, datei)
+        if not datei.endswith(".xlsx") or datei.startswith("~$"):
+            continue
+        building = _excel_gebaeude(pfad)
+        if building is None:
+            continue
+
+        tabelle = pd.read_excel(pfad, usecols=EXCEL_SCHLUESSEL + ["leistung"])
+        tabelle["hour"] = pd.to_datetime(tabelle["hour"])
+        yield building, tabelle
+
+
+def lies_stand(pfad: str) -> tuple[Iterator[tuple[str, pd.DataFrame]], list[str]]:
+    """Öffnet einen Ergebnisstand und gibt den Iterator und seine Schlüssel zurück."""
+    if os.path.isdir(pfad):
+        return lies_excel_stand(pfad), EXCEL_SCHLUESSEL
+    if os.path.isfile(pfad):
+        return lies_json_stand(pfad), JSON_SCHLUESSEL
+    sys.exit(f"Fehler: Ergebnisstand {pfad} nicht gefunden")
+
+
+def paare_gebaeude(
+    links: Iterator[tuple[str, pd.DataFrame]],
+    rechts: Iterator[tuple[str, pd.DataFrame]],
+) -> Iterator[tuple[str, pd.DataFrame | None, pd.DataFrame | None]]:
+    """Führt zwei gebäudeweise Ströme zusammen.
+
+    Bei gleicher Reihenfolge wird jedes Gebäude sofort weitergegeben. Nur Gebäude
+    ohne Gegenstück werden gepuffert.
+
+    Yields:
+        tuple: (Gebäude, Tabelle links oder None, Tabelle rechts oder None).
+    """
+    offen_links: dict[str, pd.DataFrame] = {}
+    offen_rechts: dict[str, pd.DataFrame] = {}
+    for eintrag_links, eintrag_rechts in zip_longest(links, rechts):
+        if eintrag_links is not None:
+            offen_links[eintrag_links[0]] = eintrag_links[1]
+        if eintrag_rechts is not None:
+            offen_rechts[eintrag_rechts[0]] = eintrag_rechts[1]
+        for building in [name for name in offen_links if name in offen_rechts]:
+            yield building, offen_links.pop(building), offen_rechts.pop(building)
+
+    for building, tabelle in offen_links.items():
+        yield building, tabelle, None
+    for building, tabelle in offen_rechts.items():
+        yield building, None, tabelle
+
+
+def sort_merge_join(
+    links: pd.DataFrame, rechts: pd.DataFrame, schluessel: list[str]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Richtet die Zeilen zweier Tabellen über gleiche Schlüssel aus.
+
+    Die Schlüsselspalten beider Seiten werden gemeinsam in sortierte Codes
+    umgewandelt (NaN wie bei flat-Dächern ist ein eigener Wert). Ein lexsort mit
+    der Seite als letztem Kriterium legt zu jedem Schlüssel die linke Zeile direkt
+    vor die rechte.
+
+    Args:
+        links (pd.DataFrame): Tabelle links.
+        rechts (pd.DataFrame): Tabelle rechts.
+        schluessel (list[str]): Schlüsselspalten.
+
+    Returns:
+        tuple[np.ndarray, ...]: Zeilennummern der Treffer links und rechts sowie der
+            Zeilen, die nur links bzw. nur rechts stehen.
+    """
+    anzahl_links = len(links)
+    codes = [
+        pd.factorize(
+            pd.concat([links[spalte], rechts[spalte]], ignore_index=True),
+            sort=True,
+            use_na_sentinel=False,
+        )[0]
+        for spalte in schluessel
+    ]
+    seite = np.repeat([0, 1], [anzahl_links, len(rechts)])
+    reihenfolge = np.lexsort([seite] + codes[::-1])
+
+    sortiert = np.stack(codes, axis=1)[reihenfolge]
+    seite = seite[reihenfolge]
+    treffer = np.flatnonzero(
+        np.all(sortiert[1:] == sortiert[:-1], axis=1) & (seite[1:] > seite[:-1])
+    )
+    index_links = reihenfolge[treffer]
+    index_rechts = reihenfolge[treffer + 1] - anzahl_links
+
+    zugeordnet = np.zeros(len(seite), dtype=bool)
+    zugeordnet[index_links] = True
+    zugeordnet[index_rechts + anzahl_links] = True
+    return (
+        index_links,
+        index_rechts,
+        np.flatnonzero(~zugeordnet[:anzahl_links]),
+        np.flatnonzero(~zugeordnet[anzahl_links:]),
+    )
+
+
+def vergleiche_gebaeude(
+    building: str,
+    links: pd.DataFrame | None,
+    rechts: pd.DataFrame | None,
+    schluessel: list[str],
+    gruppen: list[str],
+    toleranz: float,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Vergleicht ein Gebäude beider Stände.
+
+    Args:
+        building (str): Gebäude.
+        links (pd.DataFrame | None): Tabelle links oder None, wenn das Gebäude fehlt.
+        rechts (pd.DataFrame | None): Tabelle rechts oder None, wenn das Gebäude fehlt.
+        schluessel (list[str]): Schlüsselspalten.
+        gruppen (list[str]): Spalten der Zusammenfassung pro Gebäude.
+        toleranz (float): Absolute Differenz, ab der eine Zeile als geändert zählt.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Alle Zeilen mit Schlüssel, leistung_links,
+            leistung_rechts und differenz sowie die Zusammenfassung pro Gruppe.
+    """
+    # Fehlt das Gebäude auf einer Seite, leere Tabelle mit den Spaltentypen der anderen
+    if links is None:
+        links = rechts.iloc[:0]
+    if rechts is None:
+        rechts = links.iloc[:0]
+    links = links.reset_index(drop=True)
+    rechts = rechts.reset_index(drop=True)
+    index_links, index_rechts, nur_links, nur_rechts = sort_merge_join(
+        links, rechts, schluessel
+    )
+
+    zeilen = links.iloc[index_links][schluessel].reset_index(drop=True)
+    zeilen.insert(0, "building", building)
+    zeilen["leistung_links"] = links["leistung"].to_numpy(dtype=np.float64)[index_links]
+    zeilen["leistung_rechts"] = rechts["leistung"].to_numpy(dtype=np.float64)[
+        index_rechts
+    ]
+    zeilen["differenz"] = zeilen["leistung_rechts"] - zeilen["leistung_links"]
+    zeilen["geaendert"] = zeilen["differenz"].abs() > toleranz
+
+    zusammenfassung = zeilen.groupby(gruppen, dropna=False).agg(
+        summe_links=("leistung_links", "sum"),
+        summe_rechts=("leistung_rechts", "sum"),
+        max_abs_differenz=("differenz", lambda differenz: differenz.abs().max()),
+        geaendert=("geaendert", "sum"),
+    )
+    zusammenfassung = zusammenfassung.join(
+        [
+            links.iloc[nur_links].groupby(gruppen).size().rename("nur_links"),
+            rechts.iloc[nur_rechts].groupby(gruppen).size().rename("nur_rechts"),
+        ],
+        how="outer",
+    )
+    zusammenfassung = zusammenfassung.reset_index()
+    zusammenfassung.insert(0, "building", building)
+    return zeilen.drop(columns="geaendert"), zusammenfassung
+
+
+def _groesste_aenderungen(zeilen: pd.DataFrame, anzahl: int) -> pd.DataFrame:
+    """Die anzahl Zeilen mit der größten absoluten Differenz, ohne voll zu sortieren."""
+    if len(zeilen) > anzahl:
+        betrag = zeilen["differenz"].abs().to_numpy()
+        zeilen = zeilen.iloc[np.argpartition(-betrag, anzahl - 1)[:anzahl]]
+    return zeilen
+
+
+def vergleiche_staende(
+    pfad_links: str, pfad_rechts: str, top: int = 20, toleranz: float = 1e-6
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Diese Funktion vergleicht zwei Ergebnisstände gebäudeweise.
+
+    Args:
+        pfad_links (str): ergebnisse.json oder Ordner mit Excel-Dateien (vorher).
+        pfad_rechts (str): Ergebnisstand derselben Art (nachher).
+        top (int): Anzahl der größten Änderungen in der Ausgabe.
+        toleranz (float): Absolute Differenz, ab der eine Zeile als geändert zählt.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Die größten Änderungen (absteigend) und
+            die Zusammenfassung pro Gebäude.
+    """
+    links, schluessel = lies_stand(pfad_links)
+    rechts, schluessel_rechts = lies_stand(pfad_rechts)
+    if schluessel != schluessel_rechts:
+        sys.exit("Fehler: Beide Ergebnisstände müssen von derselben Art sein")
+    gruppen = ["berechnungsart"] + (["statistic"] if "statistic" in schluessel else [])
+
+    groesste = []
+    zusammenfassungen = []
+    for building, tabelle_links, tabelle_rechts in paare_gebaeude(links, rechts):
+        zeilen, zusammenfassung = vergleiche_gebaeude(
+            building, tabelle_links, tabelle_rechts, schluessel, gruppen, toleranz
+        )
+        zusammenfassungen.append(zusammenfassung)
+        # Laufende Bestenliste: nie mehr als 2 * top Zeilen im Speicher
+        if len(zeilen):
+            groesste = [_groesste_aenderungen(pd.concat(groesste + [zeilen]), top)]
+    if not groesste:
+        sys.exit("Fehler: Die Ergebnisstände haben keine gemeinsamen Zeilen")
+
+    top_aenderungen = pd.concat(groesste, ignore_index=True)
+    top_aenderungen["relative_differenz"] = top_aenderungen["differenz"] / (
+        top_aenderungen["leistung_links"].abs().replace(0, np.nan)
+    )
+    top_aenderungen = top_aenderungen.iloc[
+        np.argsort(-top_aenderungen["differenz"].abs().to_numpy(), kind="stable")
+    ].reset_index(drop=True)
+
+    zusammenfassung = pd.concat(zusammenfassungen, ignore_index=True)
+    for spalte in ["geaendert", "nur_links", "nur_rechts"]:
+        zusammenfassung[spalte] = zusammenfassung[spalte].fillna(0).astype(np.int64)
+    zusammenfassung["differenz"] = (
+        zusammenfassung["summe_rechts"] - zusammenfassung["summe_links"]
+    )
+    zusammenfassung["relative_differenz"] = zusammenfassung["differenz"] / (
+        zusammenfassung["summe_links"].abs().replace(0, np.nan)
+    )
+    return top_aenderungen, zusammenfassung
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "links", help="Ergebnisstand vorher (ergebnisse.json oder Ordner)"
+    )
+    parser.add_argument("rechts", help="Ergebnisstand nachher (derselben Art)")
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="Anzahl der größten Änderungen in der Ausgabe (Standard: 20)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1e-6,
+        help="Absolute Differenz der Leistung, ab der eine Zeile als geändert zählt",
+    )
+    parser.add_argument(
+        "--output",
+        default="data/szenariovergleich",
+        help="Präfix der Ausgabedateien {output}_top.csv und {output}_gebaeude.csv",
+    )
+    args = parser.parse_args()
+    if args.top < 1:
+        sys.exit("Fehler: --top muss mindestens 1 sein")
+
+    start = time.perf_counter()
+    top_aenderungen, zusammenfassung = vergleiche_staende(
+        args.links, args.rechts, args.top, args.tolerance
+    )
+    dauer = time.perf_counter() - start
+
+    top_aenderungen.to_csv(f"{args.output}_top.csv", index=False)
+    zusammenfassung.to_csv(f"{args.output}_gebaeude.csv", index=False)
+
+    geaendert = zusammenfassung[
+        (zusammenfassung["geaendert"] > 0)
+        | (zusammenfassung["nur_links"] > 0)
+        | (zusammenfassung["nur_rechts"] > 0)
+    ]
+    if geaendert.empty:
+        print("Keine Änderungen.")
+    else:
+        with pd.option_context("display.width", 200, "display.max_columns", None):
+            print(top_aenderungen.head(10).to_string(index=False))
+            print()
+            print(
+                geaendert[
+                    ["building"]
+                    + [
+                        spalte
+                        for spalte in ["berechnungsart", "statistic"]
+                        if spalte in geaendert
+                    ]
+                    + [
+                        "differenz",
+                        "relative_differenz",
+                        "geaendert",
+                        "nur_links",
+                        "nur_rechts",
+                    ]
+                ].to_string(index=False)
+            )
+    print(
+        f"\n{zusammenfassung['building'].nunique()} Gebäude in {dauer:.1f} s verglichen, "
+        f"{geaendert['building'].nunique()} mit Änderungen, gespeichert in "
+        f"'{args.output}_top.csv' und '{args.output}_gebaeude.csv'"
+    )
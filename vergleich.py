@@ -0,0 +1,297 @@
+"""Dieses File vergleicht die ursprüngliche Berechnung mit der direkten Aggregation.
+
+Ursprünglicher Weg:
+    calculate_globalstrahlung_pro_stunde -> speichere_daten_als_json -> _referenz_auswertung
+    (eingefrorene Kopie der ursprünglichen Auswertung, unabhängig von auswertung.py)
+
+Neuer Weg:
+    berechne_aggregate (ohne Umweg über die ergebnisse.json)
+
+Beide Wege laufen nacheinander in je einem eigenen Prozess auf denselben Eingaben.
+Ausgegeben werden die Laufzeiten, der Speedup, der maximale Arbeitsspeicher (Peak RSS)
+jedes Prozesses sowie pro Gebäude und Berechnungsart die maximale absolute und
+relative Abweichung der Leistung. Liegt eine Abweichung über der Toleranz oder fehlen
+Zeilen, endet das Programm mit Exit-Code 1.
+
+Aufruf:
+    python vergleich.py --buildings 3
+"""
+
+import argparse
+import contextlib
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import ijson
+import numpy as np
+import pandas as pd
+
+import stromertrag
+from auswertung import (
+    _get_berechnungsart,
+    _get_globalstrahlung,
+    _get_relative_yield,
+    _get_roof_type,
+    _get_tilt,
+    _get_wirkungsgrad,
+    _get_zeitstempel,
+    _remove_leistung_prefix,
+    get_orientation,
+    sortiere_aggregate,
+)
+
+SCHLUESSEL = ["building", "berechnungsart", "statistic", "hour"]
+
+
+def _referenz_auswertung(pfad: str) -> pd.DataFrame:
+    """Eingefrorene Kopie der ursprünglichen Auswertung der ergebnisse.json.
+
+    Ein Dict pro Datensatz, die Leistung als Decimal aus ijson und min, avg und max
+    pro Gruppe wie im ursprünglichen aggregate_group. auswertung.aggregiere_ergebnisse
+    wird weiter optimiert, diese Funktion bleibt absichtlich unverändert, damit der
+    Vergleich Abweichungen auf beiden Seiten findet.
+
+    Args:
+        pfad (str): Pfad zur ergebnisse.json.
+
+    Returns:
+        pd.DataFrame: min, avg und max pro Gebäude, Berechnungsart und Stunde.
+    """
+    data_rows = []
+    with open(pfad, "rb") as f:
+        for building_obj in ijson.items(f, "item"):
+            building_name = building_obj.get("building")
+            if not building_name:
+                continue
+
+            for key, value in building_obj.items():
+                key_without_prefix, valid_key = _remove_leistung_prefix(key)
+                if not valid_key:
+                    continue
+                key_berechnungsart = _get_berechnungsart(key_without_prefix)
+                if key_berechnungsart not in ["scheaffler", "tum"]:
+                    continue
+                roof_type_key = _get_roof_type(key_without_prefix)
+                if roof_type_key == "flat":
+                    relative_yield = _get_relative_yield(key_without_prefix)
+                    if relative_yield is None:
+                        continue
+                elif roof_type_key in ["pitched", "gable"]:
+                    orientation = get_orientation(key_without_prefix)
+                    tilt = _get_tilt(key_without_prefix)
+                    if orientation is None or tilt is None:
+                        continue
+                else:
+                    continue
+                wirkungsgrad = _get_wirkungsgrad(key_without_prefix)
+                globalstrahlung = _get_globalstrahlung(key_without_prefix)
+                zeitstempel = _get_zeitstempel(key_without_prefix)
+                if (
+                    wirkungsgrad is None
+                    or globalstrahlung is None
+                    or zeitstempel is None
+                ):
+                    continue
+
+                record = {
+                    "building": building_name,
+                    "berechnungsart": key_berechnungsart,
+                    "roof_type": roof_type_key,
+                    "wirkungsgrad": wirkungsgrad,
+                    "globalstrahlung": globalstrahlung,
+                    "datum": zeitstempel,
+                    "leistung": value,
+                }
+                if roof_type_key == "flat":
+                    record["relative_yield"] = relative_yield
+                    record["orientation"] = None
+                    record["tilt"] = None
+                else:
+                    record["relative_yield"] = None
+                    record["orientation"] = orientation
+                    record["tilt"] = tilt
+                data_rows.append(record)
+
+    df = pd.DataFrame(data_rows)
+    df["hour"] = df["datum"].dt.floor("h")
+
+    aggregated_list = []
+    for _, group in df.groupby(["building", "berechnungsart", "hour"]):
+        min_row = group.loc[group["leistung"].idxmin()].copy()
+        max_row = group.loc[group["leistung"].idxmax()].copy()
+        avg_row = group.iloc[0].copy()
+        avg_row["leistung"] = group["leistung"].mean()
+        min_row["statistic"] = "min"
+        avg_row["statistic"] = "avg"
+        max_row["statistic"] = "max"
+        aggregated_list.append(pd.DataFrame([min_row, avg_row, max_row]))
+    aggregated = pd.concat(aggregated_list, ignore_index=True)
+    return aggregated.drop(columns=["datum"])
+
+
+def _bisheriger_weg(anzahl: int | None, arbeitsordner: str) -> pd.DataFrame:
+    """Berechnet die Aggregate über die ergebnisse.json wie stromertrag.py + auswertung.py."""
+    pfad = os.path.join(arbeitsordner, "ergebnisse.json")
+    daten = stromertrag.erstelle_daten()[:anzahl]
+    daten = stromertrag.calulate_roof_area(daten)
+    daten = stromertrag.calculate_relative_yield(daten)
+    daten = stromertrag.calculate_globalstrahlung_pro_stunde(daten)
+    stromertrag.speichere_daten_als_json(daten, pfad)
+    del daten
+    return _referenz_auswertung(pfad)
+
+
+def _neuer_weg(anzahl: int | None, arbeitsordner: str) -> pd.DataFrame:
+    """Berechnet die Aggregate direkt wie stromertrag.py --fused."""
+    daten = [
+        stromertrag.erstelle_gebaeudemodell(gebaeude)
+        for gebaeude in stromertrag.erstelle_daten()[:anzahl]
+    ]
+    return sortiere_aggregate(stromertrag.berechne_aggregate(daten))
+
+
+def _messe(aufgabe: tuple) -> tuple[pd.DataFrame, float, float]:
+    """Führt einen Berechnungsweg aus und misst Laufzeit und Peak RSS.
+
+    Args:
+        aufgabe (tuple): (Funktion, Anzahl Gebäude, Globalstrahlungsdatei, Arbeitsordner).
+
+    Returns:
+        tuple[pd.DataFrame, float, float]: Aggregate, Laufzeit in s und Peak RSS in MB.
+    """
+    funktion, anzahl, globalstrahlung_datei, arbeitsordner = aufgabe
+    stromertrag.globalstrahlung_datei = globalstrahlung_datei
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as stumm, contextlib.redirect_stdout(stumm):
+        aggregated = funktion(anzahl, arbeitsordner)
+    dauer = time.perf_counter() - start
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return aggregated, dauer, peak_mb
+
+
+def _in_eigenem_prozess(aufgabe: tuple) -> tuple[pd.DataFrame, float, float]:
+    """Startet _messe in einem frischen Prozess, damit Peak RSS pro Weg gilt."""
+    kontext = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=kontext) as pool:
+        return pool.submit(_messe, aufgabe).result()
+
+
+def vergleiche_aggregate(
+    bisher: pd.DataFrame, neu: pd.DataFrame, rtol: float, atol: float
+) -> tuple[pd.DataFrame, int]:
+    """Berechnet pro Gebäude und Berechnungsart die Abweichung der Leistung.
+
+    Eine Zeile überschreitet die Toleranz, wenn
+    |neu - bisher| > atol + rtol * |bisher| (wie bei np.isclose).
+
+    Args:
+        bisher (pd.DataFrame): Aggregate des ursprünglichen Wegs.
+        neu (pd.DataFrame): Aggregate des neuen Wegs.
+        rtol (float): Erlaubte relative Abweichung.
+        atol (float): Erlaubte absolute Abweichung.
+
+    Returns:
+        tuple[pd.DataFrame, int]: Pro Gebäude und Berechnungsart die maximale
+            absolute und relative Abweichung und die Anzahl Zeilen über der
+            Toleranz sowie die Anzahl Zeilen, die nur in einem der beiden
+            Ergebnisse vorkommen.
+    """
+    zusammen = bisher[SCHLUESSEL + ["leistung"]].merge(
+        neu[SCHLUESSEL + ["leistung"]],
+        on=SCHLUESSEL,
+        how="outer",
+        suffixes=("_bisher", "_neu"),
+        indicator=True,
+    )
+    fehlende_zeilen = int((zusammen["_merge"] != "both").sum())
+    zusammen = zusammen[zusammen["_merge"] == "both"]
+
+    # Die ursprünglichen Leistungen sind Decimal-Werte aus ijson
+    leistung_bisher = zusammen["leistung_bisher"].astype(np.float64).to_numpy()
+    leistung_neu = zusammen["leistung_neu"].astype(np.float64).to_numpy()
+    absolut = np.abs(leistung_neu - leistung_bisher)
+    relativ = np.zeros_like(absolut)
+    np.divide(absolut, np.abs(leistung_bisher), out=relativ, where=leistung_bisher != 0)
+
+    abweichungen = (
+        pd.DataFrame(
+            {
+                "building": zusammen["building"].to_numpy(),
+                "berechnungsart": zusammen["berechnungsart"].to_numpy(),
+                "max_abs_abweichung": absolut,
+                "max_rel_abweichung": relativ,
+                "ueber_toleranz": absolut > atol + rtol * np.abs(leistung_bisher),
+            }
+        )
+        .groupby(["building", "berechnungsart"], sort=True)
+        .agg(
+            max_abs_abweichung=("max_abs_abweichung", "max"),
+            max_rel_abweichung=("max_rel_abweichung", "max"),
+            ueber_toleranz=("ueber_toleranz", "sum"),
+        )
+        .reset_index()
+    )
+    return abweichungen, fehlende_zeilen
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--buildings",
+        type=int,
+        help="Nur die ersten N Gebäude vergleichen (Standard: alle)",
+    )
+    parser.add_argument(
+        "--irradiance",
+        metavar="CSV",
+        default=stromertrag.globalstrahlung_datei,
+        help="Datei mit der stündlichen Globalstrahlung "
+        f"(Standard: {stromertrag.globalstrahlung_datei})",
+    )
+    parser.add_argument(
+        "--rtol",
+        type=float,
+        default=1e-9,
+        help="Erlaubte relative Abweichung (Standard: 1e-9)",
+    )
+    parser.add_argument(
+        "--atol",
+        type=float,
+        default=0.0,
+        help="Erlaubte absolute Abweichung (Standard: 0)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as arbeitsordner:
+        bisher, dauer_bisher, peak_bisher = _in_eigenem_prozess(
+            (_bisheriger_weg, args.buildings, args.irradiance, arbeitsordner)
+        )
+        neu, dauer_neu, peak_neu = _in_eigenem_prozess(
+            (_neuer_weg, args.buildings, args.irradiance, arbeitsordner)
+        )
+
+    abweichungen, fehlende_zeilen = vergleiche_aggregate(
+        bisher, neu, args.rtol, args.atol
+    )
+
+    print(f"Bisher: {dauer_bisher:8.2f} s, Peak RSS {peak_bisher:8.1f} MB")
+    print(f"Neu:    {dauer_neu:8.2f} s, Peak RSS {peak_neu:8.1f} MB")
+    print(f"Speedup: {dauer_bisher / dauer_neu:.1f}x")
+    print()
+    print(abweichungen.to_string(index=False))
+    print()
+
+    if fehlende_zeilen:
+        sys.exit(f"Fehler: {fehlende_zeilen} Zeilen fehlen in einem der Ergebnisse")
+    if abweichungen["ueber_toleranz"].any():
+        sys.exit(
+            f"Fehler: Abweichung über der Toleranz (rtol={args.rtol}, atol={args.atol})"
+        )
+    print("Alle Abweichungen liegen innerhalb der Toleranz.")
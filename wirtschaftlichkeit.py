@@ -0,0 +1,298 @@
+"""Dieses File bewertet alle Konfigurationen wirtschaftlich (Kapitalwert, LCOE, Amortisation).
+
+Pro Gebäude, Berechnungsart und Konfiguration:
+    - Investition = Dachfläche (Scheffler bzw. TUM) * Investition pro m²
+    - Betriebskosten pro Jahr = Anteil der Investition
+    - Ertrag im Jahr t = Jahresertrag * (1 - Degradation)^(t - 1)
+    - Erlös pro kWh = Eigenverbrauchsquote * Strompreis
+      + (1 - Eigenverbrauchsquote) * Einspeisevergütung
+    - Kapitalwert = -Investition + Barwert(Erlöse) - Barwert(Betriebskosten)
+    - LCOE = (Investition + Barwert(Betriebskosten)) / Barwert(Ertrag)
+    - Amortisation: Jahr, in dem die abgezinsten Rückflüsse die Investition
+      decken, linear innerhalb des Jahres interpoliert (NaN, wenn nie)
+
+Da Preise, Zinssatz und Degradation für alle Konfigurationen gleich sind, reduzieren
+sich die Barwerte auf kumulierte Abzinsungsfaktoren. Diese werden einmal pro
+Parametersatz berechnet, alles Weitere sind Array-Operationen über alle
+Konfigurationen.
+
+Die Eigenverbrauchsquote ist entweder fest oder stammt pro Konfiguration aus der
+Ausgabe von eigenverbrauch.py (Zeilen ohne Batterie).
+
+Aufruf:
+    python wirtschaftlichkeit.py --capex-per-m2 250 --tariff 0.25 --feed-in 0.08
+"""
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import stromertrag
+
+KONFIGURATION = [
+    "building",
+    "berechnungsart",
+    "roof_type",
+    "wirkungsgrad",
+    "relative_yield",
+    "orientation",
+    "tilt",
+]
+
+
+@dataclass(frozen=True, slots=True)
+class Wirtschaftsparameter:
+    """Annahmen der Wirtschaftlichkeitsrechnung.
+
+    Attributes:
+        capex_pro_m2 (float): Investition in € pro m² Dachfläche.
+        betriebskosten_anteil (float): Betriebskosten pro Jahr als Anteil der Investition.
+        strompreis (float): Vermiedener Strombezug in € pro kWh.
+        einspeiseverguetung (float): Vergütung in € pro eingespeister kWh.
+        degradation (float): Jährlicher Rückgang des Ertrags.
+        zinssatz (float): Kalkulationszinssatz.
+        laufzeit (int): Betrachtungszeitraum in Jahren.
+        eigenverbrauchsquote (float): Anteil des Ertrags, der selbst verbraucht wird.
+    """
+
+    capex_pro_m2: float = 250.0
+    betriebskosten_anteil: float = 0.015
+    strompreis: float = 0.25
+    einspeiseverguetung: float = 0.08
+    degradation: float = 0.005
+    zinssatz: float = 0.04
+    laufzeit: int = 25
+    eigenverbrauchsquote: float = 0.3
+
+
+@lru_cache(maxsize=None)
+def _kumulierte_faktoren(
+    zinssatz: float, degradation: float, laufzeit: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Kumulierte Abzinsungsfaktoren für Zahlungen und für den degradierten Ertrag.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Pro Jahr 1 bis laufzeit die Summe von
+            (1 + zinssatz)^-t und von (1 + zinssatz)^-t * (1 - degradation)^(t - 1).
+            Die Arrays sind schreibgeschützt.
+    """
+    jahre = np.arange(1, laufzeit + 1)
+    abzinsung = (1 + zinssatz) ** -jahre.astype(np.float64)
+    zahlungen = np.cumsum(abzinsung)
+    ertrag = np.cumsum(abzinsung * (1 - degradation) ** (jahre - 1))
+    zahlungen.flags.writeable = False
+    ertrag.flags.writeable = False
+    return zahlungen, ertrag
+
+
+def lade_eigenverbrauchsquoten(pfad: str) -> pd.DataFrame:
+    """Diese Funktion liest die Eigenverbrauchsquoten ohne Batterie aus eigenverbrauch.py.
+
+    Args:
+        pfad (str): Ausgabe von eigenverbrauch.py.
+
+    Returns:
+        pd.DataFrame: Konfigurationsspalten und eigenverbrauchsquote.
+    """
+    if not os.path.exists(pfad):
+        sys.exit(f"Fehler: Datei {pfad} nicht gefunden")
+
+    quoten = pd.read_csv(pfad)
+    quoten = quoten[quoten["batterie_kwh"] == 0]
+    return quoten[KONFIGURATION + ["eigenverbrauchsquote"]]
+
+
+def berechne_wirtschaftlichkeit(
+    konfigurationen: pd.DataFrame, parameter: Wirtschaftsparameter
+) -> pd.DataFrame:
+    """Diese Funktion berechnet Investition, Kapitalwert, LCOE und Amortisation.
+
+    Args:
+        konfigurationen (pd.DataFrame): Ausgabe von
+            stromertrag.berechne_konfigurationsertraege (Jahresertrag in Wh),
+            optional mit einer Spalte eigenverbrauchsquote pro Konfiguration.
+        parameter (Wirtschaftsparameter): Annahmen der Rechnung.
+
+    Returns:
+        pd.DataFrame: Die Konfigurationen mit den Spalten jahresertrag_kwh,
+            investition, kapitalwert, lcoe und amortisation_jahre.
+    """
+    zahlungen, ertrag = _kumulierte_faktoren(
+        parameter.zinssatz, parameter.degradation, parameter.laufzeit
+    )
+
+    energie = konfigurationen["jahresertrag"].to_numpy(dtype=np.float64) / 1000
+    if "eigenverbrauchsquote" in konfigurationen:
+        quote = (
+            konfigurationen["eigenverbrauchsquote"]
+            .fillna(parameter.eigenverbrauchsquote)
+            .to_numpy(dtype=np.float64)
+        )
+    else:
+        quote = parameter.eigenverbrauchsquote
+    erloes_pro_kwh = (
+        quote * parameter.strompreis + (1 - quote) * parameter.einspeiseverguetung
+    )
+
+    investition = (
+        konfigurationen["dachflaeche"].to_numpy(dtype=np.float64)
+        * parameter.capex_pro_m2
+    )
+    betriebskosten = investition * parameter.betriebskosten_anteil
+    erloes = energie * erloes_pro_kwh
+
+    # Rückflüsse bis Jahr t: erloes * ertrag[t] - betriebskosten * zahlungen[t]
+    amortisation = np.full(len(energie), np.nan)
+    vorher = np.zeros(len(energie))
+    for jahr in range(parameter.laufzeit):
+        kumuliert = erloes * ertrag[jahr] - betriebskosten * zahlungen[jahr]
+        neu = np.isnan(amortisation) & (kumuliert >= investition)
+        amortisation[neu] = jahr + (investition[neu] - vorher[neu]) / (
+            kumuliert[neu] - vorher[neu]
+        )
+        vorher = kumuliert
+
+    ergebnis = konfigurationen.copy()
+    ergebnis["jahresertrag_kwh"] = energie
+    ergebnis["investition"] = investition
+    ergebnis["kapitalwert"] = vorher - investition
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ergebnis["lcoe"] = (investition + betriebskosten * zahlungen[-1]) / (
+            energie * ertrag[-1]
+        )
+    ergebnis["amortisation_jahre"] = amortisation
+    return ergebnis
+
+
+def rangfolge(ergebnis: pd.DataFrame) -> pd.DataFrame:
+    """Sortiert pro Gebäude und Berechnungsart nach absteigendem Kapitalwert.
+
+    Die Zeilen eines Gebäudes und einer Berechnungsart müssen zusammenhängend sein
+    (wie bei berechne_konfigurationsertraege). Dann genügt ein lexsort über die
+    Gruppennummer und den Kapitalwert, ohne Strings zu sortieren.
+
+    Args:
+        ergebnis (pd.DataFrame): Ausgabe von berechne_wirtschaftlichkeit.
+
+    Returns:
+        pd.DataFrame: Sortierte Zeilen mit der Spalte rang (1 = höchster Kapitalwert).
+    """
+    building = ergebnis["building"].to_numpy()
+    berechnungsart = ergebnis["berechnungsart"].to_numpy()
+    neue_gruppe = np.r_[
+        True,
+        (building[1:] != building[:-1]) | (berechnungsart[1:] != berechnungsart[:-1]),
+    ]
+    gruppe = np.cumsum(neue_gruppe) - 1
+    reihenfolge = np.lexsort((-ergebnis["kapitalwert"].to_numpy(), gruppe))
+
+    sortiert = ergebnis.iloc[reihenfolge].reset_index(drop=True)
+    sortiert["rang"] = (
+        np.arange(len(sortiert)) - np.flatnonzero(neue_gruppe)[gruppe[reihenfolge]] + 1
+    )
+    return sortiert
+
+
+if __name__ == "__main__":
+    standard = Wirtschaftsparameter()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--buildings",
+        metavar="CSV",
+        default="data/grundflaeche.csv",
+        help="Gebäudebestand im Format von data/grundflaeche.csv",
+    )
+    parser.add_argument(
+        "--irradiance",
+        metavar="CSV",
+        default=stromertrag.globalstrahlung_datei,
+        help="Datei mit der stündlichen Globalstrahlung "
+        f"(Standard: {stromertrag.globalstrahlung_datei})",
+    )
+    parser.add_argument(
+        "--transposition",
+        action="store_true",
+        help="Einstrahlung auf Modulebene statt statischem relativen Ertrag",
+    )
+    parser.add_argument("--capex-per-m2", type=float, default=standard.capex_pro_m2)
+    parser.add_argument(
+        "--opex-share",
+        type=float,
+        default=standard.betriebskosten_anteil,
+        help="Betriebskosten pro Jahr als Anteil der Investition",
+    )
+    parser.add_argument(
+        "--tariff",
+        type=float,
+        default=standard.strompreis,
+        help="Strompreis in €/kWh",
+    )
+    parser.add_argument(
+        "--feed-in",
+        type=float,
+        default=standard.einspeiseverguetung,
+        help="Einspeisevergütung in €/kWh",
+    )
+    parser.add_argument("--degradation", type=float, default=standard.degradation)
+    parser.add_argument("--discount-rate", type=float, default=standard.zinssatz)
+    parser.add_argument("--lifetime", type=int, default=standard.laufzeit)
+    parser.add_argument(
+        "--self-consumption",
+        type=float,
+        default=standard.eigenverbrauchsquote,
+        help="Eigenverbrauchsquote für alle Konfigurationen",
+    )
+    parser.add_argument(
+        "--self-consumption-from",
+        metavar="CSV",
+        help="Eigenverbrauchsquoten pro Konfiguration aus eigenverbrauch.py "
+        "(fehlende Konfigurationen nutzen --self-consumption)",
+    )
+    parser.add_argument("--output", default="data/wirtschaftlichkeit.csv")
+    args = parser.parse_args()
+    stromertrag.globalstrahlung_datei = args.irradiance
+
+    parameter = Wirtschaftsparameter(
+        capex_pro_m2=args.capex_per_m2,
+        betriebskosten_anteil=args.opex_share,
+        strompreis=args.tariff,
+        einspeiseverguetung=args.feed_in,
+        degradation=args.degradation,
+        zinssatz=args.discount_rate,
+        laufzeit=args.lifetime,
+        eigenverbrauchsquote=args.self_consumption,
+    )
+
+    jahressumme = stromertrag.lade_jahressumme(args.transposition)
+    konfigurationen = pd.concat(
+        [
+            stromertrag.berechne_konfigurationsertraege(
+                [stromertrag.erstelle_gebaeudemodell(gebaeude) for gebaeude in block],
+                jahressumme,
+            )
+            for block in stromertrag.lese_gebaeude_bloecke(args.buildings, 1000)
+        ],
+        ignore_index=True,
+    )
+    if args.self_consumption_from:
+        konfigurationen = konfigurationen.merge(
+            lade_eigenverbrauchsquoten(args.self_consumption_from),
+            on=KONFIGURATION,
+            how="left",
+        )
+
+    start = time.perf_counter()
+    ergebnis = rangfolge(berechne_wirtschaftlichkeit(konfigurationen, parameter))
+    dauer = time.perf_counter() - start
+
+    ergebnis.to_csv(args.output, index=False)
+    print(
+        f"{len(ergebnis)} Konfigurationen in {dauer:.2f} s bewertet, "
+        f"gespeichert in '{args.output}'"
+    )